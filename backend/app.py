@@ -34,19 +34,38 @@ Version: 1.0.0
 =============================================================================
 """
 
-from fastapi import FastAPI, HTTPException, Query, Depends
+from fastapi import FastAPI, HTTPException, Query, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
+import base64
+import binascii
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
+from pymongo import ReturnDocument
 
 # Timezone WIB (UTC+7)
 WIB = timezone(timedelta(hours=7))
 import logging
+import orjson
+import re
+import time
 from bson import ObjectId
 import uuid 
 from typing import Optional, List, Dict, Any  # Pastikan Optional ada
-from hashing import generate_hash, verify_chain, verify_hash, verify_chain_for_user
+from hashing import (
+    generate_hash,
+    verify_chain,
+    verify_hash,
+    verify_hashes,
+    verify_chain_for_user,
+    get_chain_tip,
+    reconcile_chain_tip,
+    claim_chain_position,
+    release_chain_claim,
+    shutdown_verify_executor
+)
 
 # Import modul internal
 from config import settings
@@ -80,24 +99,72 @@ from auth import (
     get_current_active_user,
     get_optional_user,
     require_admin,
+    invalidate_user_tokens,
     TokenData
 )
-from cassandra_service import log_audit, get_audit_logs, get_audit_stats
+from cassandra_service import (
+    log_audit,
+    get_audit_logs,
+    get_audit_logs_page,
+    get_audit_stats,
+    start_audit_worker,
+    stop_audit_worker
+)
 from climate_trace_service import climate_trace_service
+from cache_service import (
+    cached,
+    close_redis_client,
+    get_cached_json,
+    set_cached_json,
+    get_counter,
+    incr_counter,
+    swr_get,
+    swr_set,
+    acquire_lock
+)
 from genai_service import gen_ai_service
+from logging_config import setup_logging
 
 # =============================================================================
 # KONFIGURASI LOGGING
 # =============================================================================
 # Setup logging untuk monitoring dan debugging aplikasi
 # Level diatur dari environment variable (LOG_LEVEL di .env)
+# Log ditulis lewat antrian (tidak memblokir event loop) dan error identik
+# di-sampling, lihat logging_config.py
 
-logging.basicConfig(
-    level=getattr(logging, settings.log_level),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging(settings.log_level)
 logger = logging.getLogger(__name__)
 
+# Batas percobaan klaim tip hash chain saat banyak request bersamaan
+CHAIN_CLAIM_MAX_ATTEMPTS = 10
+
+# Cache stale-while-revalidate daftar aktivitas per user (halaman awal)
+ACTIVITIES_CACHE_MAX_PAGE = 2
+ACTIVITIES_CACHE_FRESH_TTL = 30
+ACTIVITIES_CACHE_STALE_TTL = 300
+
+# Referensi task background agar tidak di-garbage-collect sebelum selesai
+_background_tasks: set = set()
+
+
+def _spawn_background(coro) -> asyncio.Task:
+    """Jalankan coroutine sebagai task background (fire-and-forget)."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def invalidate_user_activity_cache(user_id: str):
+    """Naikkan versi data aktivitas user sehingga cache lama tidak dipakai."""
+    await incr_counter(f"act:ver:{user_id}")
+
+
+# Format ObjectId: 24 karakter hex. Dicek sebelum ObjectId() agar input
+# tidak valid ditolak tanpa konstruktor bson dan exception
+OBJECT_ID_RE = re.compile(r"[0-9a-fA-F]{24}")
+
 
 # =============================================================================
 # LIFESPAN EVENT HANDLER
@@ -127,6 +194,18 @@ async def lifespan(app: FastAPI):
     # Koneksi ke MongoDB - wajib sukses atau aplikasi tidak jalan
     await Database.connect()
     
+    # Index untuk query aktivitas (idempoten)
+    await Database.ensure_indexes()
+    
+    # Pastikan tip hash chain menunjuk record yang tersimpan
+    try:
+        await reconcile_chain_tip(get_db())
+    except Exception as e:
+        logger.warning(f"Gagal merekonsiliasi tip hash chain: {e}")
+    
+    # Worker audit log - menulis ke Cassandra di background
+    await start_audit_worker()
+    
     logger.info("Aplikasi berhasil dijalankan!")
     
     # Yield = serahkan kontrol ke FastAPI untuk melayani request
@@ -137,6 +216,19 @@ async def lifespan(app: FastAPI):
     # =========================================================================
     logger.info("Mematikan EcoLedger Backend...")
     
+    # Flush audit log yang masih di antrian
+    await stop_audit_worker()
+    
+    # Tutup koneksi Redis cache
+    await close_redis_client()
+    
+    # Tutup connection pool HTTP ke Climate TRACE dan Climatiq
+    await climate_trace_service.aclose()
+    await climatiq_service.aclose()
+    
+    # Hentikan process pool verifikasi hash chain (jika pernah dipakai)
+    shutdown_verify_executor()
+    
     # Tutup koneksi database dengan bersih
     await Database.disconnect()
     
@@ -156,6 +248,9 @@ app = FastAPI(
     # Gunakan lifespan handler untuk startup/shutdown
     lifespan=lifespan,
     
+    # Serialisasi response memakai orjson (lebih cepat dari json stdlib)
+    default_response_class=ORJSONResponse,
+    
     # URL untuk dokumentasi otomatis
     docs_url="/docs",      # Swagger UI
     redoc_url="/redoc"     # ReDoc
@@ -187,6 +282,32 @@ app.add_middleware(
 )
 
 
+# =============================================================================
+# HELPER: FORMAT WAKTU
+# =============================================================================
+
+def to_wib_iso(value: Any) -> str:
+    """
+    Konversi nilai created_at dari MongoDB ke ISO string WIB untuk response.
+
+    created_at baru disimpan sebagai BSON Date (UTC) agar bisa di-index dan
+    di-sort dengan benar. Motor mengembalikan datetime naive (UTC), jadi
+    tzinfo dipasang dulu sebelum dikonversi. Data lama yang masih berupa
+    ISO string dikembalikan apa adanya.
+
+    Args:
+        value: datetime (UTC) atau ISO string dari dokumen
+
+    Returns:
+        str: ISO 8601 string dalam timezone WIB
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(WIB).isoformat()
+    return value or ""
+
+
 # =============================================================================
 # ENDPOINT: AUTHENTICATION
 # =============================================================================
@@ -201,7 +322,9 @@ async def get_or_create_organisasi(db, nama_organisasi: str, created_by_user_id:
         created_by_user_id: User ID yang membuat organisasi (jika baru)
     
     Returns:
-        Dict organisasi dengan _id, nama, created_at, dll
+        Dict organisasi siap pakai untuk response (format OrganisasiResponse):
+        id, nama, created_at, jumlah_anggota. Organisasi yang baru dibuat
+        selalu memiliki jumlah_anggota = 0.
     """
     if not nama_organisasi or not nama_organisasi.strip():
         return None
@@ -210,19 +333,27 @@ async def get_or_create_organisasi(db, nama_organisasi: str, created_by_user_id:
     organisasi_collection = db["organisasi"]
     
     # Cari organisasi berdasarkan nama (case-insensitive)
+    # re.escape: input user tidak boleh diinterpretasi sebagai pola regex (ReDoS)
     existing_org = await organisasi_collection.find_one({
-        "nama": {"$regex": f"^{nama_organisasi}$", "$options": "i"}
+        "nama": {"$regex": f"^{re.escape(nama_organisasi)}$", "$options": "i"}
     })
     
     if existing_org:
         logger.info(f"Organisasi ditemukan: {nama_organisasi}")
-        return existing_org
+        organisasi_id = str(existing_org["_id"])
+        jumlah_anggota = await db["users"].count_documents({"organisasi_id": organisasi_id})
+        return {
+            "id": organisasi_id,
+            "nama": existing_org["nama"],
+            "created_at": to_wib_iso(existing_org["created_at"]),
+            "jumlah_anggota": jumlah_anggota
+        }
     
     # Buat organisasi baru jika belum ada
-    now_str = datetime.now(WIB).isoformat()
+    # created_at disimpan sebagai BSON Date (UTC), dikonversi ke WIB saat response
     new_org = {
         "nama": nama_organisasi,
-        "created_at": now_str,
+        "created_at": datetime.now(timezone.utc),
         "created_by": created_by_user_id
     }
     
@@ -237,10 +368,16 @@ async def get_or_create_organisasi(db, nama_organisasi: str, created_by_user_id:
         action_type="CREATE",
         entity="organisasi",
         entity_id=str(result.inserted_id),
-        description=f"Organisasi baru dibuat: {nama_organisasi}"
+        description="Organisasi baru dibuat: %s",
+        description_args=(nama_organisasi,)
     )
     
-    return new_org
+    return {
+        "id": str(result.inserted_id),
+        "nama": nama_organisasi,
+        "created_at": to_wib_iso(new_org["created_at"]),
+        "jumlah_anggota": 0
+    }
 
 
 async def get_organisasi_by_id(db, organisasi_id: str) -> Optional[Dict]:
@@ -262,7 +399,7 @@ async def get_organisasi_by_id(db, organisasi_id: str) -> Optional[Dict]:
         return {
             "id": str(org["_id"]),
             "nama": org["nama"],
-            "created_at": org["created_at"],
+            "created_at": to_wib_iso(org["created_at"]),
             "jumlah_anggota": jumlah_anggota
         }
     except Exception as e:
@@ -290,7 +427,7 @@ async def register(user: UserCreate):
         HTTPException 400: Jika email sudah terdaftar
     """
     try:
-        db = await get_db()
+        db = get_db()
         users_collection = db["users"]
         
         # Cek apakah email sudah terdaftar
@@ -302,7 +439,7 @@ async def register(user: UserCreate):
             )
         
         # Hash password
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await get_password_hash(user.password)
         
         # Handle organisasi: get or create
         organisasi_id = None
@@ -310,37 +447,35 @@ async def register(user: UserCreate):
         if user.organisasi:
             # Buat user temporary ID untuk organisasi creation
             temp_user_id = "temp_" + str(uuid.uuid4())
-            org = await get_or_create_organisasi(db, user.organisasi, temp_user_id)
-            if org:
-                organisasi_id = str(org["_id"])
+            organisasi_data = await get_or_create_organisasi(db, user.organisasi, temp_user_id)
+            if organisasi_data:
+                organisasi_id = organisasi_data["id"]
         
         # Buat dokumen user baru
-        now_str = datetime.now(WIB).isoformat()
+        # created_at disimpan sebagai BSON Date (UTC), dikonversi ke WIB saat response
+        created_at = datetime.now(timezone.utc)
         new_user = {
             "email": user.email,
             "password": hashed_password,
             "name": user.name,
             "organisasi_id": organisasi_id,
             "role": user.role,
-            "created_at": now_str
+            "created_at": created_at
         }
         
         # Simpan ke database
         result = await users_collection.insert_one(new_user)
         user_id = str(result.inserted_id)
         
-        # Update organisasi created_by jika baru dibuat
-        if organisasi_id and user.organisasi:
-            org_collection = db["organisasi"]
-            org_doc = await org_collection.find_one({"_id": ObjectId(organisasi_id)})
-            if org_doc and org_doc.get("created_by", "").startswith("temp_"):
-                await org_collection.update_one(
-                    {"_id": ObjectId(organisasi_id)},
-                    {"$set": {"created_by": user_id}}
-                )
+        # Update organisasi created_by jika baru dibuat (masih ID temporary)
+        if organisasi_data:
+            await db["organisasi"].update_one(
+                {"_id": ObjectId(organisasi_id), "created_by": {"$regex": "^temp_"}},
+                {"$set": {"created_by": user_id}}
+            )
             
-            # Get organisasi data untuk response
-            organisasi_data = await get_organisasi_by_id(db, organisasi_id)
+            # User baru sudah menjadi anggota organisasi
+            organisasi_data["jumlah_anggota"] += 1
         
         # Buat JWT token
         access_token = create_access_token(
@@ -351,17 +486,21 @@ async def register(user: UserCreate):
             }
         )
         
-        # FR-11: Log audit ke Cassandra
-        audit_desc = f"User baru terdaftar: {user.email}"
+        # FR-11: Log audit ke Cassandra (deskripsi di-format oleh worker audit)
         if organisasi_data:
-            audit_desc += f" di organisasi {organisasi_data['nama']}"
+            audit_desc = "User baru terdaftar: %s di organisasi %s"
+            audit_args = (user.email, organisasi_data["nama"])
+        else:
+            audit_desc = "User baru terdaftar: %s"
+            audit_args = (user.email,)
         
         log_audit(
             user_id=user_id,
             action_type="REGISTER",
             entity="user",
             entity_id=user_id,
-            description=audit_desc
+            description=audit_desc,
+            description_args=audit_args
         )
         
         logger.info(f"User baru terdaftar: {user.email}")
@@ -375,7 +514,7 @@ async def register(user: UserCreate):
                 name=user.name,
                 organisasi=organisasi_data,
                 role=user.role,
-                created_at=now_str
+                created_at=to_wib_iso(created_at)
             )
         )
         
@@ -406,7 +545,7 @@ async def login(credentials: UserLogin):
         HTTPException 401: Jika email atau password salah
     """
     try:
-        db = await get_db()
+        db = get_db()
         users_collection = db["users"]
         
         # Cari user berdasarkan email
@@ -419,7 +558,7 @@ async def login(credentials: UserLogin):
             )
         
         # Verifikasi password
-        if not verify_password(credentials.password, user["password"]):
+        if not await verify_password(credentials.password, user["password"]):
             raise HTTPException(
                 status_code=401,
                 detail="Email atau password salah"
@@ -441,7 +580,8 @@ async def login(credentials: UserLogin):
             action_type="LOGIN",
             entity="user",
             entity_id=user_id,
-            description=f"User {user['email']} berhasil login"
+            description="User %s berhasil login",
+            description_args=(user["email"],)
         )
         
         logger.info(f"User login: {user['email']}")
@@ -460,7 +600,7 @@ async def login(credentials: UserLogin):
                 name=user["name"],
                 organisasi=organisasi_data,
                 role=user["role"],
-                created_at=user["created_at"]
+                created_at=to_wib_iso(user["created_at"])
             )
         )
         
@@ -487,7 +627,7 @@ async def get_me(current_user: TokenData = Depends(get_current_user)):
         UserResponse: Data user yang login
     """
     try:
-        db = await get_db()
+        db = get_db()
         users_collection = db["users"]
         
         # Cari user berdasarkan ID dari token
@@ -507,7 +647,7 @@ async def get_me(current_user: TokenData = Depends(get_current_user)):
             name=user["name"],
             organisasi=organisasi_data,
             role=user["role"],
-            created_at=user["created_at"]
+            created_at=to_wib_iso(user["created_at"])
         )
         
     except HTTPException:
@@ -529,7 +669,7 @@ async def update_profile(
 ):
     """Update profil user yang sedang login."""
     try:
-        db = await get_db()
+        db = get_db()
         users_collection = db["users"]
         
         # Cek apakah email baru sudah digunakan oleh user lain
@@ -545,10 +685,9 @@ async def update_profile(
         organisasi_id = None
         organisasi_data = None
         if profile.organisasi:
-            org = await get_or_create_organisasi(db, profile.organisasi, current_user.user_id)
-            if org:
-                organisasi_id = str(org["_id"])
-                organisasi_data = await get_organisasi_by_id(db, organisasi_id)
+            organisasi_data = await get_or_create_organisasi(db, profile.organisasi, current_user.user_id)
+            if organisasi_data:
+                organisasi_id = organisasi_data["id"]
         
         # Update user
         update_data = {
@@ -557,23 +696,26 @@ async def update_profile(
             "organisasi_id": organisasi_id
         }
         
-        update_result = await users_collection.update_one(
+        # find_one_and_update: update dan ambil dokumen terbaru dalam satu round-trip
+        user = await users_collection.find_one_and_update(
             {"_id": ObjectId(current_user.user_id)},
-            {"$set": update_data}
+            {"$set": update_data},
+            projection={"password": 0},
+            return_document=ReturnDocument.AFTER
         )
         
-        if update_result.modified_count == 0 and update_result.matched_count == 0:
+        if user is None:
             raise HTTPException(status_code=404, detail="User tidak ditemukan")
         
-        # Get updated user
-        user = await users_collection.find_one({"_id": ObjectId(current_user.user_id)})
-        
-        # Log audit with organisasi info
+        # Log audit with organisasi info (deskripsi di-format oleh worker audit)
         audit_changes = {"name": profile.name, "email": profile.email}
-        audit_desc = f"User updated profile"
         if profile.organisasi:
             audit_changes["organisasi"] = profile.organisasi
-            audit_desc += f" - Organisasi: {profile.organisasi}"
+            audit_desc = "User updated profile - Organisasi: %s"
+            audit_args = (profile.organisasi,)
+        else:
+            audit_desc = "User updated profile"
+            audit_args = ()
         
         log_audit(
             user_id=current_user.user_id,
@@ -581,7 +723,8 @@ async def update_profile(
             entity="user",
             entity_id=current_user.user_id,
             changes=audit_changes,
-            description=audit_desc
+            description=audit_desc,
+            description_args=audit_args
         )
         
         # Get organisasi data untuk response
@@ -594,7 +737,7 @@ async def update_profile(
             name=user["name"],
             organisasi=organisasi_data,
             role=user["role"],
-            created_at=user["created_at"]
+            created_at=to_wib_iso(user["created_at"])
         )
         
     except HTTPException:
@@ -615,7 +758,7 @@ async def change_password(
 ):
     """Ubah password user yang sedang login."""
     try:
-        db = await get_db()
+        db = get_db()
         users_collection = db["users"]
         
         # Get user
@@ -624,14 +767,14 @@ async def change_password(
             raise HTTPException(status_code=404, detail="User tidak ditemukan")
         
         # Verify current password
-        if not verify_password(password_data.current_password, user["password"]):
+        if not await verify_password(password_data.current_password, user["password"]):
             raise HTTPException(
                 status_code=400,
                 detail="Password saat ini tidak benar"
             )
         
         # Hash new password
-        new_hashed_password = get_password_hash(password_data.new_password)
+        new_hashed_password = await get_password_hash(password_data.new_password)
         
         # Update password
         await users_collection.update_one(
@@ -639,6 +782,9 @@ async def change_password(
             {"$set": {"password": new_hashed_password}}
         )
         
+        # Token lama harus diverifikasi ulang, jangan dilayani dari cache
+        invalidate_user_tokens(current_user.user_id)
+        
         # Log audit
         log_audit(
             user_id=current_user.user_id,
@@ -675,22 +821,22 @@ async def get_organisasi_list():
         List[OrganisasiResponse]: Daftar organisasi dengan jumlah anggota
     """
     try:
-        db = await get_db()
+        db = get_db()
         organisasi_collection = db["organisasi"]
         users_collection = db["users"]
         
-        # Get all organisasi
-        orgs = await organisasi_collection.find().sort("nama", 1).to_list(length=None)
+        # Get all organisasi (di-stream per batch, tidak dimuat sekaligus)
+        orgs_cursor = organisasi_collection.find().sort("nama", 1).batch_size(500)
         
         result = []
-        for org in orgs:
+        async for org in orgs_cursor:
             # Count members
             jumlah_anggota = await users_collection.count_documents({"organisasi_id": str(org["_id"])})
             
             result.append(OrganisasiResponse(
                 id=str(org["_id"]),
                 nama=org["nama"],
-                created_at=org["created_at"],
+                created_at=to_wib_iso(org["created_at"]),
                 jumlah_anggota=jumlah_anggota
             ))
         
@@ -723,7 +869,7 @@ async def update_organisasi(
         OrganisasiResponse: Data organisasi yang sudah diupdate
     """
     try:
-        db = await get_db()
+        db = get_db()
         organisasi_collection = db["organisasi"]
         users_collection = db["users"]
         
@@ -738,7 +884,7 @@ async def update_organisasi(
         # Cek apakah nama baru sudah digunakan organisasi lain (case-insensitive)
         existing_org = await organisasi_collection.find_one({
             "_id": {"$ne": ObjectId(organisasi_id)},
-            "nama": {"$regex": f"^{nama_baru.strip()}$", "$options": "i"}
+            "nama": {"$regex": f"^{re.escape(nama_baru.strip())}$", "$options": "i"}
         })
         if existing_org:
             raise HTTPException(
@@ -762,7 +908,8 @@ async def update_organisasi(
             entity="organisasi",
             entity_id=organisasi_id,
             changes={"nama": nama_baru},
-            description=f"Admin updated organisasi: {org['nama']} -> {nama_baru}"
+            description="Admin updated organisasi: %s -> %s",
+            description_args=(org["nama"], nama_baru)
         )
         
         logger.info(f"Admin {current_user.user_id} updated organisasi {organisasi_id}: {org['nama']} -> {nama_baru}")
@@ -770,7 +917,7 @@ async def update_organisasi(
         return OrganisasiResponse(
             id=str(organisasi_id),
             nama=nama_baru.strip(),
-            created_at=org["created_at"],
+            created_at=to_wib_iso(org["created_at"]),
             jumlah_anggota=jumlah_anggota
         )
         
@@ -805,7 +952,7 @@ async def delete_organisasi(
         Message konfirmasi dengan jumlah users yang terpengaruh
     """
     try:
-        db = await get_db()
+        db = get_db()
         organisasi_collection = db["organisasi"]
         users_collection = db["users"]
         
@@ -814,25 +961,31 @@ async def delete_organisasi(
         if not org:
             raise HTTPException(status_code=404, detail="Organisasi tidak ditemukan")
         
-        # Count members yang akan terpengaruh - organisasi_id disimpan sebagai STRING
-        affected_users = await users_collection.count_documents({"organisasi_id": str(organisasi_id)})
-        
-        # Cegah delete jika ada anggota dan tidak force
-        if affected_users > 0 and not force:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Organisasi memiliki {affected_users} anggota. Gunakan force=true untuk tetap menghapus."
-            )
-        
-        # Set organisasi_id users menjadi null
-        if affected_users > 0:
-            await users_collection.update_many(
-                {"organisasi_id": str(organisasi_id)},
-                {"$set": {"organisasi_id": None}}
+        if force:
+            # Set organisasi_id users menjadi null dan hapus organisasi secara paralel.
+            # Jumlah anggota terdampak diambil dari modified_count, tanpa count terpisah.
+            # organisasi_id disimpan sebagai STRING di users collection
+            update_result, _ = await asyncio.gather(
+                users_collection.update_many(
+                    {"organisasi_id": str(organisasi_id)},
+                    {"$set": {"organisasi_id": None}}
+                ),
+                organisasi_collection.delete_one({"_id": ObjectId(organisasi_id)})
             )
-        
-        # Delete organisasi
-        await organisasi_collection.delete_one({"_id": ObjectId(organisasi_id)})
+            affected_users = update_result.modified_count
+        else:
+            # Count members yang akan terpengaruh
+            affected_users = await users_collection.count_documents({"organisasi_id": str(organisasi_id)})
+            
+            # Cegah delete jika ada anggota dan tidak force
+            if affected_users > 0:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Organisasi memiliki {affected_users} anggota. Gunakan force=true untuk tetap menghapus."
+                )
+            
+            # Delete organisasi
+            await organisasi_collection.delete_one({"_id": ObjectId(organisasi_id)})
         
         # Log audit
         log_audit(
@@ -840,7 +993,8 @@ async def delete_organisasi(
             action_type="DELETE",
             entity="organisasi",
             entity_id=organisasi_id,
-            description=f"Admin deleted organisasi: {org['nama']} (affected {affected_users} users, force={force})"
+            description="Admin deleted organisasi: %s (affected %d users, force=%s)",
+            description_args=(org["nama"], affected_users, force)
         )
         
         logger.info(f"Admin {current_user.user_id} deleted organisasi {organisasi_id}: {org['nama']} (force={force})")
@@ -876,7 +1030,7 @@ async def get_organisasi_members(
         List of users in the organisasi
     """
     try:
-        db = await get_db()
+        db = get_db()
         users_collection = db["users"]
         organisasi_collection = db["organisasi"]
         
@@ -886,20 +1040,21 @@ async def get_organisasi_members(
             raise HTTPException(status_code=404, detail="Organisasi tidak ditemukan")
         
         # Get all members - organisasi_id disimpan sebagai STRING di users collection
-        members = await users_collection.find(
+        # Hanya field yang dipakai response; cursor di-stream per batch
+        members_cursor = users_collection.find(
             {"organisasi_id": str(organisasi_id)},
-            {"password": 0}  # Exclude password
-        ).to_list(length=None)
+            {"email": 1, "name": 1, "role": 1, "created_at": 1}
+        ).batch_size(500)
         
         # Format response
         result = []
-        for member in members:
+        async for member in members_cursor:
             result.append({
                 "id": str(member["_id"]),
                 "email": member["email"],
                 "name": member["name"],
                 "role": member["role"],
-                "created_at": member["created_at"]
+                "created_at": to_wib_iso(member["created_at"])
             })
         
         return {
@@ -933,7 +1088,7 @@ async def delete_account(
     - Audit log di Cassandra TETAP ADA (tidak dihapus)
     """
     try:
-        db = await get_db()
+        db = get_db()
         users_collection = db["users"]
         activities_collection = db["activity_logs"]
         
@@ -941,6 +1096,7 @@ async def delete_account(
         deleted_activities = await activities_collection.delete_many(
             {"user_id": current_user.user_id}
         )
+        await db[DASHBOARD_SUMMARY_COLLECTION].delete_one({"_id": current_user.user_id})
         
         # Hapus user
         delete_result = await users_collection.delete_one(
@@ -950,13 +1106,17 @@ async def delete_account(
         if delete_result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="User tidak ditemukan")
         
+        invalidate_user_tokens(current_user.user_id)
+        await invalidate_user_activity_cache(current_user.user_id)
+        
         # Log audit (ini tetap ada di Cassandra)
         log_audit(
             user_id=current_user.user_id,
             action_type="DELETE",
             entity="user",
             entity_id=current_user.user_id,
-            description=f"User {current_user.email} deleted their account. {deleted_activities.deleted_count} activities deleted."
+            description="User %s deleted their account. %d activities deleted.",
+            description_args=(current_user.email, deleted_activities.deleted_count)
         )
         
         logger.info(f"User {current_user.user_id} deleted account with {deleted_activities.deleted_count} activities")
@@ -994,7 +1154,7 @@ async def get_all_users(
         List of users (tanpa password)
     """
     try:
-        db = await get_db()
+        db = get_db()
         users_collection = db["users"]
         
         # Get all users
@@ -1007,7 +1167,7 @@ async def get_all_users(
                 "email": user["email"],
                 "name": user["name"],
                 "role": user["role"],
-                "created_at": user.get("created_at", "")
+                "created_at": to_wib_iso(user.get("created_at"))
             })
         
         logger.info(f"Admin {current_user.email} mengakses daftar users ({len(users_list)} users)")
@@ -1039,7 +1199,7 @@ async def get_admin_stats(
         total_users, total_activities, total_emission
     """
     try:
-        db = await get_db()
+        db = get_db()
         users_collection = db["users"]
         activities_collection = db["activity_logs"]
         
@@ -1084,6 +1244,7 @@ async def get_admin_stats(
 async def get_audit_trail(
     user_id: str = Query(None, description="Filter by user ID"),
     limit: int = Query(500, ge=1, le=1000, description="Jumlah maksimal record"),
+    page_state: Optional[str] = Query(None, description="Token halaman berikutnya (next_page_state), hanya bersama user_id"),
     current_user: TokenData = Depends(require_admin)
 ):
     """
@@ -1094,19 +1255,43 @@ async def get_audit_trail(
     - Untuk monitoring keamanan dan investigasi
     - Data diambil dari Cassandra (eco_logs.activity_audit)
     
+    Jika user_id diisi, data diambil per halaman memakai paging Cassandra:
+    kirim kembali next_page_state sebagai page_state untuk halaman berikutnya.
+    
     Returns:
         List of audit log records
     """
     try:
-        # Get audit logs from Cassandra
-        logs = get_audit_logs(user_id=user_id, limit=limit)
+        next_page_state = None
+        
+        if user_id:
+            paging_state = None
+            if page_state:
+                try:
+                    paging_state = base64.urlsafe_b64decode(page_state.encode())
+                except (binascii.Error, ValueError):
+                    raise HTTPException(status_code=400, detail="page_state tidak valid")
+            
+            logs, raw_state = await get_audit_logs_page(
+                user_id=user_id,
+                limit=limit,
+                paging_state=paging_state
+            )
+            if raw_state:
+                next_page_state = base64.urlsafe_b64encode(raw_state).decode()
+        else:
+            # Get audit logs from Cassandra
+            logs = await get_audit_logs(limit=limit)
         
         return {
             "total": len(logs),
             "logs": logs,
+            "next_page_state": next_page_state,
             "source": "cassandra"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error get audit trail: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
@@ -1124,7 +1309,7 @@ async def get_audit_statistics(
     Mendapatkan statistik audit logs dari Cassandra.
     """
     try:
-        stats = get_audit_stats()
+        stats = await get_audit_stats()
         return stats
     except Exception as e:
         logger.error(f"Error get audit stats: {e}", exc_info=True)
@@ -1166,6 +1351,20 @@ async def get_climate_trace_sectors():
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
 
+@app.get(
+    "/api/climate-trace/definitions",
+    tags=["Climate TRACE"],
+    summary="Get all definitions (countries, sectors, subsectors, gases, continents)"
+)
+async def get_climate_trace_definitions():
+    """Get semua definisi Climate TRACE dalam satu response."""
+    try:
+        return await climate_trace_service.get_all_definitions()
+    except Exception as e:
+        logger.error(f"Error get definitions: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
 @app.get(
     "/api/climate-trace/rankings/countries",
     tags=["Climate TRACE"],
@@ -1303,6 +1502,58 @@ async def get_indonesia_emissions(
 # ENDPOINT: AI ASSISTANT (Gemini)
 # =============================================================================
 
+# Tips AI di-cache per (user, aktivitas terakhir): selama user belum
+# mencatat aktivitas baru, Gemini tidak perlu dipanggil ulang
+AI_TIPS_CACHE_TTL = 86400
+AI_TIPS_JOB_TTL = 600
+AI_TIPS_INPROCESS_MAXSIZE = 10_000
+AI_TIPS_FALLBACK = "Maaf, Eco-Assistant sedang mengalami kendala teknis. Silakan coba lagi nanti."
+
+# Penyimpanan job in-process (dipakai jika Redis tidak dikonfigurasi)
+_ai_tips_jobs: Dict[str, Dict[str, Any]] = {}
+_ai_tips_cache: Dict[str, str] = {}
+
+
+async def _save_ai_tips_job(job_id: str, job: Dict[str, Any]):
+    """Simpan status job tips AI ke Redis, atau in-process jika Redis tidak ada."""
+    if not await set_cached_json(f"ai:job:{job_id}", job, AI_TIPS_JOB_TTL):
+        now = time.monotonic()
+        if len(_ai_tips_jobs) >= AI_TIPS_INPROCESS_MAXSIZE:
+            # Buang job kadaluarsa yang tidak pernah di-poll
+            for expired_id in [k for k, v in _ai_tips_jobs.items() if v["expires_at"] < now]:
+                del _ai_tips_jobs[expired_id]
+        _ai_tips_jobs[job_id] = {**job, "expires_at": now + AI_TIPS_JOB_TTL}
+
+
+async def _load_ai_tips_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Ambil status job tips AI, None jika tidak ada atau kadaluarsa."""
+    job = await get_cached_json(f"ai:job:{job_id}")
+    if job is not None:
+        return job
+    
+    job = _ai_tips_jobs.get(job_id)
+    if job is not None and job["expires_at"] < time.monotonic():
+        _ai_tips_jobs.pop(job_id, None)
+        return None
+    return job
+
+
+async def _run_ai_tips_job(job_id: str, user_id: str, cache_key: str, summary: str):
+    """Background task: panggil Gemini lalu simpan hasil job dan cache tips."""
+    try:
+        tips = await gen_ai_service.generate_carbon_tips(summary, raise_on_error=True)
+        if gen_ai_service.is_configured:
+            if not await set_cached_json(cache_key, tips, AI_TIPS_CACHE_TTL):
+                if len(_ai_tips_cache) >= AI_TIPS_INPROCESS_MAXSIZE:
+                    _ai_tips_cache.pop(next(iter(_ai_tips_cache)))
+                _ai_tips_cache[cache_key] = tips
+    except Exception as e:
+        logger.error(f"Error generating AI tips for job {job_id}: {e}")
+        tips = AI_TIPS_FALLBACK
+    
+    await _save_ai_tips_job(job_id, {"user_id": user_id, "status": "done", "tips": tips})
+
+
 @app.post(
     "/api/ai/tips",
     tags=["AI Assistant"],
@@ -1314,15 +1565,21 @@ async def get_ai_tips(
     """
     Generate personalized sustainability tips using Google Gemini AI.
     Analyzes user's recent activities to provide relevant advice.
+    
+    Jika tips untuk aktivitas terakhir user sudah ada di cache, tips
+    langsung dikembalikan. Jika belum, Gemini dipanggil di background dan
+    endpoint mengembalikan 202 dengan job_id; hasil diambil lewat
+    GET /api/ai/tips/{job_id}.
     """
     logger.info(f"AI Tips requested for user: {current_user.email}")
     try:
-        db = await get_db()
+        db = get_db()
         activities_collection = db["activity_logs"]
         
-        # Ambil 5 aktivitas terbaru user
+        # Ambil 5 aktivitas terbaru user, hanya field yang dipakai di ringkasan
         activities_cursor = activities_collection.find(
-            {"user_id": current_user.user_id}
+            {"user_id": current_user.user_id},
+            projection={"activity_type": 1, "emission": 1, "emission_unit": 1, "timestamp": 1}
         ).sort("timestamp", -1).limit(5)
         
         activities = await activities_cursor.to_list(length=5)
@@ -1330,37 +1587,135 @@ async def get_ai_tips(
         if not activities:
             summary = "User belum memiliki catatan aktivitas emisi karbon."
         else:
-            summary = "Aktivitas terbaru:\n"
-            for act in activities:
-                summary += f"- {act.get('activity_type')}: {act.get('emission')} {act.get('emission_unit', 'kg CO2e')} pada {act.get('timestamp')}\n"
+            lines = [
+                f"- {act.get('activity_type')}: {act.get('emission')} {act.get('emission_unit', 'kg CO2e')} pada {act.get('timestamp')}"
+                for act in activities
+            ]
+            summary = "Aktivitas terbaru:\n" + "\n".join(lines) + "\n"
         
-        # Generate tips menggunakan Gemini
-        tips = await gen_ai_service.generate_carbon_tips(summary)
+        latest_id = str(activities[0]["_id"]) if activities else "none"
+        cache_key = f"ai:tips:{current_user.user_id}:{latest_id}"
         
         # Log audit ke Cassandra
         log_audit(
             user_id=current_user.user_id,
             action_type="AI_TIPS",
             entity="ai_assistant",
-            description=f"User {current_user.email} mendapatkan tips AI"
+            description="User %s mendapatkan tips AI",
+            description_args=(current_user.email,)
         )
         
-        return {
-            "user": current_user.email,
-            "tips": tips
-        }
+        tips = await get_cached_json(cache_key) or _ai_tips_cache.get(cache_key)
+        if tips:
+            return {
+                "user": current_user.email,
+                "status": "done",
+                "tips": tips
+            }
+        
+        # Generate tips menggunakan Gemini di background
+        job_id = uuid.uuid4().hex
+        await _save_ai_tips_job(job_id, {"user_id": current_user.user_id, "status": "pending"})
+        
+        _spawn_background(
+            _run_ai_tips_job(job_id, current_user.user_id, cache_key, summary)
+        )
+        
+        return ORJSONResponse(
+            status_code=202,
+            content={
+                "user": current_user.email,
+                "job_id": job_id,
+                "status": "pending"
+            },
+            headers={"Location": f"/api/ai/tips/{job_id}"}
+        )
     except Exception as e:
         logger.error(f"Error getting AI tips: {e}", exc_info=True)
         return {
             "user": current_user.email,
-            "tips": "Maaf, Eco-Assistant sedang mengalami kendala teknis. Silakan coba lagi nanti."
+            "status": "done",
+            "tips": AI_TIPS_FALLBACK
         }
 
 
+@app.get(
+    "/api/ai/tips/{job_id}",
+    tags=["AI Assistant"],
+    summary="Get the result of an AI tips job"
+)
+async def get_ai_tips_job(
+    job_id: str,
+    current_user: TokenData = Depends(get_current_active_user)
+):
+    """
+    Mengambil status/hasil job tips AI dari POST /api/ai/tips.
+    
+    Returns:
+        {"user", "job_id", "status": "pending"|"done", "tips" (jika done)}
+    
+    Raises:
+        HTTPException 404: Jika job tidak ditemukan, kadaluarsa, atau milik user lain
+    """
+    job = await _load_ai_tips_job(job_id)
+    if job is None or job["user_id"] != current_user.user_id:
+        raise HTTPException(status_code=404, detail="Job tips AI tidak ditemukan")
+    
+    response = {
+        "user": current_user.email,
+        "job_id": job_id,
+        "status": job["status"]
+    }
+    if job["status"] == "done":
+        response["tips"] = job["tips"]
+    return response
+
+
 # =============================================================================
 # ENDPOINT: HEALTH CHECK
 # =============================================================================
 
+# Hasil ping MongoDB di-cache sebentar agar probe frekuensi tinggi
+# (load balancer, Kubernetes) tidak membebani database
+HEALTH_DB_PING_TTL = 2.0
+_db_ping_cache: Dict[str, Any] = {"checked_at": 0.0, "status": None}
+
+# Konfigurasi Climatiq tidak berubah selama aplikasi berjalan
+CLIMATIQ_STATUS = (
+    "configured"
+    if settings.climatiq_api_key and settings.climatiq_api_key != "your_climatiq_api_key_here"
+    else "not_configured"
+)
+
+
+async def _cached_db_ping() -> str:
+    """
+    Ping MongoDB dengan cache TTL singkat.
+    
+    Returns:
+        "connected" atau "disconnected"
+    """
+    now = time.monotonic()
+    if (
+        _db_ping_cache["status"] is not None
+        and now - _db_ping_cache["checked_at"] < HEALTH_DB_PING_TTL
+    ):
+        return _db_ping_cache["status"]
+    
+    try:
+        db = get_db()
+        # Ping command untuk test koneksi
+        await db.command('ping')
+        status = "connected"
+    except Exception as e:
+        logger.error(f"Health check database gagal: {e}")
+        status = "disconnected"
+    
+    _db_ping_cache["status"] = status
+    _db_ping_cache["checked_at"] = time.monotonic()
+    return status
+
+
 @app.get(
     "/api/health",
     response_model=HealthResponse,
@@ -1372,38 +1727,19 @@ async def health_check():
     Endpoint untuk mengecek status kesehatan sistem.
     
     Mengecek:
-    1. Status koneksi MongoDB
+    1. Status koneksi MongoDB (di-cache HEALTH_DB_PING_TTL detik)
     2. Status konfigurasi Climatiq API
     
     Berguna untuk:
     - Monitoring (Prometheus, Grafana)
     - Load balancer health check
-    - Kubernetes liveness/readiness probe
+    
+    Untuk Kubernetes gunakan /livez (liveness) dan /readyz (readiness).
     
     Returns:
         HealthResponse: Status sistem dengan timestamp
     """
-    # Default status
-    db_status = "connected"
-    climatiq_status = "configured"
-    
-    # =========================================================================
-    # Cek koneksi MongoDB
-    # =========================================================================
-    try:
-        db = await get_db()
-        # Ping command untuk test koneksi
-        await db.command('ping')
-    except Exception as e:
-        logger.error(f"Health check database gagal: {e}")
-        db_status = "disconnected"
-    
-    # =========================================================================
-    # Cek konfigurasi Climatiq API
-    # =========================================================================
-    # Cek apakah API key sudah diisi (bukan placeholder)
-    if not settings.climatiq_api_key or settings.climatiq_api_key == "your_climatiq_api_key_here":
-        climatiq_status = "not_configured"
+    db_status = await _cached_db_ping()
     
     # Tentukan overall status
     overall_status = "healthy" if db_status == "connected" else "unhealthy"
@@ -1412,10 +1748,44 @@ async def health_check():
         status=overall_status,
         timestamp=datetime.now(WIB).isoformat(),
         database=db_status,
-        climatiq_api=climatiq_status
+        climatiq_api=CLIMATIQ_STATUS
     )
 
 
+@app.get(
+    "/livez",
+    tags=["Sistem"],
+    summary="Liveness probe"
+)
+async def liveness_probe():
+    """
+    Liveness probe: proses aplikasi hidup dan event loop merespons.
+    
+    Tidak menyentuh database agar gangguan MongoDB tidak membuat
+    container di-restart.
+    """
+    return {"status": "alive"}
+
+
+@app.get(
+    "/readyz",
+    tags=["Sistem"],
+    summary="Readiness probe"
+)
+async def readiness_probe():
+    """
+    Readiness probe: aplikasi siap menerima traffic jika MongoDB terhubung.
+    
+    Raises:
+        HTTPException 503: Jika MongoDB tidak terhubung
+    """
+    db_status = await _cached_db_ping()
+    if db_status != "connected":
+        raise HTTPException(status_code=503, detail="Database tidak terhubung")
+    
+    return {"status": "ready", "database": db_status}
+
+
 # =============================================================================
 # ENDPOINT: CREATE ACTIVITY
 # =============================================================================
@@ -1471,13 +1841,21 @@ async def create_activity(
         # =====================================================================
         # STEP 2: Hitung emisi menggunakan Climatiq API
         # =====================================================================
+        # Tip chain tidak bergantung pada hasil Climatiq, jadi dibaca
+        # bersamaan (tip yang berubah selama menunggu ditangani CAS di STEP 3)
+        db = get_db()
+        collection = db["activity_logs"]
+        
         try:
-            climatiq_data = await climatiq_service.estimate_emission(
-                activity_type=activity.activity_type,
-                distance_km=activity.distance_km,
-                energy_kwh=activity.energy_kwh,
-                weight_kg=activity.weight_kg,
-                money_spent=activity.money_spent
+            climatiq_data, prev_hash = await asyncio.gather(
+                climatiq_service.estimate_emission(
+                    activity_type=activity.activity_type,
+                    distance_km=activity.distance_km,
+                    energy_kwh=activity.energy_kwh,
+                    weight_kg=activity.weight_kg,
+                    money_spent=activity.money_spent
+                ),
+                get_chain_tip(db)
             )
         except ClimatiqAPIError as e:
             # Error dari Climatiq API (key salah, rate limit, dll)
@@ -1495,28 +1873,26 @@ async def create_activity(
         # =====================================================================
         now_str = datetime.now(WIB).isoformat()
         
-        # Ambil hash terakhir dari database untuk membuat chain
-        db = await get_db()
-        collection = db["activity_logs"]
-        
-        # Cari document terakhir berdasarkan _id (descending)
-        last_doc = await collection.find_one(sort=[("_id", -1)])
-        
-        if last_doc:
-            # Ada record sebelumnya, gunakan hash-nya
-            prev_hash = last_doc["current_hash"]
+        # Klaim posisi di chain: hitung hash dari tip, lalu pindahkan tip
+        # secara atomik (compare-and-set). Jika request lain menang lebih
+        # dulu, baca ulang (dan rekonsiliasi) tip lalu ulangi.
+        for _ in range(CHAIN_CLAIM_MAX_ATTEMPTS):
+            current_hash = generate_hash(
+                prev_hash,
+                current_user.user_id,
+                activity.activity_type,
+                emission,
+                now_str
+            )
+            chain_seq = await claim_chain_position(db, prev_hash, current_hash)
+            if chain_seq is not None:
+                break
+            prev_hash = await get_chain_tip(db, refresh=True)
         else:
-            # Ini record pertama (genesis), gunakan hash nol
-            prev_hash = "0" * 64
-        
-        # Generate hash untuk record ini
-        current_hash = generate_hash(
-            prev_hash,
-            current_user.user_id,
-            activity.activity_type,
-            emission,
-            now_str
-        )
+            raise HTTPException(
+                status_code=503,
+                detail="Hash chain sedang sibuk, silakan coba lagi."
+            )
         
         # =====================================================================
         # STEP 4: Simpan ke MongoDB
@@ -1527,8 +1903,13 @@ async def create_activity(
             "emission": emission,
             "emission_unit": "kg CO2e",
             "timestamp": now_str,
+            # Tanggal (WIB) disimpan terpisah agar agregasi per tanggal
+            # tidak perlu mem-parse timestamp
+            "date_str": now_str[:10],
             "previous_hash": prev_hash,
             "current_hash": current_hash,
+            # Posisi di chain; verifikasi mengurutkan record dengan field ini
+            "chain_seq": chain_seq,
             "description": activity.description,
             "climatiq_data": climatiq_data,
             # Parameter aktivitas
@@ -1538,9 +1919,34 @@ async def create_activity(
             "money_spent": activity.money_spent
         }
         
-        result = await collection.insert_one(new_doc)
+        try:
+            result = await collection.insert_one(new_doc)
+        except Exception as e:
+            # Tip hanya dikembalikan jika insert pasti gagal (lihat hashing.py)
+            await release_chain_claim(db, chain_seq, prev_hash, current_hash, e)
+            raise
         new_doc["id"] = str(result.inserted_id)
         
+        try:
+            await _update_dashboard_summary(
+                db, current_user.user_id, activity.activity_type, emission, new_doc["date_str"]
+            )
+        except Exception as e:
+            # Ringkasan yang tertinggal dibangun ulang saat dashboard dibaca
+            logger.warning(f"Failed to update dashboard summary: {e}")
+        
+        await invalidate_user_activity_cache(new_doc["user_id"])
+        
+        # FR-11: Log audit ke Cassandra (hanya masuk antrian, ditulis worker)
+        log_audit(
+            user_id=current_user.user_id,
+            action_type="CREATE",
+            entity="activity",
+            entity_id=new_doc["id"],
+            description="Aktivitas %s dibuat (%.4f kg CO2e)",
+            description_args=(activity.activity_type, emission)
+        )
+        
         logger.info(f"Aktivitas berhasil dibuat: {new_doc['id']}")
         
         # =====================================================================
@@ -1576,90 +1982,226 @@ async def create_activity(
 # ENDPOINT: GET ACTIVITIES (LIST)
 # =============================================================================
 
+async def _query_activities(
+    user_id: Optional[str],
+    page: int,
+    page_size: int,
+    after_id: Optional[str],
+    include_total: bool,
+    verify: bool
+) -> Dict[str, Any]:
+    """
+    Query daftar aktivitas dari MongoDB (lihat get_activities untuk parameter).
+    
+    Returns:
+        Dict berbentuk ActivityListResponse
+    
+    Raises:
+        HTTPException 400: Jika format after_id tidak valid
+    """
+    db = get_db()
+    collection = db["activity_logs"]
+    
+    # Build query filter
+    query = {}
+    if user_id:
+        query["user_id"] = user_id
+    
+    cursor_filter = None
+    if after_id:
+        if not OBJECT_ID_RE.fullmatch(after_id):
+            raise HTTPException(status_code=400, detail="Format after_id tidak valid")
+        cursor_filter = {"_id": {"$lt": ObjectId(after_id)}}
+    
+    # Tahap pengambilan data: ambil satu dokumen ekstra untuk mengetahui
+    # apakah masih ada halaman berikutnya
+    data_stages = []
+    if not after_id:
+        skip = (page - 1) * page_size
+        if skip:
+            data_stages.append({"$skip": skip})
+    data_stages.append({"$limit": page_size + 1})
+    # climatiq_data (bisa beberapa KB per dokumen) tidak dibutuhkan di list,
+    # tersedia lewat GET /api/activities/{id}
+    data_stages.append({"$project": {"climatiq_data": 0}})
+    
+    if include_total:
+        if cursor_filter:
+            data_stages.insert(0, {"$match": cursor_filter})
+        
+        # Count dan data dalam satu round-trip dengan $facet.
+        # $sort diletakkan sebelum $facet karena sub-pipeline $facet tidak
+        # bisa memakai index; index (user_id, _id DESC) melayani $match + $sort
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"_id": -1}},
+            {"$facet": {
+                "data": data_stages,
+                "total": [{"$count": "n"}]
+            }}
+        ]
+        results = await collection.aggregate(pipeline).to_list(length=1)
+        result = results[0] if results else {"data": [], "total": []}
+        docs = result["data"]
+        total = result["total"][0]["n"] if result["total"] else 0
+    else:
+        total = None
+        match = {**query, **cursor_filter} if cursor_filter else query
+        pipeline = [{"$match": match}, {"$sort": {"_id": -1}}] + data_stages
+        docs = await collection.aggregate(pipeline).to_list(length=page_size + 1)
+    
+    next_cursor = None
+    if len(docs) > page_size:
+        docs = docs[:page_size]
+        next_cursor = str(docs[-1]["_id"])
+    
+    # Verifikasi hash (opsional) untuk seluruh halaman dalam satu pass
+    if verify:
+        validity = verify_hashes(docs)
+    else:
+        validity = [None] * len(docs)
+    
+    # Bangun response sebagai dict: data dari database sudah tervalidasi
+    # saat insert, jadi tidak perlu lewat validasi Pydantic per baris
+    activities = []
+    for doc, is_valid in zip(docs, validity):
+        if is_valid is None:
+            hash_status = "unverified"
+        else:
+            hash_status = "valid" if is_valid else "invalid"
+        
+        activities.append({
+            "id": str(doc["_id"]),
+            "user_id": doc["user_id"],
+            "activity_type": doc["activity_type"],
+            "emission": doc["emission"],
+            "emission_unit": doc.get("emission_unit", "kg CO2e"),
+            "timestamp": doc["timestamp"],
+            "previous_hash": doc["previous_hash"],
+            "current_hash": doc["current_hash"],
+            "description": doc.get("description"),
+            "climatiq_data": None,
+            "distance_km": doc.get("distance_km"),
+            "energy_kwh": doc.get("energy_kwh"),
+            "weight_kg": doc.get("weight_kg"),
+            "money_spent": doc.get("money_spent"),
+            "is_valid": is_valid,
+            "hash_status": hash_status
+        })
+    
+    return {
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "next_cursor": next_cursor,
+        "activities": activities
+    }
+
+
+async def _refresh_activities_cache(
+    cache_key: str,
+    user_id: str,
+    page: int,
+    page_size: int,
+    include_total: bool,
+    verify: bool
+):
+    """Background task: perbarui entry cache SWR daftar aktivitas yang stale."""
+    try:
+        result = await _query_activities(user_id, page, page_size, None, include_total, verify)
+        await swr_set(
+            cache_key,
+            orjson.dumps(result),
+            ACTIVITIES_CACHE_FRESH_TTL,
+            ACTIVITIES_CACHE_STALE_TTL
+        )
+    except Exception as e:
+        logger.warning(f"Gagal memperbarui cache aktivitas {cache_key}: {e}")
+
+
 @app.get(
     "/api/activities",
-    response_model=ActivityListResponse,
+    # Response dibangun sebagai dict langsung (tanpa validasi ulang);
+    # model tetap dipakai untuk dokumentasi OpenAPI
+    response_model=None,
+    response_class=ORJSONResponse,
+    responses={200: {"model": ActivityListResponse}},
     tags=["Aktivitas"],
     summary="Daftar aktivitas dengan pagination"
 )
 async def get_activities(
     user_id: str = Query(None, description="Filter berdasarkan user ID"),
-    page: int = Query(1, ge=1, description="Nomor halaman"),
-    page_size: int = Query(10, ge=1, le=1000, description="Jumlah item per halaman (max 1000)")
+    page: int = Query(1, ge=1, description="Nomor halaman (diabaikan jika after_id diisi)"),
+    page_size: int = Query(10, ge=1, le=1000, description="Jumlah item per halaman (max 1000)"),
+    after_id: Optional[str] = Query(None, description="Cursor: ambil aktivitas setelah ID ini (next_cursor dari response sebelumnya)"),
+    include_total: bool = Query(True, description="Hitung total aktivitas (set false untuk pagination cursor yang lebih cepat)"),
+    verify: bool = Query(False, description="Verifikasi hash setiap aktivitas (default: tidak, hash_status='unverified')")
 ):
     """
     Mendapatkan daftar aktivitas dengan pagination dan filter.
     
     Fitur:
     - Filter berdasarkan user_id (opsional)
-    - Pagination dengan page dan page_size
+    - Keyset pagination dengan after_id + next_cursor (direkomendasikan)
+    - Pagination lama dengan page dan page_size tetap didukung
     - Diurutkan dari terbaru ke terlama
     
+    Keyset pagination memakai _id (ObjectId terurut berdasarkan waktu)
+    sehingga halaman dalam tidak perlu skip dokumen satu per satu.
+    
+    Halaman 1-2 per user di-cache di Redis (stale-while-revalidate): data
+    fresh selama 30 detik, setelah itu data lama tetap dikirim sambil
+    diperbarui di background. Cache otomatis tidak dipakai lagi saat user
+    membuat aktivitas baru.
+    
     Args:
         user_id: Filter aktivitas milik user tertentu
-        page: Nomor halaman (mulai dari 1)
-        page_size: Jumlah item per halaman (max 100)
+        page: Nomor halaman (mulai dari 1), hanya untuk mode offset
+        page_size: Jumlah item per halaman (max 1000)
+        after_id: Cursor dari next_cursor response sebelumnya
+        include_total: False untuk melewati perhitungan total ($facet count)
+        verify: True untuk memverifikasi hash setiap record. Tanpa flag ini
+                hash_status = "unverified"; bukti integritas tersedia lewat
+                /api/activities/{id} atau /api/verify-chain
     
     Returns:
-        ActivityListResponse: Daftar aktivitas dengan info pagination
+        Dict berbentuk ActivityListResponse: Daftar aktivitas dengan info pagination
+    
+    Raises:
+        HTTPException 400: Jika format after_id tidak valid
     """
     try:
-        db = await get_db()
-        collection = db["activity_logs"]
-        
-        # Build query filter
-        query = {}
-        if user_id:
-            query["user_id"] = user_id
-        
-        # Hitung total untuk pagination info
-        total = await collection.count_documents(query)
+        # Cache SWR untuk halaman awal per user (yang dimuat dashboard):
+        # key memuat versi data user yang dinaikkan setiap create_activity
+        cache_key = None
+        if user_id and not after_id and page <= ACTIVITIES_CACHE_MAX_PAGE:
+            version = await get_counter(f"act:ver:{user_id}")
+            if version is not None:
+                cache_key = (
+                    f"act:{user_id}:v{version}:{page}:{page_size}:"
+                    f"{int(include_total)}:{int(verify)}"
+                )
+                body, fresh = await swr_get(cache_key)
+                if body is not None:
+                    if not fresh and await acquire_lock(cache_key):
+                        _spawn_background(_refresh_activities_cache(
+                            cache_key, user_id, page, page_size, include_total, verify
+                        ))
+                    return Response(content=body, media_type="application/json")
+        
+        result = await _query_activities(
+            user_id, page, page_size, after_id, include_total, verify
+        )
         
-        # Kalkulasi skip untuk pagination
-        skip = (page - 1) * page_size
+        if cache_key is None:
+            return result
         
-        # Query dengan pagination dan sorting
-        cursor = collection.find(query).sort("_id", -1).skip(skip).limit(page_size)
-        docs = await cursor.to_list(length=page_size)
-        
-        # Convert ke response model dengan verifikasi hash
-        activities = []
-        for doc in docs:
-            # Verifikasi hash untuk setiap record
-            try:
-                is_valid = verify_hash(doc)
-                hash_status = "valid" if is_valid else "invalid"
-            except Exception as e:
-                logger.warning(f"Gagal verifikasi hash untuk {doc['_id']}: {e}")
-                is_valid = None
-                hash_status = "unverified"
-            
-            activities.append(ActivityResponse(
-                id=str(doc["_id"]),
-                user_id=doc["user_id"],
-                activity_type=doc["activity_type"],
-                emission=doc["emission"],
-                emission_unit=doc.get("emission_unit", "kg CO2e"),
-                timestamp=doc["timestamp"],
-                previous_hash=doc["previous_hash"],
-                current_hash=doc["current_hash"],
-                description=doc.get("description"),
-                climatiq_data=ClimatiqData(**doc["climatiq_data"]) if doc.get("climatiq_data") else None,
-                distance_km=doc.get("distance_km"),
-                energy_kwh=doc.get("energy_kwh"),
-                weight_kg=doc.get("weight_kg"),
-                money_spent=doc.get("money_spent"),
-                is_valid=is_valid,
-                hash_status=hash_status
-            ))
-        
-        return ActivityListResponse(
-            total=total,
-            page=page,
-            page_size=page_size,
-            activities=activities
-        )
+        body = orjson.dumps(result)
+        await swr_set(cache_key, body, ACTIVITIES_CACHE_FRESH_TTL, ACTIVITIES_CACHE_STALE_TTL)
+        return Response(content=body, media_type="application/json")
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error mengambil aktivitas: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error internal: {str(e)}")
@@ -1690,14 +2232,13 @@ async def get_activity(activity_id: str):
         HTTPException 404: Jika aktivitas tidak ditemukan
     """
     try:
-        db = await get_db()
+        db = get_db()
         collection = db["activity_logs"]
         
         # Validasi format ObjectId
-        try:
-            obj_id = ObjectId(activity_id)
-        except Exception:
+        if not OBJECT_ID_RE.fullmatch(activity_id):
             raise HTTPException(status_code=400, detail="Format ID tidak valid")
+        obj_id = ObjectId(activity_id)
         
         # Query database
         doc = await collection.find_one({"_id": obj_id})
@@ -1819,14 +2360,17 @@ async def estimate_emission(request: EmissionEstimateRequest):
 )
 async def verify_hash_chain(
     user_id: Optional[str] = Query(None, description="Filter verifikasi untuk user tertentu"),
+    full: bool = Query(False, description="Abaikan checkpoint, verifikasi seluruh chain dari genesis"),
     current_user: TokenData = Depends(get_current_active_user)  # ← Sudah benar TokenData
 ):
     """
     Memverifikasi integritas hash chain.
     Bisa difilter berdasarkan user_id atau verifikasi semua (admin only).
+    Verifikasi seluruh chain melanjutkan dari checkpoint terakhir kecuali
+    full=true (audit penuh).
     """
     try:
-        db = await get_db()
+        db = get_db()
         
         # Jika ada user_id parameter, verifikasi hanya untuk user tersebut
         if user_id:
@@ -1840,7 +2384,7 @@ async def verify_hash_chain(
             # Verifikasi seluruh chain (hanya admin)
             if current_user.role != "admin":
                 raise HTTPException(status_code=403, detail="Hanya admin yang bisa verifikasi seluruh chain")
-            result = await verify_chain(db)
+            result = await verify_chain(db, force_full=full)
         
         return HashVerificationResponse(
             valid=result["valid"],
@@ -1859,22 +2403,8 @@ async def verify_hash_chain(
 # ENDPOINT: GET ACTIVITY TYPES
 # =============================================================================
 
-@app.get(
-    "/api/activity-types",
-    tags=["Referensi"],
-    summary="Daftar tipe aktivitas yang tersedia"
-)
-async def get_activity_types():
-    """
-    Mendapatkan daftar semua tipe aktivitas yang bisa digunakan.
-    
-    Returns:
-        Dict dengan:
-        - total: Jumlah total tipe aktivitas
-        - categories: Tipe aktivitas dikelompokkan per kategori
-        - all_activities: Daftar semua tipe aktivitas
-    """
-    # Ambil mapping dari ActivityMapper
+def _build_activity_types_response() -> Dict[str, Any]:
+    """Bangun payload /api/activity-types dari ActivityMapper."""
     activities = ActivityMapper.get_all_activities()
     transport = ActivityMapper.get_transport_activities()
     energy = ActivityMapper.get_energy_activities()
@@ -1895,6 +2425,32 @@ async def get_activity_types():
     }
 
 
+# Mapping aktivitas statis selama proses berjalan, jadi payload dan
+# JSON-nya cukup dibuat sekali saat import
+ACTIVITY_TYPES_RESPONSE = _build_activity_types_response()
+ACTIVITY_TYPES_JSON = orjson.dumps(ACTIVITY_TYPES_RESPONSE)
+
+
+@app.get(
+    "/api/activity-types",
+    tags=["Referensi"],
+    summary="Daftar tipe aktivitas yang tersedia"
+)
+async def get_activity_types():
+    """
+    Mendapatkan daftar semua tipe aktivitas yang bisa digunakan.
+    
+    Response sudah di-serialize saat startup (lihat ACTIVITY_TYPES_JSON).
+    
+    Returns:
+        Dict dengan:
+        - total: Jumlah total tipe aktivitas
+        - categories: Tipe aktivitas dikelompokkan per kategori
+        - all_activities: Daftar semua tipe aktivitas
+    """
+    return Response(content=ACTIVITY_TYPES_JSON, media_type="application/json")
+
+
 # =============================================================================
 # ENDPOINT: SEARCH EMISSION FACTORS
 # =============================================================================
@@ -1954,102 +2510,195 @@ async def search_emission_factors(
 # ENDPOINT DASHBOARD (MongoDB & Cassandra)
 # ==========================================
 
-@app.get("/api/dashboard/stats")
-async def get_dashboard_stats(current_user: TokenData = Depends(get_current_active_user)):
-    """Mendapatkan statistik untuk dashboard charts (MongoDB)."""
-    user_id = current_user.user_id
-    logger.info(f"Dashboard stats request for user: {user_id}")
+# TTL cadangan cache statistik dashboard jika invalidasi terlewat
+DASHBOARD_STATS_CACHE_TTL = 300
+
+# Ringkasan dashboard per user (pie per kategori, line per tanggal) yang
+# diperbarui dengan $inc di create_activity. Field "count" dipakai untuk
+# mendeteksi ringkasan yang tertinggal (data lama, write yang gagal) dan
+# membangunnya ulang dari activity_logs.
+DASHBOARD_SUMMARY_COLLECTION = "dashboard_summary"
+
+
+async def _update_dashboard_summary(db, user_id: str, activity_type: str, emission: float, date_str: str):
+    """Tambahkan satu aktivitas ke ringkasan dashboard user."""
+    await db[DASHBOARD_SUMMARY_COLLECTION].update_one(
+        {"_id": user_id},
+        {"$inc": {
+            f"pie.{activity_type}": emission,
+            f"line.{date_str}": emission,
+            "count": 1
+        }},
+        upsert=True
+    )
+
+
+async def _aggregate_dashboard_summary(db, user_id: str) -> Dict[str, Any]:
+    """Bangun ringkasan dashboard user dari seluruh activity_logs miliknya."""
+    # Agregasi di MongoDB: hanya hasil per kategori dan per tanggal
+    # yang dikirim, bukan seluruh dokumen aktivitas
+    emission_value = {"$toDouble": {"$ifNull": ["$emission", 0]}}
+    pipeline = [
+        # user_id selalu disimpan sebagai string (lihat init_db.py untuk
+        # migrasi data lama), sehingga match langsung memakai index
+        {"$match": {"user_id": user_id}},
+        # $facet menerima dokumen utuh (termasuk climatiq_data) jika tidak
+        # dipangkas; cukup tiga field yang dipakai chart
+        {"$project": {"_id": 0, "activity_type": 1, "emission": 1, "timestamp": 1, "date_str": 1}},
+        {"$facet": {
+            "pie": [
+                {"$group": {
+                    "_id": {"$ifNull": ["$activity_type", "Other"]},
+                    "sum": {"$sum": emission_value}
+                }}
+            ],
+            "line": [
+                # Tanggal (YYYY-MM-DD): field date_str; dokumen lama tanpa
+                # date_str memakai 10 karakter pertama timestamp ISO string,
+                # atau tanggal UTC untuk timestamp bertipe Date
+                {"$group": {
+                    "_id": {"$ifNull": ["$date_str", {"$switch": {
+                        "branches": [
+                            {"case": {"$eq": [{"$type": "$timestamp"}, "string"]},
+                             "then": {"$substrCP": ["$timestamp", 0, 10]}},
+                            {"case": {"$eq": [{"$type": "$timestamp"}, "date"]},
+                             "then": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}}
+                        ],
+                        "default": ""
+                    }}]},
+                    "sum": {"$sum": emission_value}
+                }},
+                {"$match": {"_id": {"$ne": ""}}}
+            ],
+            "count": [{"$count": "n"}]
+        }}
+    ]
+    results = await db["activity_logs"].aggregate(pipeline).to_list(length=1)
+    result = results[0] if results else {"pie": [], "line": [], "count": []}
     
-    try:
-        # Get database instance
-        db = await get_db()
-        activities_collection = db["activity_logs"]
-        
-        # Convert user_id to ObjectId for comparison
-        try:
-            user_obj = ObjectId(user_id)
-        except:
-            user_obj = user_id
-        
-        # Find all activities for this user
-        activities_cursor = activities_collection.find({
-            "$or": [{"user_id": user_id}, {"user_id": user_obj}]
-        })
-        activities = await activities_cursor.to_list(length=None)
-        
-        logger.info(f"Found {len(activities)} activities for user {user_id}")
-        
-        # Process data manually in Python
-        pie_data = {}  # Format: {'Transport': 100, 'Electricity': 50}
-        line_data = {}  # Format: {'2026-01-04': 150}
-        
-        for act in activities:
-            # Get category & emission
-            activity_type = act.get("activity_type", "Other")
-            emission = float(act.get("emission", 0))
-            
-            # Get date (format YYYY-MM-DD)
-            timestamp_raw = act.get("timestamp")
-            if isinstance(timestamp_raw, str):
-                date_str = timestamp_raw.split("T")[0]
-            else:
-                date_str = timestamp_raw.strftime("%Y-%m-%d") if timestamp_raw else ""
-            
-            # Add to pie data
-            pie_data[activity_type] = pie_data.get(activity_type, 0) + emission
-            
-            # Add to line data
-            if date_str:
-                line_data[date_str] = line_data.get(date_str, 0) + emission
-        
-        # Sort line chart data by date
-        sorted_dates = sorted(line_data.keys())
-        
-        return {
-            "pie_chart": {
-                "labels": list(pie_data.keys()),
-                "data": list(pie_data.values())
-            },
-            "line_chart": {
-                "labels": sorted_dates,
-                "data": [line_data[d] for d in sorted_dates]
-            }
+    return {
+        "_id": user_id,
+        "pie": {row["_id"]: row["sum"] for row in result["pie"]},
+        "line": {row["_id"]: row["sum"] for row in result["line"]},
+        "count": result["count"][0]["n"] if result["count"] else 0
+    }
+
+
+async def _compute_dashboard_stats(user_id: str) -> Dict[str, Any]:
+    """Hitung data chart dashboard (pie per kategori, line per tanggal) untuk user."""
+    # Get database instance
+    db = get_db()
+    summary_collection = db[DASHBOARD_SUMMARY_COLLECTION]
+    
+    # count_documents memakai index (user_id, ...) tanpa membaca dokumen
+    summary, total_activities = await asyncio.gather(
+        summary_collection.find_one({"_id": user_id}),
+        db["activity_logs"].count_documents({"user_id": user_id})
+    )
+    
+    if summary is None or summary.get("count") != total_activities:
+        logger.info(f"Rebuilding dashboard summary for user {user_id}")
+        summary = await _aggregate_dashboard_summary(db, user_id)
+        await summary_collection.replace_one({"_id": user_id}, summary, upsert=True)
+    
+    logger.info(f"Found {total_activities} activities for user {user_id}")
+    
+    pie = sorted(summary.get("pie", {}).items())
+    line = sorted(summary.get("line", {}).items())
+    return {
+        "pie_chart": {
+            "labels": [label for label, _ in pie],
+            "data": [value for _, value in pie]
+        },
+        "line_chart": {
+            "labels": [label for label, _ in line],
+            "data": [value for _, value in line]
         }
-        
-    except Exception as e:
-        logger.error(f"Error getting dashboard stats: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    }
 
 
-@app.get("/api/dashboard/logs")
-async def get_dashboard_logs_endpoint(current_user: TokenData = Depends(get_current_active_user)):
-    """Mendapatkan audit logs untuk dashboard (Cassandra)."""
-    user_id = current_user.user_id
-    logger.info(f"Dashboard logs request for user: {user_id}")
+async def _dashboard_stats_impl(user_id: str) -> Dict[str, Any]:
+    """Statistik chart dashboard user (MongoDB), lewat cache Redis jika ada."""
+    # Cache per user; key memuat versi data aktivitas user sehingga
+    # otomatis tidak dipakai lagi setelah create_activity
+    version = await get_counter(f"act:ver:{user_id}")
+    if version is None:
+        return await _compute_dashboard_stats(user_id)
     
+    return await cached(
+        f"dashboard:stats:{user_id}:v{version}",
+        DASHBOARD_STATS_CACHE_TTL,
+        lambda: _compute_dashboard_stats(user_id)
+    )
+
+
+async def _dashboard_logs_impl(user_id: str, email: str) -> List[Dict[str, Any]]:
+    """10 audit log terbaru user (Cassandra). List kosong jika gagal."""
     try:
-        # Get audit logs from Cassandra service
-        all_logs = get_audit_logs(user_id=user_id, limit=100)
+        # Partition user sudah terurut activity_time DESC; cukup ambil 10
+        all_logs = await get_audit_logs(user_id=user_id, limit=10)
         
         # Format logs for frontend
         logs = []
         for log in all_logs:
             logs.append({
-                "user": current_user.email,  # Gunakan email dari token
+                "user": email,  # Gunakan email dari token
                 "action": log.get("action_type", "UNKNOWN"),
                 "time": log.get("activity_time"),
                 "status": "Success"
             })
         
-        # Sort by time (newest first)
-        logs.sort(key=lambda x: x['time'] if x['time'] else "", reverse=True)
-        
         logger.info(f"Found {len(logs)} audit logs for user {user_id}")
-        return {"logs": logs[:10]}  # Return last 10 logs
+        return logs
         
     except Exception as e:
         logger.error(f"Error getting audit logs: {e}", exc_info=True)
-        return {"logs": []}  # Return empty array on error instead of raising
+        return []  # Return empty array on error instead of raising
+
+
+@app.get("/api/dashboard")
+async def get_dashboard(current_user: TokenData = Depends(get_current_active_user)):
+    """
+    Mendapatkan statistik chart dan audit logs dashboard dalam satu request.
+    
+    Query MongoDB dan Cassandra dijalankan bersamaan.
+    """
+    user_id = current_user.user_id
+    logger.info(f"Dashboard request for user: {user_id}")
+    
+    try:
+        stats, logs = await asyncio.gather(
+            _dashboard_stats_impl(user_id),
+            _dashboard_logs_impl(user_id, current_user.email)
+        )
+        return {"stats": stats, "logs": logs}
+        
+    except Exception as e:
+        logger.error(f"Error getting dashboard: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@app.get("/api/dashboard/stats")
+async def get_dashboard_stats(current_user: TokenData = Depends(get_current_active_user)):
+    """Mendapatkan statistik untuk dashboard charts (MongoDB)."""
+    user_id = current_user.user_id
+    logger.info(f"Dashboard stats request for user: {user_id}")
+    
+    try:
+        return await _dashboard_stats_impl(user_id)
+        
+    except Exception as e:
+        logger.error(f"Error getting dashboard stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+
+@app.get("/api/dashboard/logs")
+async def get_dashboard_logs_endpoint(current_user: TokenData = Depends(get_current_active_user)):
+    """Mendapatkan audit logs untuk dashboard (Cassandra)."""
+    user_id = current_user.user_id
+    logger.info(f"Dashboard logs request for user: {user_id}")
+    
+    return {"logs": await _dashboard_logs_impl(user_id, current_user.email)}
 
 # =============================================================================
 # MAIN: Untuk menjalankan dengan Python langsung
@@ -2065,6 +2714,9 @@ if __name__ == "__main__":
         host=settings.app_host,
         port=settings.app_port,
         reload=settings.is_development,
-        log_level=settings.log_level.lower()
+        log_level=settings.log_level.lower(),
+        # uvloop + httptools terpasang lewat uvicorn[standard]
+        loop="uvloop",
+        http="httptools"
     )
 
@@ -15,14 +15,18 @@ Version: 1.0.0
 """
 
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Union
+from typing import Dict, Optional, Tuple, Union
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
+import jwt
+from jwt import InvalidTokenError as JWTError
 from pydantic import BaseModel
 from config import settings
 from database import get_db
+import asyncio
+import hashlib
 import logging
+import time
 
 # Timezone WIB (UTC+7)
 WIB = timezone(timedelta(hours=7))
@@ -32,27 +36,31 @@ logger = logging.getLogger(__name__)
 # =============================================================================
 # PASSWORD HASHING
 # =============================================================================
-# Menggunakan bcrypt untuk hashing password secara aman
+# Menggunakan bcrypt untuk hashing password secara aman. bcrypt sengaja
+# lambat (~100ms pada cost 12), jadi dijalankan di thread pool agar tidak
+# menahan event loop; bcrypt melepas GIL selama hashing.
 
 import bcrypt
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifikasi password plain text dengan hash."""
     password_bytes = plain_password.encode('utf-8')
     hash_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(password_bytes, hash_bytes)
+    return await asyncio.to_thread(bcrypt.checkpw, password_bytes, hash_bytes)
 
 
-def get_password_hash(password: str) -> str:
+async def get_password_hash(password: str) -> str:
     """
     Hash password menggunakan bcrypt.
     
-    Bcrypt akan otomatis menghandle password panjang.
+    Bcrypt akan otomatis menghandle password panjang. Cost factor diambil
+    dari settings.bcrypt_rounds; hash lama tetap bisa diverifikasi karena
+    cost tersimpan di dalam hash.
     """
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password_bytes, salt)
+    salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
+    hashed = await asyncio.to_thread(bcrypt.hashpw, password_bytes, salt)
     return hashed.decode('utf-8')
 
 
@@ -102,16 +110,59 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+# =============================================================================
+# JWT VERIFICATION CACHE
+# =============================================================================
+# Hasil decode token disimpan sebentar agar request berikutnya dengan token
+# yang sama tidak perlu verifikasi signature ulang. Key berupa digest SHA-256
+# dari token (token mentah tidak disimpan di memori cache).
+
+JWT_CACHE_TTL_SECONDS = 30
+JWT_CACHE_MAXSIZE = 10_000
+
+# Format: {token_digest: (expires_at_monotonic, TokenData)}
+_jwt_cache: Dict[bytes, Tuple[float, "TokenData"]] = {}
+
+
+def _token_cache_key(token: str) -> bytes:
+    """Key cache untuk token: 16 byte pertama digest SHA-256."""
+    return hashlib.sha256(token.encode("utf-8")).digest()[:16]
+
+
+def invalidate_user_tokens(user_id: str) -> None:
+    """
+    Hapus semua token milik user dari cache verifikasi.
+    
+    Dipanggil saat password diubah atau akun dihapus, agar token lama
+    diverifikasi ulang pada request berikutnya.
+    """
+    for key in [k for k, (_, data) in _jwt_cache.items() if data.user_id == user_id]:
+        _jwt_cache.pop(key, None)
+
+
 def decode_access_token(token: str) -> Optional[TokenData]:
     """
     Decode dan validasi JWT token.
     
+    Hasil decode yang valid di-cache selama JWT_CACHE_TTL_SECONDS
+    (tidak melewati waktu exp token).
+    
     Args:
         token: JWT token string
     
     Returns:
         TokenData jika valid, None jika tidak valid
     """
+    cache_key = _token_cache_key(token)
+    now = time.monotonic()
+    
+    cached = _jwt_cache.get(cache_key)
+    if cached is not None:
+        expires_at, token_data = cached
+        if now < expires_at:
+            return token_data
+        del _jwt_cache[cache_key]
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("user_id")
@@ -121,10 +172,24 @@ def decode_access_token(token: str) -> Optional[TokenData]:
         if user_id is None or email is None:
             return None
         
-        return TokenData(user_id=user_id, email=email, role=role)
+        token_data = TokenData(user_id=user_id, email=email, role=role)
     except JWTError as e:
         logger.warning(f"JWT decode error: {e}")
         return None
+    
+    # TTL cache dibatasi oleh sisa umur token
+    ttl = JWT_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if exp is not None:
+        ttl = min(ttl, exp - time.time())
+    
+    if ttl > 0:
+        if len(_jwt_cache) >= JWT_CACHE_MAXSIZE:
+            # Buang entry tertua (dict mempertahankan urutan insert)
+            _jwt_cache.pop(next(iter(_jwt_cache)))
+        _jwt_cache[cache_key] = (now + ttl, token_data)
+    
+    return token_data
 
 
 # =============================================================================
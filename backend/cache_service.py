@@ -0,0 +1,313 @@
+"""
+=============================================================================
+REDIS CACHE SERVICE
+=============================================================================
+Service cache berbasis Redis untuk response yang jarang berubah, misalnya
+data Climate TRACE (negara, sektor, ranking).
+
+Redis bersifat opsional:
+- Jika REDIS_URL kosong, cache dinonaktifkan dan data selalu diambil langsung
+- Jika Redis tidak bisa dihubungi, request tetap dilayani tanpa cache
+
+Penggunaan:
+    from cache_service import cached
+
+    data = await cached("ct:countries", 86400, lambda: fetch_countries())
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+import orjson
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Lock single-flight: hanya satu request yang mengambil data saat cache miss
+LOCK_TTL_SECONDS = 5
+LOCK_WAIT_INTERVAL = 0.1
+LOCK_WAIT_ATTEMPTS = 30
+
+# Global client variable
+_redis_client = None
+
+# Referensi task refresh stale-while-revalidate agar tidak di-garbage-collect
+_refresh_tasks: set = set()
+
+
+def get_redis_client():
+    """Get or create Redis client. Returns None jika Redis tidak dikonfigurasi."""
+    global _redis_client
+
+    if _redis_client is None and settings.redis_url:
+        try:
+            import redis.asyncio as redis
+
+            _redis_client = redis.from_url(
+                settings.redis_url,
+                socket_connect_timeout=1,
+                socket_timeout=1
+            )
+            logger.info(f"Redis cache enabled at {settings.redis_url}")
+        except Exception as e:
+            logger.error(f"Failed to create Redis client: {e}")
+            return None
+
+    return _redis_client
+
+
+async def close_redis_client():
+    """Tutup koneksi Redis. Dipanggil saat shutdown aplikasi."""
+    global _redis_client
+
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
+
+
+async def _get_json(client, key: str) -> Optional[Any]:
+    """Ambil dan decode JSON dari Redis, None jika tidak ada."""
+    raw = await client.get(key)
+    if raw is None:
+        return None
+    return orjson.loads(raw)
+
+
+async def cached(
+    key: str,
+    ttl: int,
+    coro_factory: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Ambil data dari cache Redis, atau panggil coro_factory jika miss.
+
+    Saat cache miss, hanya request yang mendapat lock (SET NX EX) yang
+    memanggil upstream; request lain menunggu hasilnya muncul di cache.
+    Jika menunggu terlalu lama, request memanggil upstream sendiri.
+
+    Args:
+        key: Key cache (contoh: "ct:/v7/definitions/countries")
+        ttl: Masa berlaku cache dalam detik
+        coro_factory: Fungsi tanpa argumen yang mengembalikan coroutine
+
+    Returns:
+        Data dari cache atau hasil coro_factory()
+    """
+    client = get_redis_client()
+    if client is None:
+        return await coro_factory()
+
+    lock_key = f"lock:{key}"
+    got_lock = False
+    try:
+        value = await _get_json(client, key)
+        if value is not None:
+            return value
+
+        got_lock = await client.set(lock_key, 1, nx=True, ex=LOCK_TTL_SECONDS)
+        if not got_lock:
+            for _ in range(LOCK_WAIT_ATTEMPTS):
+                await asyncio.sleep(LOCK_WAIT_INTERVAL)
+                value = await _get_json(client, key)
+                if value is not None:
+                    return value
+                # Pemegang lock gagal dan sudah melepasnya: tidak perlu
+                # menunggu sampai batas percobaan habis
+                if not await client.exists(lock_key):
+                    break
+    except Exception as e:
+        logger.warning(f"Redis cache unavailable for {key}: {e}")
+        return await coro_factory()
+
+    try:
+        value = await coro_factory()
+    except Exception:
+        # Lepas lock agar request lain langsung memanggil upstream sendiri,
+        # bukan menunggu lock kedaluwarsa
+        if got_lock:
+            try:
+                await client.delete(lock_key)
+            except Exception as e:
+                logger.warning(f"Failed to release lock for {key}: {e}")
+        raise
+
+    try:
+        await client.set(key, orjson.dumps(value), ex=ttl)
+        await client.delete(lock_key)
+    except Exception as e:
+        logger.warning(f"Failed to store {key} in Redis cache: {e}")
+
+    return value
+
+
+async def get_cached_json(key: str) -> Optional[Any]:
+    """
+    Ambil nilai JSON dari Redis tanpa fallback.
+
+    Returns:
+        Nilai yang tersimpan, atau None jika tidak ada / Redis tidak tersedia
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+
+    try:
+        return await _get_json(client, key)
+    except Exception as e:
+        logger.warning(f"Redis cache unavailable for {key}: {e}")
+        return None
+
+
+async def set_cached_json(key: str, value: Any, ttl: int) -> bool:
+    """
+    Simpan nilai JSON ke Redis dengan masa berlaku.
+
+    Returns:
+        True jika tersimpan, False jika Redis tidak tersedia
+    """
+    client = get_redis_client()
+    if client is None:
+        return False
+
+    try:
+        await client.set(key, orjson.dumps(value), ex=ttl)
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to store {key} in Redis cache: {e}")
+        return False
+
+
+async def get_counter(key: str) -> Optional[int]:
+    """
+    Ambil nilai counter (misal versi data per user).
+
+    Returns:
+        Nilai counter (0 jika belum ada), atau None jika Redis tidak tersedia
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+
+    try:
+        value = await client.get(key)
+        return int(value) if value is not None else 0
+    except Exception as e:
+        logger.warning(f"Redis cache unavailable for {key}: {e}")
+        return None
+
+
+async def incr_counter(key: str):
+    """Naikkan counter; dipakai untuk invalidasi cache berbasis versi."""
+    client = get_redis_client()
+    if client is None:
+        return
+
+    try:
+        await client.incr(key)
+    except Exception as e:
+        logger.warning(f"Failed to increment {key} in Redis: {e}")
+
+
+async def swr_get(key: str) -> Tuple[Optional[bytes], bool]:
+    """
+    Ambil response mentah dari cache stale-while-revalidate.
+
+    Returns:
+        Tuple (body atau None, masih fresh?). Body yang tidak fresh tetap
+        boleh dikirim ke client sambil diperbarui di background.
+    """
+    client = get_redis_client()
+    if client is None:
+        return None, False
+
+    try:
+        body, fresh = await client.mget(key, f"fresh:{key}")
+        return body, fresh is not None
+    except Exception as e:
+        logger.warning(f"Redis cache unavailable for {key}: {e}")
+        return None, False
+
+
+async def swr_set(key: str, body: bytes, fresh_ttl: int, stale_ttl: int):
+    """
+    Simpan response mentah untuk cache stale-while-revalidate.
+
+    Args:
+        key: Key cache
+        body: Response yang sudah di-serialize
+        fresh_ttl: Lama data dianggap fresh (detik)
+        stale_ttl: Lama data masih boleh dikirim walau stale (detik)
+    """
+    client = get_redis_client()
+    if client is None:
+        return
+
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.set(key, body, ex=stale_ttl)
+            pipe.set(f"fresh:{key}", 1, ex=fresh_ttl)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to store {key} in Redis cache: {e}")
+
+
+async def acquire_lock(key: str, ttl: int = LOCK_TTL_SECONDS) -> bool:
+    """
+    Ambil lock sederhana (SET NX EX) agar hanya satu proses yang
+    memperbarui cache. Lock dilepas otomatis setelah ttl detik.
+    """
+    client = get_redis_client()
+    if client is None:
+        return False
+
+    try:
+        return bool(await client.set(f"lock:{key}", 1, nx=True, ex=ttl))
+    except Exception as e:
+        logger.warning(f"Redis cache unavailable for lock {key}: {e}")
+        return False
+
+
+async def _refresh_swr(key: str, fresh_ttl: int, stale_ttl: int, coro_factory):
+    """Ambil ulang data upstream dan simpan ke cache stale-while-revalidate."""
+    try:
+        value = await coro_factory()
+        await swr_set(key, orjson.dumps(value), fresh_ttl, stale_ttl)
+    except Exception as e:
+        logger.warning(f"Background refresh failed for {key}: {e}")
+
+
+async def swr_cached(
+    key: str,
+    fresh_ttl: int,
+    stale_ttl: int,
+    coro_factory: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Seperti cached(), tetapi data yang sudah lewat fresh_ttl tetap dikirim
+    (sampai stale_ttl) sambil diperbarui satu task di background. Client
+    tidak pernah menunggu upstream selama data masih ada di cache.
+
+    Args:
+        key: Key cache
+        fresh_ttl: Lama data dianggap fresh (detik)
+        stale_ttl: Lama data masih boleh dikirim walau stale (detik)
+        coro_factory: Fungsi tanpa argumen yang mengembalikan coroutine
+
+    Returns:
+        Data dari cache atau hasil coro_factory()
+    """
+    body, fresh = await swr_get(key)
+    if body is not None:
+        if not fresh and await acquire_lock(key):
+            task = asyncio.create_task(
+                _refresh_swr(key, fresh_ttl, stale_ttl, coro_factory)
+            )
+            _refresh_tasks.add(task)
+            task.add_done_callback(_refresh_tasks.discard)
+        return orjson.loads(body)
+
+    value = await coro_factory()
+    await swr_set(key, orjson.dumps(value), fresh_ttl, stale_ttl)
+    return value
@@ -12,11 +12,15 @@ Keyspace: eco_logs
 Table: activity_audit
 """
 
-import uuid
+import asyncio
+import threading
+import time
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import logging
 
+from cassandra.util import uuid_from_time
+
 # Timezone WIB (UTC+7)
 WIB = timezone(timedelta(hours=7))
 
@@ -24,31 +28,297 @@ logger = logging.getLogger(__name__)
 
 # Global session variable
 _cassandra_session = None
+# Koneksi bisa dibuka dari thread executor dan dari request secara bersamaan
+_session_lock = threading.Lock()
+
+# Setelah connect gagal, percobaan berikutnya ditunda selama interval ini
+# agar setiap request tidak menunggu timeout koneksi lagi
+CASSANDRA_CONNECT_RETRY_INTERVAL = 30.0
+_last_connect_failure: Optional[float] = None
+
+# Thread driver untuk memproses response execute_async (default driver: 2)
+CASSANDRA_EXECUTOR_THREADS = 8
 
 
 def get_cassandra_session():
     """Get or create Cassandra session."""
-    global _cassandra_session
+    if _cassandra_session is not None:
+        return _cassandra_session
+    
+    with _session_lock:
+        return _connect_cassandra()
+
+
+def _connect_cassandra():
+    """Buat session Cassandra jika belum ada (dipanggil dengan _session_lock)."""
+    global _cassandra_session, _last_connect_failure
     
     if _cassandra_session is None:
+        if (_last_connect_failure is not None
+                and time.monotonic() - _last_connect_failure < CASSANDRA_CONNECT_RETRY_INTERVAL):
+            return None
+        
         try:
             from cassandra.cluster import Cluster
             from cassandra.auth import PlainTextAuthProvider
+            from cassandra.policies import ExponentialReconnectionPolicy
             import os
             
             cassandra_host = os.environ.get("CASSANDRA_HOST", "cassandra")
             cassandra_port = int(os.environ.get("CASSANDRA_PORT", "9042"))
             
-            cluster = Cluster([cassandra_host], port=cassandra_port)
+            cluster = Cluster(
+                [cassandra_host],
+                port=cassandra_port,
+                protocol_version=4,
+                executor_threads=CASSANDRA_EXECUTOR_THREADS,
+                # Node yang putus dihubungkan ulang oleh driver di background
+                reconnection_policy=ExponentialReconnectionPolicy(1.0, 60.0)
+            )
             _cassandra_session = cluster.connect('eco_logs')
+            _last_connect_failure = None
             logger.info(f"Connected to Cassandra at {cassandra_host}:{cassandra_port}")
         except Exception as e:
+            _last_connect_failure = time.monotonic()
             logger.error(f"Failed to connect to Cassandra: {e}")
             return None
     
     return _cassandra_session
 
 
+# =============================================================================
+# AUDIT QUEUE
+# =============================================================================
+# log_audit() hanya memasukkan data mentah ke antrian. Formatting deskripsi
+# dan penulisan ke Cassandra dikerjakan worker background, sehingga tidak
+# menambah latency response endpoint.
+
+AUDIT_QUEUE_MAXSIZE = 10000
+AUDIT_BATCH_SIZE = 100
+
+# Setiap audit ditulis ke dua tabel:
+# - activity_audit: partition per user (riwayat satu user)
+# - activity_audit_by_time: partition per hari UTC (log terbaru semua user,
+#   sudah terurut activity_time DESC tanpa ALLOW FILTERING)
+AUDIT_BUCKET_LOOKBACK_DAYS = 30
+
+INSERT_AUDIT_QUERY = """
+INSERT INTO activity_audit 
+(user_id, activity_time, audit_id, action_type, entity, entity_id, changes, ip_address, description)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_AUDIT_BY_TIME_QUERY = """
+INSERT INTO activity_audit_by_time 
+(user_id, activity_time, audit_id, action_type, entity, entity_id, changes, ip_address, description, day_bucket)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_audit_queue: Optional[asyncio.Queue] = None
+_audit_worker_task: Optional[asyncio.Task] = None
+
+# Semua query audit di-prepare sekali per proses: coordinator menyimpan
+# hasil parse, execute berikutnya hanya mengirim ID statement + nilai
+AUDIT_SELECT_COLUMNS = """
+SELECT user_id, activity_time, audit_id, action_type, entity, entity_id, 
+       changes, ip_address, description 
+"""
+
+AUDIT_QUERIES = {
+    "insert": INSERT_AUDIT_QUERY,
+    "insert_by_time": INSERT_AUDIT_BY_TIME_QUERY,
+    "by_user": AUDIT_SELECT_COLUMNS + "FROM activity_audit WHERE user_id = ? LIMIT ?",
+    "by_user_paged": AUDIT_SELECT_COLUMNS + "FROM activity_audit WHERE user_id = ?",
+    "by_day": AUDIT_SELECT_COLUMNS + "FROM activity_audit_by_time WHERE day_bucket = ? LIMIT ?",
+    "count": "SELECT COUNT(*) FROM activity_audit",
+}
+
+_prepared_statements: Dict[str, object] = {}
+
+
+def _get_prepared(session, name: str):
+    """Ambil prepared statement audit berdasarkan nama (prepare jika belum)."""
+    statement = _prepared_statements.get(name)
+    if statement is None:
+        statement = session.prepare(AUDIT_QUERIES[name])
+        _prepared_statements[name] = statement
+    return statement
+
+
+def prepare_audit_statements():
+    """Buka session dan prepare semua query audit jika Cassandra tersedia (blocking)."""
+    session = get_cassandra_session()
+    if session is None:
+        return
+    
+    for name in AUDIT_QUERIES:
+        try:
+            _get_prepared(session, name)
+        except Exception as e:
+            logger.error(f"Failed to prepare audit query '{name}': {e}")
+
+
+def _audit_day_bucket(activity_time: datetime) -> str:
+    """Partition key activity_audit_by_time: tanggal UTC (YYYY-MM-DD)."""
+    return activity_time.astimezone(timezone.utc).date().isoformat()
+
+
+def _format_audit_row(item: tuple) -> tuple:
+    """Ubah item antrian menjadi parameter INSERT (formatting deskripsi di sini)."""
+    (user_id, activity_time, action_type, entity, entity_id,
+     changes, ip_address, description, description_args) = item
+    
+    if description_args:
+        description = description % description_args
+    
+    # audit_id berbasis waktu (UUID v1): Cassandra mengurutkan UUID v1
+    # menurut timestamp-nya, sehingga entry dengan activity_time yang sama
+    # tetap terurut sesuai waktu pembuatan
+    return (
+        user_id,
+        activity_time,
+        uuid_from_time(activity_time),
+        action_type,
+        entity,
+        entity_id,
+        changes or {},
+        ip_address,
+        description
+    )
+
+
+def _write_audit_rows(rows: List[tuple]) -> bool:
+    """Tulis sekumpulan audit row ke Cassandra (blocking, untuk pemakaian tanpa worker)."""
+    session = get_cassandra_session()
+    if session is None:
+        logger.warning(f"Cassandra not available, skipping {len(rows)} audit logs")
+        return False
+    
+    from cassandra.concurrent import execute_concurrent_with_args
+    
+    by_time_rows = [row + (_audit_day_bucket(row[1]),) for row in rows]
+    results = execute_concurrent_with_args(
+        session, _get_prepared(session, "insert"), rows, raise_on_first_error=False
+    ) + execute_concurrent_with_args(
+        session, _get_prepared(session, "insert_by_time"), by_time_rows, raise_on_first_error=False
+    )
+    all_success = True
+    for success, result in results:
+        if not success:
+            logger.error(f"Failed to log audit: {result}")
+            all_success = False
+    return all_success
+
+
+def _execute_async(session, statement, params=None, paging_state=None) -> asyncio.Future:
+    """
+    Jalankan query dengan execute_async driver dan bungkus sebagai asyncio Future.
+    
+    Future di-resolve dengan ResultSet halaman pertama (current_rows,
+    paging_state); iterasi melewati halaman itu akan kembali blocking.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    response_future = session.execute_async(statement, params, paging_state=paging_state)
+    
+    def on_success(_rows):
+        # Response sudah lengkap, result() langsung return tanpa menunggu
+        result = response_future.result()
+        loop.call_soon_threadsafe(
+            lambda: future.done() or future.set_result(result)
+        )
+    
+    def on_error(exc):
+        loop.call_soon_threadsafe(
+            lambda: future.done() or future.set_exception(exc)
+        )
+    
+    response_future.add_callbacks(on_success, on_error)
+    return future
+
+
+async def _get_session_async():
+    """
+    Ambil session dengan semua query audit sudah di-prepare.
+    
+    Koneksi dan prepare pertama kali bersifat blocking, sehingga dijalankan
+    di thread executor; setelah itu langsung return.
+    """
+    if _cassandra_session is None or len(_prepared_statements) < len(AUDIT_QUERIES):
+        await asyncio.get_running_loop().run_in_executor(None, prepare_audit_statements)
+    return _cassandra_session
+
+
+async def _audit_worker():
+    """
+    Worker background: ambil item dari antrian dan tulis per batch.
+    
+    Setiap batch dikirim dengan execute_async (non-blocking, tanpa thread
+    pool) memakai prepared statement, lalu ditunggu bersamaan.
+    """
+    while True:
+        items = [await _audit_queue.get()]
+        while len(items) < AUDIT_BATCH_SIZE and not _audit_queue.empty():
+            items.append(_audit_queue.get_nowait())
+        
+        try:
+            session = await _get_session_async()
+            statement = _prepared_statements.get("insert")
+            by_time_statement = _prepared_statements.get("insert_by_time")
+            if session is None or statement is None or by_time_statement is None:
+                logger.warning(f"Cassandra not available, skipping {len(items)} audit logs")
+                continue
+            
+            futures = []
+            for item in items:
+                row = _format_audit_row(item)
+                futures.append(_execute_async(session, statement, row))
+                futures.append(_execute_async(
+                    session, by_time_statement, row + (_audit_day_bucket(row[1]),)
+                ))
+            results = await asyncio.gather(*futures, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to log audit: {result}")
+        except Exception as e:
+            logger.error(f"Failed to log audit batch: {e}")
+        finally:
+            for _ in items:
+                _audit_queue.task_done()
+
+
+async def start_audit_worker():
+    """Mulai worker audit log. Dipanggil saat startup aplikasi."""
+    global _audit_queue, _audit_worker_task
+    
+    _audit_queue = asyncio.Queue(maxsize=AUDIT_QUEUE_MAXSIZE)
+    _audit_worker_task = asyncio.create_task(_audit_worker())
+    
+    # Koneksi + prepare statement di thread, tanpa menahan startup
+    # jika Cassandra lambat/tidak tersedia
+    asyncio.get_running_loop().run_in_executor(None, prepare_audit_statements)
+    logger.info("Audit log worker started")
+
+
+async def stop_audit_worker():
+    """Flush sisa antrian lalu hentikan worker. Dipanggil saat shutdown."""
+    global _audit_queue, _audit_worker_task
+    
+    if _audit_worker_task is None:
+        return
+    
+    await _audit_queue.join()
+    _audit_worker_task.cancel()
+    try:
+        await _audit_worker_task
+    except asyncio.CancelledError:
+        pass
+    
+    _audit_queue = None
+    _audit_worker_task = None
+    logger.info("Audit log worker stopped")
+
+
 def log_audit(
     user_id: str,
     action_type: str,
@@ -56,11 +326,16 @@ def log_audit(
     entity_id: str = "",
     changes: Dict[str, str] = None,
     ip_address: str = "",
-    description: str = ""
+    description: str = "",
+    description_args: tuple = ()
 ) -> bool:
     """
     Mencatat audit log ke Cassandra.
     
+    Jika worker audit berjalan, data dimasukkan ke antrian dan langsung
+    return; deskripsi baru di-format oleh worker. Tanpa worker (misal
+    dari script), audit ditulis langsung secara sinkron.
+    
     Args:
         user_id: ID pengguna yang melakukan aksi
         action_type: Jenis aksi (LOGIN, LOGOUT, CREATE, UPDATE, DELETE, VERIFY)
@@ -68,55 +343,81 @@ def log_audit(
         entity_id: ID entitas
         changes: Detail perubahan dalam format dict
         ip_address: IP address user
-        description: Deskripsi aksi
+        description: Deskripsi aksi, boleh berupa template %-format
+        description_args: Argumen untuk template description
     
     Returns:
-        True jika berhasil, False jika gagal
+        True jika berhasil dicatat/diantrikan, False jika gagal
+    
+    Example:
+        log_audit(user_id, "LOGIN", "user", user_id,
+                  description="User %s berhasil login",
+                  description_args=(email,))
     """
+    item = (
+        user_id,
+        datetime.now(WIB),
+        action_type,
+        entity,
+        entity_id,
+        changes,
+        ip_address,
+        description,
+        description_args
+    )
+    
+    if _audit_queue is not None:
+        try:
+            _audit_queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            logger.warning("Audit queue full, dropping audit log")
+            return False
+    
     try:
-        session = get_cassandra_session()
-        if session is None:
-            logger.warning("Cassandra not available, skipping audit log")
+        if not _write_audit_rows([_format_audit_row(item)]):
             return False
-        
-        audit_id = uuid.uuid4()
-        activity_time = datetime.now(WIB)
-        
-        # Prepare changes map
-        changes_map = changes or {}
-        
-        query = """
-        INSERT INTO activity_audit 
-        (user_id, activity_time, audit_id, action_type, entity, entity_id, changes, ip_address, description)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        session.execute(query, (
-            user_id,
-            activity_time,
-            audit_id,
-            action_type,
-            entity,
-            entity_id,
-            changes_map,
-            ip_address,
-            description
-        ))
-        
         logger.debug(f"Audit logged: {action_type} {entity} by {user_id}")
         return True
-        
     except Exception as e:
         logger.error(f"Failed to log audit: {e}")
         return False
 
 
-def get_audit_logs(
+def _audit_row_to_dict(row) -> Dict:
+    """Konversi row Cassandra ke dict response (waktu dalam WIB)."""
+    # Convert UTC timestamp to WIB
+    activity_time_wib = None
+    if row.activity_time:
+        # Cassandra returns timezone-aware datetime in UTC
+        # Convert to WIB by replacing timezone
+        if row.activity_time.tzinfo is None:
+            # If somehow no timezone, assume UTC
+            activity_time_utc = row.activity_time.replace(tzinfo=timezone.utc)
+        else:
+            activity_time_utc = row.activity_time
+        # Convert to WIB
+        activity_time_wib = activity_time_utc.astimezone(WIB).isoformat()
+    
+    return {
+        "user_id": row.user_id,
+        "activity_time": activity_time_wib,
+        "audit_id": str(row.audit_id),
+        "action_type": row.action_type,
+        "entity": row.entity,
+        "entity_id": row.entity_id,
+        "changes": dict(row.changes) if row.changes else {},
+        "ip_address": row.ip_address,
+        "description": row.description
+    }
+
+
+async def get_audit_logs(
     user_id: Optional[str] = None,
     limit: int = 100
 ) -> List[Dict]:
     """
-    Mengambil audit logs dari Cassandra.
+    Mengambil audit logs dari Cassandra (non-blocking, execute_async).
     
     Args:
         user_id: Filter by user_id (optional)
@@ -126,77 +427,77 @@ def get_audit_logs(
         List of audit log records
     """
     try:
-        session = get_cassandra_session()
+        session = await _get_session_async()
         if session is None:
             logger.warning("Cassandra not available")
             return []
         
         if user_id:
-            query = f"""
-            SELECT user_id, activity_time, audit_id, action_type, entity, entity_id, 
-                   changes, ip_address, description 
-            FROM activity_audit 
-            WHERE user_id = %s
-            LIMIT {limit}
-            """
-            rows = session.execute(query, (user_id,))
-        else:
-            # Ambil lebih banyak data untuk memastikan semua log terbaru terambil
-            # Karena tidak bisa ORDER BY tanpa partition key, ambil data lebih banyak
-            fetch_limit = limit * 10  # Ambil 10x lebih banyak
-            query = f"""
-            SELECT user_id, activity_time, audit_id, action_type, entity, entity_id, 
-                   changes, ip_address, description 
-            FROM activity_audit 
-            LIMIT {fetch_limit}
-            ALLOW FILTERING
-            """
-            rows = session.execute(query)
+            # Satu partition, sudah terurut activity_time DESC (clustering order)
+            result = await _execute_async(
+                session, _get_prepared(session, "by_user"), (user_id, limit)
+            )
+            return [_audit_row_to_dict(row) for row in result.current_rows]
         
-        results = []
-        for row in rows:
-            # Convert UTC timestamp to WIB
-            activity_time_wib = None
-            if row.activity_time:
-                # Cassandra returns timezone-aware datetime in UTC
-                # Convert to WIB by replacing timezone
-                if row.activity_time.tzinfo is None:
-                    # If somehow no timezone, assume UTC
-                    from datetime import timezone as tz
-                    activity_time_utc = row.activity_time.replace(tzinfo=tz.utc)
-                else:
-                    activity_time_utc = row.activity_time
-                # Convert to WIB
-                activity_time_wib = activity_time_utc.astimezone(WIB).isoformat()
-            
-            results.append({
-                "user_id": row.user_id,
-                "activity_time": activity_time_wib,
-                "activity_time_raw": row.activity_time,  # Untuk sorting
-                "audit_id": str(row.audit_id),
-                "action_type": row.action_type,
-                "entity": row.entity,
-                "entity_id": row.entity_id,
-                "changes": dict(row.changes) if row.changes else {},
-                "ip_address": row.ip_address,
-                "description": row.description
-            })
-        
-        # Sort by activity_time descending (terbaru dulu)
-        results.sort(key=lambda x: x.get('activity_time_raw') or datetime.min, reverse=True)
+        # Log semua user: baca partition per hari dari yang terbaru. Setiap
+        # partition sudah terurut activity_time DESC, jadi hasil gabungan
+        # tetap terurut tanpa sort di Python
+        statement = _get_prepared(session, "by_day")
+        today = datetime.now(timezone.utc).date()
+        rows = []
+        for offset in range(AUDIT_BUCKET_LOOKBACK_DAYS):
+            day_bucket = (today - timedelta(days=offset)).isoformat()
+            result = await _execute_async(session, statement, (day_bucket, limit - len(rows)))
+            rows.extend(result.current_rows)
+            if len(rows) >= limit:
+                break
         
-        # Remove raw timestamp dan ambil sesuai limit
-        for item in results[:limit]:
-            item.pop('activity_time_raw', None)
-        
-        return results[:limit]
+        return [_audit_row_to_dict(row) for row in rows]
         
     except Exception as e:
         logger.error(f"Failed to get audit logs: {e}")
         return []
 
 
-def get_audit_stats() -> Dict:
+async def get_audit_logs_page(
+    user_id: str,
+    limit: int = 100,
+    paging_state: Optional[bytes] = None
+) -> Tuple[List[Dict], Optional[bytes]]:
+    """
+    Mengambil satu halaman audit log user memakai native paging Cassandra.
+    
+    Tidak ada OFFSET: driver mengembalikan paging_state yang dikirim balik
+    oleh client untuk melanjutkan dari posisi terakhir. Hanya satu halaman
+    yang dimuat ke memori.
+    
+    Args:
+        user_id: ID user (partition key)
+        limit: Jumlah record per halaman (fetch_size)
+        paging_state: paging_state dari halaman sebelumnya (None = halaman pertama)
+    
+    Returns:
+        Tuple (list audit log, paging_state halaman berikutnya atau None)
+    """
+    try:
+        session = await _get_session_async()
+        if session is None:
+            logger.warning("Cassandra not available")
+            return [], None
+        
+        statement = _get_prepared(session, "by_user_paged").bind((user_id,))
+        statement.fetch_size = limit
+        result = await _execute_async(session, statement, paging_state=paging_state)
+        
+        logs = [_audit_row_to_dict(row) for row in result.current_rows]
+        return logs, result.paging_state
+        
+    except Exception as e:
+        logger.error(f"Failed to get audit logs page: {e}")
+        return [], None
+
+
+async def get_audit_stats() -> Dict:
     """
     Mendapatkan statistik audit logs.
     
@@ -204,13 +505,12 @@ def get_audit_stats() -> Dict:
         Dict dengan statistik
     """
     try:
-        session = get_cassandra_session()
+        session = await _get_session_async()
         if session is None:
             return {"total": 0, "error": "Cassandra not available"}
         
         # Count total (approximate in Cassandra)
-        query = "SELECT COUNT(*) FROM activity_audit"
-        result = session.execute(query)
+        result = await _execute_async(session, _get_prepared(session, "count"))
         total = result.one()[0]
         
         return {
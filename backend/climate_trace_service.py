@@ -12,11 +12,15 @@ Climate TRACE menyediakan data emisi aktual dari:
 Base URL: https://api.climatetrace.org
 """
 
+import asyncio
 import httpx
+import orjson
 from typing import List, Dict, Optional, Any
 import logging
 from functools import lru_cache
 from datetime import datetime, timezone, timedelta
+from urllib.parse import urlencode
+from cache_service import swr_cached
 
 # Timezone WIB (UTC+7)
 WIB = timezone(timedelta(hours=7))
@@ -25,6 +29,22 @@ logger = logging.getLogger(__name__)
 
 CLIMATE_TRACE_BASE_URL = "https://api.climatetrace.org"
 
+# TTL cache Redis (detik) per jenis data
+DEFINITIONS_CACHE_TTL = 86400  # negara, sektor, dll - hampir tidak pernah berubah
+RANKINGS_CACHE_TTL = 3600
+SOURCES_CACHE_TTL = 600
+HISTORICAL_CACHE_TTL = 7 * 86400  # data tahun yang sudah lewat
+# Setelah TTL habis data masih dikirim (stale) selama TTL x faktor ini
+# sambil diperbarui di background
+STALE_CACHE_TTL_FACTOR = 7
+
+# Jumlah maksimal halaman /v7/sources yang diminta bersamaan
+SOURCES_PAGE_CONCURRENCY = 5
+
+# Batas connection pool HTTP (koneksi keep-alive dipakai ulang antar request)
+HTTP_MAX_CONNECTIONS = 50
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+
 
 class ClimateTraceService:
     """Service untuk mengakses Climate TRACE API."""
@@ -32,16 +52,56 @@ class ClimateTraceService:
     def __init__(self):
         self.base_url = CLIMATE_TRACE_BASE_URL
         self.timeout = 30.0
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Client HTTP bersama. Koneksi TCP+TLS ke Climate TRACE dibuka sekali
+        lalu dipakai ulang, bukan handshake baru setiap request.
+        """
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+                )
+            )
+        return self._client
     
-    async def _request(self, endpoint: str, params: Dict = None) -> Any:
-        """Make async request to Climate TRACE API."""
-        url = f"{self.base_url}{endpoint}"
+    async def aclose(self):
+        """Tutup client HTTP. Dipanggil saat shutdown aplikasi."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _request(self, endpoint: str, params: Dict = None, ttl: int = 0) -> Any:
+        """
+        Make async request to Climate TRACE API.
         
+        Jika ttl > 0, response di-cache di Redis dengan key dari endpoint
+        dan query params.
+        """
+        if ttl > 0:
+            key = f"ct:{endpoint}"
+            if params:
+                key += "?" + urlencode(sorted(params.items()))
+            return await swr_cached(
+                key, ttl, ttl * STALE_CACHE_TTL_FACTOR,
+                lambda: self._fetch(endpoint, params)
+            )
+        
+        return await self._fetch(endpoint, params)
+    
+    async def _fetch(self, endpoint: str, params: Dict = None) -> Any:
+        """Request langsung ke Climate TRACE API (tanpa cache)."""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                return response.json()
+            response = await self._get_client().get(endpoint, params=params)
+            response.raise_for_status()
+            # Payload Climate TRACE bisa besar (ribuan source), parse dengan orjson
+            return orjson.loads(response.content)
         except httpx.HTTPStatusError as e:
             logger.error(f"Climate TRACE API error: {e.response.status_code}")
             raise
@@ -49,29 +109,54 @@ class ClimateTraceService:
             logger.error(f"Climate TRACE request failed: {e}")
             raise
     
+    @staticmethod
+    def _period_ttl(end: Any, ttl: int) -> int:
+        """TTL cache untuk data per periode: lebih lama jika tahunnya sudah lewat."""
+        try:
+            end_year = int(str(end)[:4])
+        except ValueError:
+            return ttl
+        if end_year < datetime.now(WIB).year:
+            return HISTORICAL_CACHE_TTL
+        return ttl
+    
     # =========================================================================
     # DEFINITIONS
     # =========================================================================
     
     async def get_countries(self) -> List[Dict]:
         """Get list of all countries."""
-        return await self._request("/v7/definitions/countries")
+        return await self._request("/v7/definitions/countries", ttl=DEFINITIONS_CACHE_TTL)
     
     async def get_sectors(self) -> List[str]:
         """Get list of all sectors."""
-        return await self._request("/v7/definitions/sectors")
+        return await self._request("/v7/definitions/sectors", ttl=DEFINITIONS_CACHE_TTL)
     
     async def get_subsectors(self) -> List[str]:
         """Get list of all subsectors."""
-        return await self._request("/v7/definitions/subsectors")
+        return await self._request("/v7/definitions/subsectors", ttl=DEFINITIONS_CACHE_TTL)
     
     async def get_gases(self) -> List[str]:
         """Get list of available gases."""
-        return await self._request("/v7/definitions/gases")
+        return await self._request("/v7/definitions/gases", ttl=DEFINITIONS_CACHE_TTL)
     
     async def get_continents(self) -> List[str]:
         """Get list of continents."""
-        return await self._request("/v7/definitions/continents")
+        return await self._request("/v7/definitions/continents", ttl=DEFINITIONS_CACHE_TTL)
+    
+    async def get_all_definitions(self) -> Dict[str, List]:
+        """
+        Get semua definisi (countries, sectors, subsectors, gases, continents)
+        sekaligus. Kelima request dijalankan bersamaan, bukan berurutan.
+        """
+        results = await asyncio.gather(
+            self.get_countries(),
+            self.get_sectors(),
+            self.get_subsectors(),
+            self.get_gases(),
+            self.get_continents()
+        )
+        return dict(zip(("countries", "sectors", "subsectors", "gases", "continents"), results))
     
     # =========================================================================
     # RANKINGS
@@ -111,7 +196,10 @@ class ClimateTraceService:
         if continent:
             params["continent"] = continent
         
-        return await self._request("/v7/rankings/countries", params)
+        return await self._request(
+            "/v7/rankings/countries", params,
+            ttl=self._period_ttl(params["end"], RANKINGS_CACHE_TTL)
+        )
     
     # =========================================================================
     # EMISSION SOURCES (Top Polluters)
@@ -159,7 +247,39 @@ class ClimateTraceService:
             # Use gadmId for country filtering
             params["gadmId"] = country
         
-        return await self._request("/v7/sources", params)
+        return await self._request(
+            "/v7/sources", params,
+            ttl=self._period_ttl(params["year"], SOURCES_CACHE_TTL)
+        )
+    
+    async def get_sources_all(
+        self,
+        pages: int,
+        limit: int = 100,
+        **filters
+    ) -> List[Dict]:
+        """
+        Get beberapa halaman emission sources sekaligus.
+        
+        Halaman diminta bersamaan (dibatasi SOURCES_PAGE_CONCURRENCY agar
+        tidak membanjiri Climate TRACE API), lalu digabung sesuai urutan.
+        
+        Args:
+            pages: Jumlah halaman
+            limit: Jumlah source per halaman
+            **filters: Filter lain untuk get_sources (year, gas, sectors, country, ...)
+        
+        Returns:
+            List of emission sources dari semua halaman
+        """
+        semaphore = asyncio.Semaphore(SOURCES_PAGE_CONCURRENCY)
+        
+        async def fetch_page(page: int) -> List[Dict]:
+            async with semaphore:
+                return await self.get_sources(limit=limit, offset=page * limit, **filters)
+        
+        results = await asyncio.gather(*(fetch_page(page) for page in range(pages)))
+        return [source for page in results for source in page]
     
     async def get_source_details(
         self,
@@ -188,7 +308,10 @@ class ClimateTraceService:
             "end": end or f"{current_year - 1}"
         }
         
-        return await self._request(f"/v7/sources/{source_id}", params)
+        return await self._request(
+            f"/v7/sources/{source_id}", params,
+            ttl=self._period_ttl(params["end"], SOURCES_CACHE_TTL)
+        )
     
     # =========================================================================
     # AGGREGATED EMISSIONS
@@ -232,7 +355,10 @@ class ClimateTraceService:
         if sectors:
             params["sectors"] = ",".join(sectors)
         
-        return await self._request("/v7/emissions", params)
+        return await self._request(
+            "/v7/emissions", params,
+            ttl=self._period_ttl(params["end"], RANKINGS_CACHE_TTL)
+        )
     
     # =========================================================================
     # CITIES
@@ -32,15 +32,66 @@ Version: 1.0.0
 =============================================================================
 """
 
+import asyncio
 import httpx
 import logging
-from typing import Dict, Any, Optional
+import orjson
+import random
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 from config import settings
 from activity_mapper import ActivityMapper
+from cache_service import cached
 
 # Setup logger untuk modul ini
 logger = logging.getLogger(__name__)
 
+# Cache hasil estimasi. Hasil Climatiq hanya bergantung pada activity ID
+# dan nilai parameter, sehingga aktivitas yang sama (misal commute harian)
+# tidak perlu memanggil API berulang kali.
+ESTIMATE_CACHE_TTL = 3600
+ESTIMATE_CACHE_MAXSIZE = 10_000
+
+# Cache hasil pencarian emission factor: katalog Climatiq hanya berubah
+# dalam hitungan minggu, dropdown frontend sering mengulang query yang sama
+SEARCH_CACHE_TTL = 3600
+SEARCH_CACHE_MAXSIZE = 512
+
+# Data version Climatiq: ^29 = gunakan versi 29.x (terbaru). Ikut menjadi
+# bagian key cache agar hasil dari versi lama tidak terpakai saat diganti.
+CLIMATIQ_DATA_VERSION = "^29"
+
+# Micro-batching: estimasi yang datang hampir bersamaan digabung ke /batch
+ESTIMATE_BATCH_WINDOW = 0.010  # detik
+ESTIMATE_BATCH_MAX_SIZE = 50
+
+# Batch besar dipecah per BATCH_CHUNK_SIZE item (batas /batch Climatiq) dan
+# dikirim paralel, paling banyak BATCH_CONCURRENCY request sekaligus
+BATCH_CHUNK_SIZE = 100
+BATCH_CONCURRENCY = 10
+
+# Retry untuk error sementara (rate limit, gateway, timeout, koneksi putus):
+# exponential backoff dengan jitter, memakai koneksi yang sudah terbuka
+RETRY_MAX_ATTEMPTS = 4
+RETRY_INITIAL_DELAY = 0.2
+RETRY_MAX_DELAY = 3.0
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+# Circuit breaker: setelah CIRCUIT_FAILURE_THRESHOLD request berturut-turut
+# gagal (5xx/timeout/koneksi, sesudah retry), request langsung ditolak selama
+# CIRCUIT_COOLDOWN detik agar tidak menunggu timeout upstream yang sedang down
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30.0
+
+# Panjang maksimum body response error yang ikut ke log/pesan error (byte)
+ERROR_BODY_MAX_BYTES = 256
+
+# Batas connection pool HTTP ke Climatiq (koneksi keep-alive dipakai ulang)
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 50
+HTTP_KEEPALIVE_EXPIRY = 60.0
+
 
 class ClimatiqAPIError(Exception):
     """
@@ -101,6 +152,168 @@ class ClimatiqService:
             # Content type JSON karena kita kirim/terima JSON
             "Content-Type": "application/json"
         }
+        
+        # Cache LRU in-process: key -> (expires_at, hasil)
+        self._estimate_cache: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Request yang sedang berjalan, untuk menggabungkan request identik
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+        # Cache LRU + request berjalan untuk search_emission_factors
+        self._search_cache: "OrderedDict[Tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._search_inflight: Dict[Tuple, asyncio.Task] = {}
+        # Client HTTP bersama, dibuat saat request pertama
+        self._client: Optional[httpx.AsyncClient] = None
+        # Dihitung sekali: activity_type -> (Climatiq ID, tipe parameter,
+        # bagian emission_factor payload), agar hot path cukup satu lookup
+        self._estimate_templates: Dict[str, Tuple[str, str, Dict[str, str]]] = {
+            activity_type: (
+                climatiq_id,
+                ActivityMapper.get_parameter_type(activity_type),
+                {"activity_id": climatiq_id, "data_version": CLIMATIQ_DATA_VERSION}
+            )
+            for activity_type, climatiq_id in ActivityMapper.get_all_activities().items()
+        }
+        # Antrian micro-batch: (payload, future) yang belum dikirim
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._flush_timer: Optional[asyncio.Task] = None
+        self._flush_tasks: set = set()
+        # Batas request /batch paralel ke Climatiq (rate limit plan)
+        self._batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        # State circuit breaker: kegagalan berturut-turut dan waktu dibuka
+        self._cb_failures = 0
+        self._cb_opened_at = 0.0
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Client HTTP bersama untuk semua request ke Climatiq.
+        
+        Koneksi TCP+TLS dibuka sekali lalu dipakai ulang, bukan handshake
+        baru untuk setiap estimasi. Dengan HTTP/2, estimasi yang berjalan
+        bersamaan dikirim sebagai stream paralel di satu koneksi.
+        """
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=30.0,
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+                )
+            )
+        return self._client
+    
+    async def aclose(self):
+        """Tutup client HTTP. Dipanggil saat shutdown aplikasi."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    def _cb_open(self) -> bool:
+        """True jika circuit breaker terbuka (masih dalam masa cooldown)."""
+        return (
+            self._cb_failures >= CIRCUIT_FAILURE_THRESHOLD
+            and time.monotonic() - self._cb_opened_at < CIRCUIT_COOLDOWN
+        )
+    
+    def _cb_record(self, success: bool):
+        """Catat hasil request ke Climatiq dan buka/tutup circuit breaker."""
+        if success:
+            if self._cb_failures >= CIRCUIT_FAILURE_THRESHOLD:
+                logger.warning("Climatiq circuit breaker ditutup, upstream pulih")
+            self._cb_failures = 0
+            return
+        
+        self._cb_failures += 1
+        if self._cb_failures >= CIRCUIT_FAILURE_THRESHOLD:
+            self._cb_opened_at = time.monotonic()
+            logger.warning(
+                f"Climatiq circuit breaker dibuka setelah {self._cb_failures} "
+                f"kegagalan berturut-turut, request ditolak {CIRCUIT_COOLDOWN:.0f}s"
+            )
+    
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Kirim request ke Climatiq dengan retry untuk error sementara.
+        
+        Status 429/502/503/504, timeout, dan error transport diulang hingga
+        RETRY_MAX_ATTEMPTS kali dengan jeda exponential + jitter. Response
+        terakhir dikembalikan (atau exception terakhir di-raise) agar
+        penanganan error di pemanggil tetap sama.
+        
+        Raises:
+            ClimatiqAPIError: Jika circuit breaker sedang terbuka
+        """
+        if self._cb_open():
+            raise ClimatiqAPIError("Climatiq circuit open")
+        
+        client = self._get_client()
+        
+        for attempt in range(1, RETRY_MAX_ATTEMPTS + 1):
+            try:
+                response = await client.request(method, url, **kwargs)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == RETRY_MAX_ATTEMPTS:
+                    self._cb_record(response.status_code < 500)
+                    return response
+                reason = f"status {response.status_code}"
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if attempt == RETRY_MAX_ATTEMPTS:
+                    self._cb_record(False)
+                    raise
+                reason = type(e).__name__
+            
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_INITIAL_DELAY * 2 ** (attempt - 1)))
+            logger.warning(
+                f"Climatiq {method} {url} gagal ({reason}), "
+                f"retry {attempt}/{RETRY_MAX_ATTEMPTS - 1} dalam {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+    
+    async def _request(self, method: str, path: str, label: str, **kwargs) -> Dict[str, Any]:
+        """
+        Kirim request ke Climatiq dan kembalikan body JSON yang sudah di-parse.
+        
+        Satu-satunya tempat penanganan status code, timeout, dan error
+        jaringan untuk semua endpoint Climatiq.
+        
+        Args:
+            method: HTTP method
+            path: Path endpoint relatif terhadap base_url (contoh: "/estimate")
+            label: Nama request untuk pesan error dan log
+            **kwargs: Diteruskan ke httpx (content, params, timeout)
+        
+        Returns:
+            Response JSON dari Climatiq
+        
+        Raises:
+            ClimatiqAPIError: Jika status bukan 200, timeout, atau koneksi gagal
+        """
+        try:
+            response = await self._send(method, f"{self.base_url}{path}", **kwargs)
+        except httpx.TimeoutException:
+            error_msg = f"Request {label} timeout"
+            logger.error(error_msg)
+            raise ClimatiqAPIError(error_msg)
+        except httpx.RequestError as e:
+            # Error jaringan lainnya (DNS, connection refused, dll)
+            error_msg = f"Request {label} gagal: {str(e)}"
+            logger.error(error_msg)
+            raise ClimatiqAPIError(error_msg)
+        
+        logger.debug(f"Climatiq response via {response.http_version}")
+        if response.status_code != 200:
+            # API mengembalikan error (4xx atau 5xx). Hanya potongan awal body
+            # yang dipakai, tanpa decode seluruh halaman error ke str
+            error_msg = (
+                f"{label} error: {response.status_code} - "
+                f"{response.content[:ERROR_BODY_MAX_BYTES]!r}"
+            )
+            logger.error(error_msg)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"{label} error body: {response.content!r}")
+            raise ClimatiqAPIError(error_msg)
+        
+        return orjson.loads(response.content)
     
     async def estimate_emission(
         self,
@@ -151,9 +364,9 @@ class ClimatiqService:
         # =====================================================================
         # STEP 1: Konversi activity_type ke Climatiq ID
         # =====================================================================
-        climatiq_id = ActivityMapper.get_climatiq_id(activity_type)
+        template = self._estimate_templates.get(activity_type.lower())
         
-        if not climatiq_id:
+        if template is None:
             # Activity type tidak dikenal, raise error dengan pesan jelas
             raise ClimatiqAPIError(f"Tipe aktivitas tidak dikenal: {activity_type}")
         
@@ -162,7 +375,7 @@ class ClimatiqService:
         # =====================================================================
         # Setiap kategori aktivitas membutuhkan parameter berbeda
         
-        param_type = ActivityMapper.get_parameter_type(activity_type)
+        climatiq_id, param_type, emission_factor = template
         param_value = None
         param_unit = None
         
@@ -190,12 +403,8 @@ class ClimatiqService:
         # STEP 3: Siapkan payload request
         # =====================================================================
         payload = {
-            "emission_factor": {
-                # Activity ID yang akan digunakan untuk kalkulasi
-                "activity_id": climatiq_id,
-                # Data version: ^29 = gunakan versi 29.x (terbaru)
-                "data_version": "^29"
-            },
+            # Activity ID + data version (template, hanya dibaca)
+            "emission_factor": emission_factor,
             "parameters": {
                 # Contoh: {"distance": 50, "distance_unit": "km"}
                 param_type: param_value,
@@ -203,54 +412,175 @@ class ClimatiqService:
             }
         }
         
-        # Log untuk monitoring dan debugging
-        logger.info(f"Memanggil Climatiq API untuk {activity_type} dengan {param_value} {param_unit}")
-        
         # =====================================================================
-        # STEP 4: Kirim request ke Climatiq API
+        # STEP 4: Ambil dari cache, atau gabung dengan request identik
         # =====================================================================
+        # Nilai dinormalisasi ke float agar 10 dan 10.0 memakai entry yang sama
+        # (satuan sudah ditentukan oleh param_type)
+        cache_key = (climatiq_id, param_type, float(param_value), CLIMATIQ_DATA_VERSION)
+        
+        cached_entry = self._estimate_cache.get(cache_key)
+        if cached_entry is not None:
+            expires_at, result = cached_entry
+            if expires_at > time.monotonic():
+                self._estimate_cache.move_to_end(cache_key)
+                return result
+            del self._estimate_cache[cache_key]
+        
+        task = self._inflight.get(cache_key)
+        if task is None:
+            redis_key = ":".join(["climatiq:estimate", *map(str, cache_key)])
+            task = asyncio.ensure_future(cached(
+                redis_key,
+                ESTIMATE_CACHE_TTL,
+                lambda: self._request_estimate(activity_type, climatiq_id, payload)
+            ))
+            self._inflight[cache_key] = task
+            task.add_done_callback(
+                lambda done, key=cache_key: self._finish_estimate(key, done)
+            )
+        
+        # shield: request yang dibatalkan tidak membatalkan request lain
+        # yang menunggu hasil yang sama
+        return await asyncio.shield(task)
+    
+    def _finish_estimate(self, cache_key: Tuple, task: asyncio.Task):
+        """Simpan hasil request yang selesai ke cache LRU."""
+        self._inflight.pop(cache_key, None)
+        
+        if task.cancelled() or task.exception() is not None:
+            return
+        
+        self._estimate_cache[cache_key] = (
+            time.monotonic() + ESTIMATE_CACHE_TTL,
+            task.result()
+        )
+        self._estimate_cache.move_to_end(cache_key)
+        if len(self._estimate_cache) > ESTIMATE_CACHE_MAXSIZE:
+            self._estimate_cache.popitem(last=False)
+    
+    async def _request_estimate(
+        self,
+        activity_type: str,
+        climatiq_id: str,
+        payload: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Kirim request estimasi ke Climatiq API (tanpa cache).
+        
+        Args:
+            activity_type: Tipe aktivitas user (untuk logging)
+            climatiq_id: Climatiq activity ID
+            payload: Body request /estimate
+        
+        Returns:
+            Dict hasil estimasi (lihat estimate_emission)
+        
+        Raises:
+            ClimatiqAPIError: Jika API call gagal
+        """
+        parameters = payload["parameters"]
+        
+        # Log untuk monitoring dan debugging
+        logger.info(f"Memanggil Climatiq API untuk {activity_type} dengan {parameters}")
+        
+        data = await self._submit_estimate(payload)
+        logger.info(f"Climatiq API sukses: {data.get('co2e')} kg CO2e")
+        
+        # Kembalikan data dalam format yang konsisten
+        return {
+            "co2e": data["co2e"],
+            "co2e_unit": data["co2e_unit"],
+            "activity_id": climatiq_id,
+            "emission_factor": data.get("emission_factor", {}),
+            "parameters": parameters
+        }
+    
+    # =========================================================================
+    # MICRO-BATCHING
+    # =========================================================================
+    # Estimasi yang masuk dalam jendela ESTIMATE_BATCH_WINDOW dikumpulkan
+    # lalu dikirim sebagai satu request /batch (maks ESTIMATE_BATCH_MAX_SIZE
+    # item). Estimasi tunggal tetap dikirim ke /estimate.
+    
+    async def _submit_estimate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Masukkan payload ke antrian batch dan tunggu hasilnya.
+        
+        Returns:
+            Response estimasi mentah dari Climatiq (berisi co2e, co2e_unit, ...)
+        
+        Raises:
+            ClimatiqAPIError: Jika estimasi gagal
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((payload, future))
+        
+        if len(self._pending) >= ESTIMATE_BATCH_MAX_SIZE:
+            self._spawn_flush(self._take_pending())
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.create_task(self._flush_after(ESTIMATE_BATCH_WINDOW))
+        
+        return await future
+    
+    def _take_pending(self) -> List[Tuple[Dict[str, Any], asyncio.Future]]:
+        """Ambil semua estimasi yang menunggu dan kosongkan antrian."""
+        batch, self._pending = self._pending, []
+        return batch
+    
+    def _spawn_flush(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        """Kirim batch di task terpisah (referensi disimpan sampai selesai)."""
+        task = asyncio.create_task(self._flush(batch))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+    
+    async def _flush_after(self, delay: float):
+        """Tunggu jendela batch, lalu kirim semua estimasi yang terkumpul."""
+        await asyncio.sleep(delay)
+        self._flush_timer = None
+        await self._flush(self._take_pending())
+    
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        """Kirim satu batch dan selesaikan future masing-masing estimasi."""
+        if not batch:
+            return
+        
         try:
-            # Gunakan async HTTP client untuk non-blocking I/O
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/estimate",  # Endpoint: /data/v1/estimate
-                    headers=self.headers,
-                    json=payload
-                )
-                
-                # ============================================================
-                # STEP 5: Proses response
-                # ============================================================
-                if response.status_code == 200:
-                    # Sukses! Parse response JSON
-                    data = response.json()
-                    logger.info(f"Climatiq API sukses: {data.get('co2e')} kg CO2e")
-                    
-                    # Kembalikan data dalam format yang konsisten
-                    return {
-                        "co2e": data["co2e"],
-                        "co2e_unit": data["co2e_unit"],
-                        "activity_id": climatiq_id,
-                        "emission_factor": data.get("emission_factor", {}),
-                        "parameters": payload["parameters"]
-                    }
-                else:
-                    # API mengembalikan error (4xx atau 5xx)
-                    error_msg = f"Climatiq API error: {response.status_code} - {response.text}"
-                    logger.error(error_msg)
-                    raise ClimatiqAPIError(error_msg)
-                    
-        except httpx.TimeoutException:
-            # Request timeout setelah 30 detik
-            error_msg = "Request ke Climatiq API timeout"
-            logger.error(error_msg)
-            raise ClimatiqAPIError(error_msg)
-            
-        except httpx.RequestError as e:
-            # Error jaringan lainnya (DNS, connection refused, dll)
-            error_msg = f"Request ke Climatiq API gagal: {str(e)}"
-            logger.error(error_msg)
-            raise ClimatiqAPIError(error_msg)
+            if len(batch) == 1:
+                results = [await self._post_estimate(batch[0][0])]
+            else:
+                data = await self.batch_estimate([payload for payload, _ in batch])
+                results = data.get("results", [])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            result = results[index] if index < len(results) else None
+            if result is None or "co2e" not in result:
+                message = result.get("message", result) if isinstance(result, dict) else "hasil tidak ada"
+                future.set_exception(ClimatiqAPIError(f"Climatiq batch item error: {message}"))
+            else:
+                future.set_result(result)
+    
+    async def _post_estimate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Kirim satu estimasi ke endpoint /estimate.
+        
+        Returns:
+            Response JSON dari Climatiq
+        
+        Raises:
+            ClimatiqAPIError: Jika API call gagal
+        """
+        return await self._request(
+            "POST", "/estimate", "Climatiq API",  # Endpoint: /data/v1/estimate
+            content=orjson.dumps(payload)
+        )
     
     async def search_emission_factors(
         self,
@@ -291,7 +621,7 @@ class ClimatiqService:
         # Siapkan query parameters
         params = {
             # Data version wajib disertakan
-            "data_version": "^29"
+            "data_version": CLIMATIQ_DATA_VERSION
         }
         
         # Tambahkan filter opsional jika diisi
@@ -307,41 +637,58 @@ class ClimatiqService:
         # Limit jumlah hasil
         params["results_per_page"] = limit
         
+        # Ambil dari cache, atau gabung dengan pencarian identik yang sedang berjalan
+        cache_key = tuple(sorted(params.items()))
+        
+        cached_entry = self._search_cache.get(cache_key)
+        if cached_entry is not None:
+            expires_at, data = cached_entry
+            if expires_at > time.monotonic():
+                self._search_cache.move_to_end(cache_key)
+                return data
+            del self._search_cache[cache_key]
+        
+        task = self._search_inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._request_search(params))
+            self._search_inflight[cache_key] = task
+            task.add_done_callback(
+                lambda done, key=cache_key: self._finish_search(key, done)
+            )
+        
+        return await asyncio.shield(task)
+    
+    def _finish_search(self, cache_key: Tuple, task: asyncio.Task):
+        """Simpan hasil pencarian yang selesai ke cache LRU."""
+        self._search_inflight.pop(cache_key, None)
+        
+        if task.cancelled() or task.exception() is not None:
+            return
+        
+        self._search_cache[cache_key] = (time.monotonic() + SEARCH_CACHE_TTL, task.result())
+        self._search_cache.move_to_end(cache_key)
+        if len(self._search_cache) > SEARCH_CACHE_MAXSIZE:
+            self._search_cache.popitem(last=False)
+    
+    async def _request_search(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Kirim request pencarian ke Climatiq API (tanpa cache)."""
         logger.info(f"Mencari emission factors di Climatiq dengan params: {params}")
         
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/search",  # Endpoint: /data/v1/search
-                    headers=self.headers,
-                    params=params
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    logger.info(f"Ditemukan {len(data.get('results', []))} emission factors")
-                    return data
-                else:
-                    error_msg = f"Pencarian Climatiq error: {response.status_code} - {response.text}"
-                    logger.error(error_msg)
-                    raise ClimatiqAPIError(error_msg)
-                    
-        except httpx.TimeoutException:
-            error_msg = "Request pencarian Climatiq timeout"
-            logger.error(error_msg)
-            raise ClimatiqAPIError(error_msg)
-            
-        except httpx.RequestError as e:
-            error_msg = f"Request pencarian Climatiq gagal: {str(e)}"
-            logger.error(error_msg)
-            raise ClimatiqAPIError(error_msg)
+        data = await self._request(
+            "GET", "/search", "Pencarian Climatiq",  # Endpoint: /data/v1/search
+            params=params
+        )
+        logger.info(f"Ditemukan {len(data.get('results', []))} emission factors")
+        return data
     
     async def batch_estimate(self, estimates: list) -> Dict[str, Any]:
         """
         Menghitung emisi untuk banyak aktivitas sekaligus (batch processing).
         
         Lebih efisien daripada memanggil estimate_emission satu per satu
-        karena hanya butuh satu HTTP request untuk banyak kalkulasi.
+        karena hanya butuh satu HTTP request untuk banyak kalkulasi. Batch
+        yang lebih besar dari BATCH_CHUNK_SIZE dipecah dan dikirim paralel
+        lewat koneksi HTTP/2 yang sama; urutan hasil tetap sama dengan input.
         
         Args:
             estimates: List of estimate request objects
@@ -349,6 +696,33 @@ class ClimatiqService:
         Returns:
             Dict dengan hasil batch dari Climatiq
         
+        Raises:
+            ClimatiqAPIError: Jika salah satu batch request gagal
+        """
+        if len(estimates) <= BATCH_CHUNK_SIZE:
+            return await self._post_batch(estimates)
+        
+        chunks = [
+            estimates[i:i + BATCH_CHUNK_SIZE]
+            for i in range(0, len(estimates), BATCH_CHUNK_SIZE)
+        ]
+        responses = await asyncio.gather(*(self._post_batch(chunk) for chunk in chunks))
+        
+        results = []
+        for chunk, data in zip(chunks, responses):
+            chunk_results = data.get("results", [])
+            # Pastikan index hasil tetap sejajar dengan input walau ada yang kurang
+            chunk_results += [None] * (len(chunk) - len(chunk_results))
+            results.extend(chunk_results)
+        return {"results": results}
+    
+    async def _post_batch(self, estimates: list) -> Dict[str, Any]:
+        """
+        Kirim satu request ke endpoint /batch (maksimal BATCH_CHUNK_SIZE item).
+        
+        Returns:
+            Response JSON dari Climatiq
+        
         Raises:
             ClimatiqAPIError: Jika batch request gagal
         """
@@ -356,33 +730,15 @@ class ClimatiqService:
         
         logger.info(f"Memanggil Climatiq batch estimate dengan {len(estimates)} item")
         
-        try:
-            # Timeout lebih lama untuk batch processing
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/batch",
-                    headers=self.headers,
-                    json=payload
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    logger.info(f"Batch estimate sukses: {len(data.get('results', []))} results")
-                    return data
-                else:
-                    error_msg = f"Climatiq batch error: {response.status_code} - {response.text}"
-                    logger.error(error_msg)
-                    raise ClimatiqAPIError(error_msg)
-                    
-        except httpx.TimeoutException:
-            error_msg = "Request batch Climatiq timeout"
-            logger.error(error_msg)
-            raise ClimatiqAPIError(error_msg)
-            
-        except httpx.RequestError as e:
-            error_msg = f"Request batch Climatiq gagal: {str(e)}"
-            logger.error(error_msg)
-            raise ClimatiqAPIError(error_msg)
+        # Timeout lebih lama untuk batch processing
+        async with self._batch_semaphore:
+            data = await self._request(
+                "POST", "/batch", "Climatiq batch",
+                content=orjson.dumps(payload),
+                timeout=60.0
+            )
+        logger.info(f"Batch estimate sukses: {len(data.get('results', []))} results")
+        return data
 
 
 # =============================================================================
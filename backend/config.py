@@ -21,9 +21,11 @@ Version: 1.0.0
 =============================================================================
 """
 
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import cached_property
 from typing import List
 
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
 
 class Settings(BaseSettings):
     """
@@ -65,6 +67,21 @@ class Settings(BaseSettings):
     mongodb_uri: str = "mongodb://localhost:27017/"  # Connection string
     mongodb_database: str = "eco_ledger_db"  # Nama database
     
+    # Connection pool Motor: ukuran pool per worker uvicorn
+    mongodb_max_pool_size: int = 100
+    mongodb_min_pool_size: int = 10
+    mongodb_wait_queue_timeout_ms: int = 2000  # Batas tunggu koneksi dari pool
+    mongodb_server_selection_timeout_ms: int = 3000
+    mongodb_connect_timeout_ms: int = 3000  # Batas buka koneksi TCP baru
+    # Batas tunggu satu operasi di socket; cursor panjang tetap aman karena
+    # tiap batch (getMore) adalah operasi terpisah. Aggregate yang baru
+    # membalas setelah scan penuh (misal $setWindowFields pengecekan link
+    # chain) harus dipecah per range agar tiap command selesai di bawah
+    # batas ini (lihat hashing.LINK_CHECK_RANGE_SIZE)
+    mongodb_socket_timeout_ms: int = 10000
+    # Kompresi wire protocol (zstd butuh paket zstandard, zlib bawaan Python)
+    mongodb_compressors: str = "zstd,zlib"
+    
     # =========================================================================
     # CASSANDRA DATABASE CONFIGURATION (Untuk Audit Log)
     # =========================================================================
@@ -75,6 +92,14 @@ class Settings(BaseSettings):
     cassandra_port: int = 9042
     cassandra_keyspace: str = "eco_logs"
     
+    # =========================================================================
+    # REDIS CACHE CONFIGURATION
+    # =========================================================================
+    # Redis digunakan sebagai cache response API eksternal (Climate TRACE)
+    # Kosongkan untuk menonaktifkan cache
+    
+    redis_url: str = ""  # Contoh: redis://localhost:6379/0
+    
     # =========================================================================
     # APPLICATION SETTINGS
     # =========================================================================
@@ -93,6 +118,7 @@ class Settings(BaseSettings):
     secret_key: str  # Tanpa default = WAJIB
     jwt_secret: str = ""  # Opsional, untuk autentikasi (future)
     jwt_expiration_hours: int = 24  # Masa berlaku token dalam jam
+    bcrypt_rounds: int = 12  # Cost factor bcrypt (development boleh 10)
     
     # =========================================================================
     # CORS (Cross-Origin Resource Sharing) SETTINGS
@@ -133,9 +159,10 @@ class Settings(BaseSettings):
     # =========================================================================
     # COMPUTED PROPERTIES
     # =========================================================================
-    # Property yang dikalkulasi dari nilai config lain
+    # Property yang dikalkulasi dari nilai config lain. Config tidak berubah
+    # saat runtime, jadi hasilnya dihitung sekali lalu disimpan di instance.
     
-    @property
+    @cached_property
     def cors_origins(self) -> List[str]:
         """
         Parse CORS origins dari string ke list.
@@ -152,7 +179,7 @@ class Settings(BaseSettings):
         """
         return [origin.strip() for origin in self.allowed_origins.split(",")]
     
-    @property
+    @cached_property
     def is_development(self) -> bool:
         """
         Cek apakah aplikasi berjalan di mode development.
@@ -165,7 +192,7 @@ class Settings(BaseSettings):
         """
         return self.app_env.lower() == "development"
     
-    @property
+    @cached_property
     def is_production(self) -> bool:
         """
         Cek apakah aplikasi berjalan di mode production.
@@ -23,6 +23,7 @@ Version: 1.0.0
 """
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
 from config import settings
 import logging
 
@@ -41,6 +42,7 @@ class Database:
     Penggunaan:
         # Di startup aplikasi
         await Database.connect()
+        await Database.ensure_indexes()
         
         # Di endpoint
         db = Database.get_database()
@@ -80,8 +82,20 @@ class Database:
             logger.info(f"Menghubungkan ke MongoDB di {settings.mongodb_uri}")
             
             # Buat client dengan connection string dari config
-            # Motor otomatis mengelola connection pool
-            cls.client = AsyncIOMotorClient(settings.mongodb_uri)
+            # Motor otomatis mengelola connection pool; ukuran pool, timeout,
+            # dan kompresi diatur dari settings
+            cls.client = AsyncIOMotorClient(
+                settings.mongodb_uri,
+                maxPoolSize=settings.mongodb_max_pool_size,
+                minPoolSize=settings.mongodb_min_pool_size,
+                waitQueueTimeoutMS=settings.mongodb_wait_queue_timeout_ms,
+                serverSelectionTimeoutMS=settings.mongodb_server_selection_timeout_ms,
+                connectTimeoutMS=settings.mongodb_connect_timeout_ms,
+                socketTimeoutMS=settings.mongodb_socket_timeout_ms,
+                retryWrites=True,
+                retryReads=True,
+                compressors=settings.mongodb_compressors
+            )
             
             # Pilih database yang akan digunakan
             cls.database = cls.client[settings.mongodb_database]
@@ -98,6 +112,50 @@ class Database:
             # Re-raise exception agar aplikasi tidak start dengan DB bermasalah
             raise
     
+    @classmethod
+    async def ensure_indexes(cls):
+        """
+        Membuat index MongoDB yang dibutuhkan query aplikasi.
+        
+        Dipanggil saat startup setelah connect(). create_index idempoten:
+        jika index sudah ada, MongoDB tidak melakukan apa-apa. Kegagalan
+        satu index (misalnya data lama melanggar unique) hanya di-log agar
+        aplikasi tetap bisa start.
+        
+        Index:
+            - activity_logs (user_id, _id DESC): filter user + urutan terbaru
+            - activity_logs (user_id, timestamp DESC): dashboard, AI tips
+            - activity_logs (chain_seq, _id): urutan verifikasi chain dan
+              record terakhir untuk rekonsiliasi tip
+            - activity_logs (user_id, chain_seq, _id): verifikasi chain per user
+            - activity_logs current_hash (unique): cek duplikasi/integritas hash
+            - users email (unique): login, register, update profil
+            - users organisasi_id: daftar/jumlah anggota organisasi
+            - users created_at: query rentang waktu registrasi (BSON Date)
+            - organisasi nama: pencarian organisasi berdasarkan nama
+        
+        init_db.py membuat index yang sama, tetapi hanya saat container init
+        dijalankan; di sini database lama tetap mendapat index-nya.
+        """
+        db = cls.get_database()
+        indexes = [
+            ("activity_logs", [("user_id", ASCENDING), ("_id", DESCENDING)], {}),
+            ("activity_logs", [("user_id", ASCENDING), ("timestamp", DESCENDING)], {}),
+            ("activity_logs", [("current_hash", ASCENDING)], {"unique": True}),
+            ("activity_logs", [("chain_seq", ASCENDING), ("_id", ASCENDING)], {}),
+            ("activity_logs", [("user_id", ASCENDING), ("chain_seq", ASCENDING), ("_id", ASCENDING)], {}),
+            ("users", [("email", ASCENDING)], {"unique": True}),
+            ("users", [("organisasi_id", ASCENDING)], {}),
+            ("users", [("created_at", ASCENDING)], {}),
+            ("organisasi", [("nama", ASCENDING)], {}),
+        ]
+        
+        for collection, keys, options in indexes:
+            try:
+                await db[collection].create_index(keys, **options)
+            except Exception as e:
+                logger.warning(f"Gagal membuat index {collection} {keys}: {e}")
+    
     @classmethod
     async def disconnect(cls):
         """
@@ -142,7 +200,7 @@ class Database:
         return cls.database
     
     @classmethod
-    async def get_collection(cls, collection_name: str):
+    def get_collection(cls, collection_name: str):
         """
         Mendapatkan collection tertentu dari database.
         
@@ -156,7 +214,7 @@ class Database:
             Collection: MongoDB collection yang siap digunakan
             
         Example:
-            users_collection = await Database.get_collection("users")
+            users_collection = Database.get_collection("users")
             user = await users_collection.find_one({"_id": user_id})
         """
         db = cls.get_database()
@@ -166,27 +224,31 @@ class Database:
 # =============================================================================
 # HELPER FUNCTIONS - Dependency Injection untuk FastAPI
 # =============================================================================
-# Fungsi-fungsi ini bisa digunakan sebagai dependency di endpoint FastAPI
+# Fungsi-fungsi ini bisa digunakan sebagai dependency di endpoint FastAPI.
+# Sengaja sinkron (def): isinya hanya lookup atribut, jadi tidak perlu
+# membuat coroutine setiap kali dipanggil. FastAPI juga memanggil dependency
+# sinkron lewat threadpool, jadi pakai langsung get_db() di dalam endpoint.
 
-async def get_db() -> AsyncIOMotorDatabase:
+def get_db() -> AsyncIOMotorDatabase:
     """
-    Dependency untuk mendapatkan instance database.
+    Mendapatkan instance database untuk endpoint handler.
     
-    Digunakan dengan FastAPI Depends untuk inject database
-    ke dalam endpoint handler.
+    Dipanggil langsung di dalam endpoint, bukan lewat Depends: dependency
+    sinkron dijalankan FastAPI di threadpool, padahal ini hanya lookup.
     
     Returns:
         AsyncIOMotorDatabase: Database instance
         
     Example:
         @app.get("/users")
-        async def get_users(db: AsyncIOMotorDatabase = Depends(get_db)):
+        async def get_users():
+            db = get_db()
             return await db.users.find({}).to_list(100)
     """
     return Database.get_database()
 
 
-async def get_activity_logs_collection():
+def get_activity_logs_collection():
     """
     Mendapatkan collection 'activity_logs'.
     
@@ -196,10 +258,10 @@ async def get_activity_logs_collection():
     Returns:
         Collection: Collection activity_logs
     """
-    return await Database.get_collection("activity_logs")
+    return Database.get_database()["activity_logs"]
 
 
-async def get_users_collection():
+def get_users_collection():
     """
     Mendapatkan collection 'users'.
     
@@ -209,4 +271,4 @@ async def get_users_collection():
     Returns:
         Collection: Collection users
     """
-    return await Database.get_collection("users")
+    return Database.get_database()["users"]
@@ -6,33 +6,97 @@ Service untuk berinteraksi dengan Google Gemini API.
 Digunakan untuk fitur "Eco-Assistant" yang memberikan tips pengurangan emisi.
 """
 
+import asyncio
+import hashlib
 import os
 import logging
+import time
+from collections import OrderedDict
 import google.generativeai as genai
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
 logger = logging.getLogger(__name__)
 
 # Konfigurasi API Key dari environment variable
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Menggunakan model Gemini Flash yang tersedia
+GEMINI_MODEL = "gemini-flash-latest"
+
+# Cache jawaban per ringkasan aktivitas: ringkasan yang sama (misal digest
+# mingguan yang identik antar user) tidak perlu memanggil Gemini lagi
+TIPS_CACHE_TTL = 3600
+TIPS_CACHE_MAXSIZE = 2048
+
+# Instruksi statis Eco-Assistant dipasang sekali sebagai system instruction
+# model; setiap request hanya mengirim ringkasan aktivitas sebagai user turn
+TIPS_SYSTEM_INSTRUCTION = """
+You are Eco-Assistant, a friendly and knowledgeable sustainability expert for the EcoLedger app.
+
+Based on the user activity summary you receive, please provide:
+1. A brief encouraging comment about their tracking habit.
+2. Three (3) specific, actionable, and practical tips to reduce their carbon footprint labeled 'Tips:'.
+3. A short "Did you know?" fact related to their highest emission category if identifiable, or environment in general.
+
+Tone: Motivating, positive, and educational.
+Format: Use Markdown formatting (bolding key terms). Keep the total response under 200 words.
+Language: Indonesian (Bahasa Indonesia).
+""".strip()
+TIPS_PROMPT_TEMPLATE = "User activity summary:\n{activity_summary}"
+
+# genai.configure() dan GenerativeModel cukup dibuat sekali per proses,
+# walaupun GenAIService diinstansiasi lebih dari sekali
+_genai_configured = False
+_models: Dict[Tuple[str, str], Any] = {}
+
+
+def _get_model(model_name: str, system_instruction: str):
+    """Ambil GenerativeModel untuk (model_name, system_instruction), dibuat saat pertama dipakai."""
+    global _genai_configured
+    
+    if not _genai_configured:
+        genai.configure(api_key=GEMINI_API_KEY)
+        _genai_configured = True
+    
+    key = (model_name, system_instruction)
+    model = _models.get(key)
+    if model is None:
+        model = _models[key] = genai.GenerativeModel(
+            model_name,
+            system_instruction=system_instruction
+        )
+    return model
 
 class GenAIService:
     def __init__(self):
         if GEMINI_API_KEY:
-            genai.configure(api_key=GEMINI_API_KEY)
-            # Menggunakan model Gemini Flash yang tersedia
-            self.model = genai.GenerativeModel('gemini-flash-latest')
+            self.model = _get_model(GEMINI_MODEL, TIPS_SYSTEM_INSTRUCTION)
             self.is_configured = True
         else:
             logger.warning("GEMINI_API_KEY not found. AI features will be disabled.")
             self.is_configured = False
+        
+        # Cache LRU in-process: digest ringkasan -> (expires_at, tips)
+        self._tips_cache: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+        # Request Gemini yang sedang berjalan, untuk ringkasan identik
+        self._tips_inflight: Dict[bytes, asyncio.Task] = {}
+
+    @staticmethod
+    def _tips_cache_key(activity_summary: str) -> bytes:
+        """Digest BLAKE2b-128 dari ringkasan yang whitespace-nya dinormalisasi."""
+        normalized = " ".join(activity_summary.split())
+        return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
 
-    async def generate_carbon_tips(self, activity_summary: str) -> str:
+    async def generate_carbon_tips(self, activity_summary: str, raise_on_error: bool = False) -> str:
         """
         Produce carbon reduction tips based on user activity.
         
+        Jawaban yang berhasil di-cache per ringkasan selama TIPS_CACHE_TTL;
+        pesan fallback saat error tidak pernah di-cache.
+        
         Args:
             activity_summary: String description of user's recent activities/emissions.
+            raise_on_error: Re-raise Gemini errors instead of returning a fallback message
+                            (so callers can avoid caching the fallback).
             
         Returns:
             AI generated advice as a string (markdown formatted).
@@ -40,31 +104,48 @@ class GenAIService:
         if not self.is_configured:
             return "AI feature is not configured. Please contact admin to set GEMINI_API_KEY."
         
+        cache_key = self._tips_cache_key(activity_summary)
+        entry = self._tips_cache.get(cache_key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._tips_cache.move_to_end(cache_key)
+                return entry[1]
+            del self._tips_cache[cache_key]
+        
         try:
-            prompt = f"""
-            You are Eco-Assistant, a friendly and knowledgeable sustainability expert for the EcoLedger app.
-            
-            Based on the following user activity summary:
-            {activity_summary}
-            
-            Please provide:
-            1. A brief encouraging comment about their tracking habit.
-            2. Three (3) specific, actionable, and practical tips to reduce their carbon footprint labeled 'Tips:'.
-            3. A short "Did you know?" fact related to their highest emission category if identifiable, or environment in general.
-            
-            Tone: Motivating, positive, and educational.
-            Format: Use Markdown formatting (bolding key terms). Keep the total response under 200 words.
-            Language: Indonesian (Bahasa Indonesia).
-            """
-            
-            # Generate content (run in executor to avoid blocking async loop if library is sync)
-            # google-generativeai 'generate_content_async' is available in newer versions
-            response = await self.model.generate_content_async(prompt)
-            
-            return response.text
+            # Ringkasan identik yang datang bersamaan menunggu satu request
+            task = self._tips_inflight.get(cache_key)
+            if task is None:
+                task = asyncio.ensure_future(self._request_tips(activity_summary))
+                self._tips_inflight[cache_key] = task
+                task.add_done_callback(lambda t: self._finish_tips(cache_key, t))
+            return await asyncio.shield(task)
         except Exception as e:
             logger.error(f"Error generating AI tips: {e}")
+            if raise_on_error:
+                raise
             return "Maaf, Eco-Assistant sedang istirahat sejenak. Coba lagi nanti! (Error connecting to AI)"
 
+    def _finish_tips(self, cache_key: bytes, task: asyncio.Task):
+        """Simpan hasil request Gemini yang sukses ke cache."""
+        self._tips_inflight.pop(cache_key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        
+        self._tips_cache[cache_key] = (time.monotonic() + TIPS_CACHE_TTL, task.result())
+        self._tips_cache.move_to_end(cache_key)
+        if len(self._tips_cache) > TIPS_CACHE_MAXSIZE:
+            self._tips_cache.popitem(last=False)
+
+    async def _request_tips(self, activity_summary: str) -> str:
+        """Panggil Gemini untuk satu ringkasan (tanpa cache)."""
+        prompt = TIPS_PROMPT_TEMPLATE.format(activity_summary=activity_summary)
+        
+        # Generate content (run in executor to avoid blocking async loop if library is sync)
+        # google-generativeai 'generate_content_async' is available in newer versions
+        response = await self.model.generate_content_async(prompt)
+        
+        return response.text
+
 # Global instance
 gen_ai_service = GenAIService()
@@ -36,9 +36,38 @@ Version: 1.0.0
 =============================================================================
 """
 
+import asyncio
 import hashlib
-from typing import Union, Dict, Any
+import hmac
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Union, Dict, Any, List, Optional, Tuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import InvalidDocument, WriteError
+
+logger = logging.getLogger(__name__)
+
+# Konstruktor SHA-256 di-bind sekali (tanpa lookup atribut modul per hash)
+_sha256 = hashlib.sha256
+
+
+def hashes_equal(calculated_hash: str, stored_hash: Any) -> bool:
+    """
+    Bandingkan hash hasil hitung dengan hash tersimpan dalam waktu konstan.
+    
+    hmac.compare_digest tidak berhenti di karakter pertama yang berbeda,
+    sehingga lama perbandingan tidak membocorkan berapa prefix hash yang
+    cocok. Hash tersimpan yang bukan string ASCII (data rusak/dimanipulasi)
+    dianggap tidak cocok.
+    """
+    try:
+        return hmac.compare_digest(calculated_hash, stored_hash)
+    except TypeError:
+        return False
 
 
 def generate_hash(
@@ -77,20 +106,18 @@ def generate_hash(
         - Fungsi ini HARUS deterministic (input sama = output sama)
         - Urutan concatenation TIDAK BOLEH diubah
         - Perubahan implementasi akan membuat semua hash lama invalid
+        - Karena itu algoritma (SHA-256) dan payload tanpa prefix/separator
+          dipertahankan, termasuk untuk laporan PDF yang menyebut SHA-256
     """
-    # Konversi emission ke string untuk konsistensi
-    # float("4.87") dan "4.87" harus menghasilkan hash yang sama
-    emission_str = str(carbon_emission)
-    
     # Gabungkan semua data menjadi satu string payload
     # PENTING: Urutan ini TIDAK BOLEH diubah!
-    payload = f"{previous_hash}{user_id}{activity_type}{emission_str}{timestamp}"
+    # f-string memanggil str() pada emission, sehingga float 4.87 dan
+    # string "4.87" menghasilkan hash yang sama
+    payload = f"{previous_hash}{user_id}{activity_type}{carbon_emission}{timestamp}"
     
     # Hash dengan SHA-256 dan kembalikan dalam format hexadecimal
     # encode('utf-8') diperlukan karena hashlib butuh bytes, bukan string
-    hash_result = hashlib.sha256(payload.encode('utf-8')).hexdigest()
-    
-    return hash_result
+    return _sha256(payload.encode('utf-8')).hexdigest()
 
 
 def verify_hash(
@@ -132,12 +159,272 @@ def verify_hash(
         timestamp=record["timestamp"]
     )
     
-    # Bandingkan dengan hash yang tersimpan
-    # Menggunakan == langsung karena keduanya lowercase hexadecimal
-    return calculated_hash == record["current_hash"]
+    # Bandingkan dengan hash yang tersimpan (constant-time)
+    return hashes_equal(calculated_hash, record["current_hash"])
+
+
+# Field yang dibutuhkan untuk verifikasi hash; field lain (climatiq_data,
+# description, dll) tidak perlu dikirim dari database
+HASH_FIELDS_PROJECTION = {
+    "previous_hash": 1,
+    "current_hash": 1,
+    "user_id": 1,
+    "activity_type": 1,
+    "emission": 1,
+    "timestamp": 1,
+    "chain_seq": 1
+}
+
+# Urutan record di chain: chain_seq (posisi yang diklaim di chain_state).
+# Record lama tanpa chain_seq (null) terurut lebih dulu menurut _id.
+CHAIN_ORDER = [("chain_seq", 1), ("_id", 1)]
+
+# Index activity_logs untuk urutan chain global dan per user
+# (dibuat di Database.ensure_indexes)
+CHAIN_ORDER_INDEX = CHAIN_ORDER
+USER_CHAIN_INDEX = [("user_id", 1), ("chain_seq", 1), ("_id", 1)]
+
+
+def verify_hashes(records: List[Dict[str, Any]]) -> List[Optional[bool]]:
+    """
+    Memverifikasi hash banyak record sekaligus dalam satu pass.
+    
+    Versi batch dari verify_hash() untuk endpoint list: fungsi hash
+    di-bind sekali, dan record yang field-nya tidak lengkap tidak
+    menggagalkan record lain.
+    
+    Args:
+        records: List record aktivitas (lihat verify_hash untuk field)
+    
+    Returns:
+        List[Optional[bool]]: Hasil per record dengan urutan yang sama.
+        True = valid, False = tidak cocok, None = tidak bisa diverifikasi
+        (field hilang atau tipe data salah).
+    """
+    hash_fn = generate_hash
+    results: List[Optional[bool]] = []
+    
+    for record in records:
+        try:
+            calculated_hash = hash_fn(
+                record["previous_hash"],
+                record["user_id"],
+                record["activity_type"],
+                record["emission"],
+                record["timestamp"]
+            )
+            results.append(hashes_equal(calculated_hash, record["current_hash"]))
+        except (KeyError, TypeError):
+            results.append(None)
+    
+    return results
+
+
+# =============================================================================
+# VERIFIKASI PARALEL
+# =============================================================================
+# Hash tiap record independen satu sama lain, jadi perhitungan ulang hash
+# untuk verify_chain dibagi ke beberapa process (hashlib tidak melepas GIL
+# untuk payload sekecil ini, sehingga thread tidak membantu). Pengecekan
+# link previous_hash dikerjakan MongoDB (lihat _find_first_link_break).
+
+# Record dibaca dari cursor per batch agar memori tetap terbatas
+VERIFY_BATCH_SIZE = 20_000
+# Ukuran potongan minimum per worker; batch lebih kecil dihitung langsung
+VERIFY_CHUNK_SIZE = 2_000
+# Jumlah record per aggregate pengecekan link; satu range harus selesai jauh
+# di bawah socketTimeoutMS (settings.mongodb_socket_timeout_ms)
+LINK_CHECK_RANGE_SIZE = 50_000
+
+_verify_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_verify_executor() -> ProcessPoolExecutor:
+    """Process pool verifikasi, dibuat saat pertama kali dibutuhkan."""
+    global _verify_executor
+
+    if _verify_executor is None:
+        # spawn: worker tidak mewarisi thread/koneksi Motor dari proses utama
+        _verify_executor = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _verify_executor
+
+
+def shutdown_verify_executor():
+    """Hentikan process pool verifikasi. Dipanggil saat shutdown aplikasi."""
+    global _verify_executor
+
+    if _verify_executor is not None:
+        _verify_executor.shutdown(wait=True, cancel_futures=True)
+        _verify_executor = None
+
+
+def _first_invalid_hash(rows: List[Tuple]) -> int:
+    """
+    Index pertama di rows yang hash-nya tidak cocok, -1 jika semua valid.
+
+    Dijalankan di worker process; setiap row berupa tuple
+    (previous_hash, user_id, activity_type, emission, timestamp, current_hash).
+    """
+    hash_fn = generate_hash
+    for index, (previous_hash, user_id, activity_type, emission, timestamp, current_hash) in enumerate(rows):
+        if not hashes_equal(hash_fn(previous_hash, user_id, activity_type, emission, timestamp), current_hash):
+            return index
+    return -1
+
+
+async def _first_invalid_hash_parallel(rows: List[Tuple]) -> int:
+    """Seperti _first_invalid_hash, tetapi dibagi ke process pool."""
+    if len(rows) < 2 * VERIFY_CHUNK_SIZE:
+        return _first_invalid_hash(rows)
+
+    workers = os.cpu_count() or 1
+    chunk_size = max(VERIFY_CHUNK_SIZE, -(-len(rows) // workers))
+    offsets = range(0, len(rows), chunk_size)
+
+    loop = asyncio.get_running_loop()
+    executor = _get_verify_executor()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(executor, _first_invalid_hash, rows[offset:offset + chunk_size])
+        for offset in offsets
+    ))
+
+    for offset, index in zip(offsets, results):
+        if index >= 0:
+            return offset + index
+    return -1
+
+
+async def _find_first_link_break(
+    collection,
+    query: Dict[str, Any],
+    previous_hash: str
+) -> Optional[Any]:
+    """
+    Cari record pertama yang previous_hash-nya tidak sama dengan current_hash
+    record sebelumnya (urutan CHAIN_ORDER), langsung di MongoDB.
+    
+    $setWindowFields + $shift membandingkan setiap record dengan record
+    sebelumnya di server; yang dikirim ke aplikasi hanya record pertama yang
+    putus dan record terakhir tiap range.
+    
+    Chain dicek per range LINK_CHECK_RANGE_SIZE record (satu aggregate per
+    range), sehingga setiap command selesai jauh di bawah socketTimeoutMS
+    walau chain sangat panjang. current_hash record terakhir satu range
+    menjadi default $shift range berikutnya.
+    
+    Args:
+        collection: Collection activity_logs
+        query: Filter record yang dicek (misal record setelah checkpoint)
+        previous_hash: Hash yang harus ditunjuk record pertama
+    
+    Returns:
+        _id record pertama yang link-nya putus, atau None jika utuh
+    """
+    while True:
+        pipeline = [
+            {"$match": query},
+            {"$sort": dict(CHAIN_ORDER)},
+            {"$limit": LINK_CHECK_RANGE_SIZE},
+            {"$project": {"previous_hash": 1, "current_hash": 1, "chain_seq": 1}},
+            {"$setWindowFields": {
+                "sortBy": dict(CHAIN_ORDER),
+                "output": {
+                    "expected_previous_hash": {
+                        "$shift": {"output": "$current_hash", "by": -1, "default": previous_hash}
+                    },
+                    "last_id": {
+                        "$last": "$_id",
+                        "window": {"documents": ["unbounded", "unbounded"]}
+                    }
+                }
+            }},
+            # Record putus pertama (jika ada) lalu record terakhir range
+            {"$match": {"$or": [
+                {"$expr": {"$ne": ["$previous_hash", "$expected_previous_hash"]}},
+                {"$expr": {"$eq": ["$_id", "$last_id"]}}
+            ]}},
+            {"$limit": 1},
+            {"$project": {
+                "current_hash": 1,
+                "chain_seq": 1,
+                "broken": {"$ne": ["$previous_hash", "$expected_previous_hash"]}
+            }}
+        ]
+        
+        docs = await collection.aggregate(pipeline, allowDiskUse=True).to_list(length=1)
+        if not docs:
+            return None
+        
+        doc = docs[0]
+        if doc["broken"]:
+            return doc["_id"]
+        
+        # Range utuh; lanjut dari record terakhirnya
+        previous_hash = doc["current_hash"]
+        query = _after_chain_position(doc.get("chain_seq"), doc["_id"])
+
 
+# =============================================================================
+# CHECKPOINT VERIFIKASI
+# =============================================================================
+# Record terakhir yang sudah terbukti valid disimpan di collection
+# 'chain_checkpoints', sehingga verify_chain berikutnya cukup mengecek record
+# setelahnya. Checkpoint hanya dipakai jika record-nya masih ada dengan
+# current_hash yang sama; jika tidak, verifikasi diulang dari genesis.
 
-async def verify_chain(db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+CHAIN_CHECKPOINT_COLLECTION = "chain_checkpoints"
+CHAIN_CHECKPOINT_ID = "current"
+
+
+async def _load_chain_checkpoint(db: AsyncIOMotorDatabase) -> Optional[Dict[str, Any]]:
+    """Ambil checkpoint verifikasi, None jika tidak ada atau tidak cocok lagi."""
+    checkpoint = await db[CHAIN_CHECKPOINT_COLLECTION].find_one({"_id": CHAIN_CHECKPOINT_ID})
+    if checkpoint is None:
+        return None
+    
+    anchor = await db["activity_logs"].find_one(
+        {"_id": checkpoint["last_verified_id"]},
+        projection={"current_hash": 1, "chain_seq": 1}
+    )
+    if anchor is None or anchor["current_hash"] != checkpoint["last_verified_hash"]:
+        return None
+    checkpoint["last_verified_seq"] = anchor.get("chain_seq")
+    return checkpoint
+
+
+def _after_chain_position(chain_seq: Optional[int], record_id: Any) -> Dict[str, Any]:
+    """Filter record yang terletak setelah (chain_seq, _id) dalam CHAIN_ORDER."""
+    if chain_seq is None:
+        # Record lama: sisa record lama setelah _id ini + semua record bernomor
+        return {"$or": [
+            {"chain_seq": None, "_id": {"$gt": record_id}},
+            {"chain_seq": {"$ne": None}}
+        ]}
+    return {"chain_seq": {"$gt": chain_seq}}
+
+
+async def _save_chain_checkpoint(
+    db: AsyncIOMotorDatabase,
+    last_record: Dict[str, Any],
+    verified_count: int
+):
+    """Simpan record terakhir yang terverifikasi sebagai checkpoint."""
+    await db[CHAIN_CHECKPOINT_COLLECTION].update_one(
+        {"_id": CHAIN_CHECKPOINT_ID},
+        {"$set": {
+            "last_verified_id": last_record["_id"],
+            "last_verified_hash": last_record["current_hash"],
+            "verified_count": verified_count,
+            "verified_at": datetime.now(timezone.utc)
+        }},
+        upsert=True
+    )
+
+
+async def verify_chain(db: AsyncIOMotorDatabase, force_full: bool = False) -> Dict[str, Any]:
     """
     Memverifikasi integritas seluruh hash chain di database.
     
@@ -148,8 +435,14 @@ async def verify_chain(db: AsyncIOMotorDatabase) -> Dict[str, Any]:
     Ini memastikan tidak ada record yang diubah, dihapus, atau
     disisipkan di tengah chain.
     
+    Verifikasi bersifat inkremental: setelah berhasil, posisi record terakhir
+    disimpan sebagai checkpoint (collection chain_checkpoints) dan
+    verifikasi berikutnya hanya mengecek record setelahnya. Gunakan
+    force_full=True untuk audit penuh dari genesis.
+    
     Args:
         db: Instance AsyncIOMotorDatabase untuk query MongoDB
+        force_full: True untuk mengabaikan checkpoint dan cek dari genesis
     
     Returns:
         Dict dengan struktur:
@@ -162,7 +455,7 @@ async def verify_chain(db: AsyncIOMotorDatabase) -> Dict[str, Any]:
     
     Example:
         >>> from database import get_db
-        >>> db = await get_db()
+        >>> db = get_db()
         >>> result = await verify_chain(db)
         >>> if result["valid"]:
         >>>     print("Semua data valid!")
@@ -170,15 +463,17 @@ async def verify_chain(db: AsyncIOMotorDatabase) -> Dict[str, Any]:
         >>>     print(f"ERROR di record: {result['invalid_record_id']}")
     
     Performance Note:
-        - Fungsi ini membaca SEMUA record dari database
-        - Untuk database besar, pertimbangkan pagination atau sampling
+        - Tanpa checkpoint (atau force_full) fungsi ini membaca SEMUA record
+        - Dengan checkpoint hanya record baru yang dibaca (O(record baru))
+        - Perhitungan ulang hash batch besar dibagi ke process pool
+          (semua core), event loop tidak ikut terblokir
         - Jalankan di off-peak hours untuk database production
     """
     # Ambil collection activity_logs
     collection = db["activity_logs"]
     
-    # Hitung total record untuk response
-    total_records = await collection.count_documents({})
+    # Hitung total record untuk response (dari metadata collection, tanpa scan)
+    total_records = await collection.estimated_document_count()
     
     # Jika database kosong, langsung return valid
     if total_records == 0:
@@ -191,47 +486,118 @@ async def verify_chain(db: AsyncIOMotorDatabase) -> Dict[str, Any]:
     # =========================================================================
     # Ambil semua record, diurutkan dari yang terlama
     # =========================================================================
-    # Sorting by _id karena MongoDB ObjectId terurut berdasarkan waktu insert
-    cursor = collection.find().sort("_id", 1)  # 1 = ascending (oldest first)
-    
     # Variabel untuk tracking chain
     previous_hash = "0" * 64  # Genesis: 64 karakter nol
     record_number = 0
-    
-    # =========================================================================
-    # Iterasi dan verifikasi setiap record
-    # =========================================================================
-    async for record in cursor:
-        record_number += 1
+    query: Dict[str, Any] = {}
+    
+    # Lanjutkan dari checkpoint jika masih cocok dengan record-nya
+    checkpoint = None if force_full else await _load_chain_checkpoint(db)
+    if checkpoint is not None:
+        previous_hash = checkpoint["last_verified_hash"]
+        record_number = checkpoint["verified_count"]
+        query = _after_chain_position(
+            checkpoint["last_verified_seq"], checkpoint["last_verified_id"]
+        )
+    
+    # -------------------------------------------------------------------------
+    # CHECK 1: previous_hash harus point ke hash record sebelumnya.
+    # Dicek di MongoDB; hash cukup dihitung ulang untuk record sebelum link
+    # pertama yang putus (urutan laporan sama dengan pengecekan per record).
+    # -------------------------------------------------------------------------
+    link_break_id = await _find_first_link_break(collection, query, previous_hash)
+    
+    # Urut sesuai posisi di chain (chain_seq), bukan _id: _id dibuat di
+    # client sehingga urutannya bisa berbeda dengan urutan klaim tip.
+    # Streaming satu cursor dengan projection; yang ditahan di memori hanya
+    # satu batch (VERIFY_BATCH_SIZE record), bukan seluruh collection.
+    # batch_size disamakan dengan batch verifikasi: tanpa ini batch pertama
+    # hanya 101 dokumen. Sort memakai index (chain_seq, _id).
+    cursor = collection.find(
+        query,
+        projection=HASH_FIELDS_PROJECTION
+    ).sort(CHAIN_ORDER).hint(CHAIN_ORDER_INDEX).batch_size(VERIFY_BATCH_SIZE)
+    
+    batch: List[Dict[str, Any]] = []
+    last_record: Optional[Dict[str, Any]] = None
+    
+    # -------------------------------------------------------------------------
+    # CHECK 2: hash dihitung ulang dan dibandingkan dengan yang tersimpan
+    # -------------------------------------------------------------------------
+    async def check_batch(
+        records: List[Dict[str, Any]],
+        first_number: int
+    ) -> Optional[Dict[str, Any]]:
+        rows = [
+            (
+                record["previous_hash"],
+                record["user_id"],
+                record["activity_type"],
+                record["emission"],
+                record["timestamp"],
+                record["current_hash"]
+            )
+            for record in records
+        ]
+        index = await _first_invalid_hash_parallel(rows)
+        if index < 0:
+            return None
         
-        # -----------------------------------------------------------------
-        # CHECK 1: Apakah previous_hash cocok dengan chain?
-        # -----------------------------------------------------------------
-        # Record harus point ke hash record sebelumnya
-        if record["previous_hash"] != previous_hash:
-            return {
-                "valid": False,
-                "total_records": total_records,
-                "message": f"Chain terputus di record #{record_number}. "
-                          f"Previous hash tidak cocok.",
-                "invalid_record_id": str(record["_id"])
-            }
-        
-        # -----------------------------------------------------------------
-        # CHECK 2: Apakah hash record ini valid?
-        # -----------------------------------------------------------------
-        # Recalculate hash dan bandingkan dengan yang tersimpan
-        if not verify_hash(record):
-            return {
-                "valid": False,
-                "total_records": total_records,
-                "message": f"Hash tidak valid di record #{record_number}. "
-                          f"Data kemungkinan sudah dimodifikasi.",
-                "invalid_record_id": str(record["_id"])
-            }
+        return {
+            "valid": False,
+            "total_records": total_records,
+            "message": f"Hash tidak valid di record #{first_number + index + 1}. "
+                       f"Data kemungkinan sudah dimodifikasi.",
+            "invalid_record_id": str(records[index]["_id"])
+        }
+    
+    # Batch diverifikasi di task terpisah sementara batch berikutnya dibaca
+    # dari cursor, jadi network I/O dan hashing berjalan tumpang-tindih.
+    # Paling banyak dua batch di memori: yang sedang dicek dan yang dibaca.
+    pending: Optional[asyncio.Task] = None
+    try:
+        async for record in cursor:
+            # Record yang link-nya putus dan sesudahnya tidak dicek hash-nya
+            if record["_id"] == link_break_id:
+                break
+            batch.append(record)
+            last_record = record
+            if len(batch) < VERIFY_BATCH_SIZE:
+                continue
+            
+            if pending is not None:
+                result = await pending
+                if result is not None:
+                    return result
+            pending = asyncio.create_task(check_batch(batch, record_number))
+            record_number += len(batch)
+            batch = []
         
-        # Update previous_hash untuk record berikutnya
-        previous_hash = record["current_hash"]
+        if pending is not None:
+            result = await pending
+            if result is not None:
+                return result
+        if batch:
+            result = await check_batch(batch, record_number)
+            if result is not None:
+                return result
+            record_number += len(batch)
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+    
+    # Semua record sampai last_record valid: simpan sebagai checkpoint baru
+    if last_record is not None:
+        await _save_chain_checkpoint(db, last_record, record_number)
+    
+    if link_break_id is not None:
+        return {
+            "valid": False,
+            "total_records": total_records,
+            "message": f"Chain terputus di record #{record_number + 1}. "
+                       f"Previous hash tidak cocok.",
+            "invalid_record_id": str(link_break_id)
+        }
     
     # =========================================================================
     # Semua record valid!
@@ -246,38 +612,40 @@ async def verify_chain_for_user(db: AsyncIOMotorDatabase, user_id: str) -> Dict[
     """
     Verifikasi hash chain untuk user tertentu saja.
     """
-    from bson import ObjectId
-    
-    try:
-        user_obj = ObjectId(user_id)
-    except:
-        user_obj = user_id
-    
     activities_collection = db["activity_logs"]
     
-    # Ambil semua aktivitas user, diurutkan berdasarkan timestamp
-    activities_cursor = activities_collection.find({
-        "$or": [{"user_id": user_id}, {"user_id": user_obj}]
-    }).sort("timestamp", 1)
-    
-    activities = await activities_cursor.to_list(length=None)
-    total = len(activities)
-    
-    if total == 0:
-        return {
-            "valid": True,
-            "total_records": 0,
-            "message": "Belum ada aktivitas untuk diverifikasi"
-        }
-    
-    # Verifikasi setiap record
+    # user_id disimpan sebagai string; index (user_id, chain_seq, _id)
+    # melayani filter dan urutan di bawah
+    query = {"user_id": user_id}
+    
+    # Ambil aktivitas user sesuai urutan chain (CHAIN_ORDER), sama dengan
+    # verify_chain, streaming per batch dengan projection (tanpa memuat
+    # semua record ke memori). hint memastikan sort dilayani index, tanpa
+    # tahap SORT di memori
+    activities_cursor = activities_collection.find(
+        query,
+        projection=HASH_FIELDS_PROJECTION
+    ).sort(CHAIN_ORDER).hint(USER_CHAIN_INDEX).batch_size(VERIFY_BATCH_SIZE)
+    
+    # Verifikasi setiap record. Jumlah record dihitung sambil iterasi;
+    # count_documents hanya dipanggil di jalur gagal (loop berhenti lebih awal)
     previous_hash = None
-    for activity in activities:
+    hash_fn = generate_hash
+    total = 0
+    async for activity in activities_cursor:
+        total += 1
+        
         # 1. Cek apakah hash record valid
-        if not verify_hash(activity):
+        if not hashes_equal(hash_fn(
+            activity["previous_hash"],
+            activity["user_id"],
+            activity["activity_type"],
+            activity["emission"],
+            activity["timestamp"]
+        ), activity["current_hash"]):
             return {
                 "valid": False,
-                "total_records": total,
+                "total_records": await activities_collection.count_documents(query),
                 "message": f"Hash tidak valid pada record {activity['_id']}",
                 "invalid_record_id": str(activity['_id'])
             }
@@ -287,18 +655,232 @@ async def verify_chain_for_user(db: AsyncIOMotorDatabase, user_id: str) -> Dict[
             if activity["previous_hash"] != previous_hash:
                 return {
                     "valid": False,
-                    "total_records": total,
+                    "total_records": await activities_collection.count_documents(query),
                     "message": f"Chain terputus pada record {activity['_id']}",
                     "invalid_record_id": str(activity['_id'])
                 }
         
         previous_hash = activity["current_hash"]
     
+    if total == 0:
+        return {
+            "valid": True,
+            "total_records": 0,
+            "message": "Belum ada aktivitas untuk diverifikasi"
+        }
+    
     return {
         "valid": True,
         "total_records": total,
         "message": f"Semua {total} record terverifikasi dengan sukses"
     }
+# =============================================================================
+# CHAIN STATE (TIP HASH)
+# =============================================================================
+# Hash terakhir chain disimpan di collection 'chain_state' sebagai satu
+# dokumen. Record baru "mengklaim" posisi di chain dengan compare-and-set:
+# tip_hash hanya diganti jika masih sama dengan previous_hash yang dipakai,
+# dan seq dinaikkan. Nilai seq hasil klaim disimpan di record sebagai
+# chain_seq, sehingga urutan verifikasi sama dengan urutan klaim.
+#
+# Tip dipindahkan sebelum record di-insert. Jika insert tidak pernah terjadi
+# (proses mati, error yang tidak pasti), tip menunjuk hash tanpa record.
+# Tip seperti itu direkonsiliasi ke record tersimpan terakhir setelah
+# klaimnya lebih tua dari CHAIN_CLAIM_GRACE_SECONDS (insert yang masih
+# berjalan tidak ikut dibatalkan).
+#
+# Tip di memori hanya berisi hash yang record-nya sudah/sedang di-insert oleh
+# proses ini atau terbukti tersimpan; compare-and-set tetap memastikan tip
+# tersebut masih yang terbaru.
+
+CHAIN_STATE_COLLECTION = "chain_state"
+CHAIN_STATE_ID = "global"
+
+# Klaim yang lebih lama dari ini tanpa record dianggap gagal (harus lebih
+# lama dari socketTimeoutMS + retry write MongoDB)
+CHAIN_CLAIM_GRACE_SECONDS = 60
+
+_chain_tip_cache: Optional[str] = None
+
+
+async def _latest_chain_record(db: AsyncIOMotorDatabase) -> Optional[Dict[str, Any]]:
+    """Record tersimpan terakhir menurut CHAIN_ORDER (None jika kosong)."""
+    return await db["activity_logs"].find_one(
+        sort=[(field, -1) for field, _ in CHAIN_ORDER],
+        projection={"current_hash": 1, "chain_seq": 1},
+        hint=CHAIN_ORDER_INDEX
+    )
+
+
+async def reconcile_chain_tip(db: AsyncIOMotorDatabase) -> str:
+    """
+    Baca tip dari chain_state dan perbaiki jika menunjuk hash tanpa record.
+    
+    Dipanggil saat startup dan setiap compare-and-set gagal. Jika dokumen
+    chain_state belum ada (database lama), tip diinisialisasi dari record
+    activity_logs terakhir atau genesis hash.
+    
+    Args:
+        db: Instance AsyncIOMotorDatabase
+    
+    Returns:
+        str: Hash tip saat ini
+    """
+    global _chain_tip_cache
+    
+    state_collection = db[CHAIN_STATE_COLLECTION]
+    state = await state_collection.find_one({"_id": CHAIN_STATE_ID})
+    
+    if state is None:
+        # Bootstrap dari record terakhir; $setOnInsert aman jika proses lain
+        # melakukan bootstrap bersamaan
+        last_doc = await _latest_chain_record(db)
+        tip = last_doc["current_hash"] if last_doc else get_genesis_hash()
+        seq = (last_doc or {}).get("chain_seq") or 0
+        await state_collection.update_one(
+            {"_id": CHAIN_STATE_ID},
+            {"$setOnInsert": {"tip_hash": tip, "seq": seq}},
+            upsert=True
+        )
+        state = await state_collection.find_one({"_id": CHAIN_STATE_ID})
+    
+    tip = state["tip_hash"]
+    claimed_at = state.get("claimed_at")
+    if claimed_at is not None:
+        claim_age = datetime.now(timezone.utc) - claimed_at.replace(tzinfo=timezone.utc)
+        if claim_age.total_seconds() < CHAIN_CLAIM_GRACE_SECONDS:
+            # Insert record untuk tip ini mungkin masih berjalan; tidak
+            # di-cache karena belum pasti tersimpan
+            _chain_tip_cache = None
+            return tip
+    
+    last_doc = await _latest_chain_record(db)
+    stored_tip = last_doc["current_hash"] if last_doc else get_genesis_hash()
+    if tip == stored_tip or await db["activity_logs"].find_one(
+        {"current_hash": tip}, projection={"_id": 1}
+    ):
+        _chain_tip_cache = tip
+        return tip
+    
+    # Tip tanpa record: kembalikan ke record tersimpan terakhir. Filter seq
+    # memastikan tidak ada klaim baru di antara pembacaan dan update ini.
+    result = await state_collection.update_one(
+        {"_id": CHAIN_STATE_ID, "tip_hash": tip, "seq": state["seq"]},
+        {"$set": {"tip_hash": stored_tip}}
+    )
+    if result.modified_count == 1:
+        logger.warning(
+            f"Tip chain {tip[:12]}... tidak punya record, dikembalikan ke {stored_tip[:12]}..."
+        )
+        _chain_tip_cache = stored_tip
+        return stored_tip
+    
+    # Ada klaim baru sementara rekonsiliasi berjalan; pakai tip terbaru
+    _chain_tip_cache = None
+    state = await state_collection.find_one({"_id": CHAIN_STATE_ID})
+    return state["tip_hash"]
+
+
+async def get_chain_tip(db: AsyncIOMotorDatabase, refresh: bool = False) -> str:
+    """
+    Mendapatkan hash terakhir (tip) dari hash chain.
+    
+    Args:
+        db: Instance AsyncIOMotorDatabase
+        refresh: True untuk mengabaikan cache memori dan membaca (serta
+            merekonsiliasi) tip dari database
+    
+    Returns:
+        str: Hash tip saat ini
+    """
+    if _chain_tip_cache is not None and not refresh:
+        return _chain_tip_cache
+    return await reconcile_chain_tip(db)
+
+
+async def claim_chain_position(
+    db: AsyncIOMotorDatabase,
+    previous_hash: str,
+    current_hash: str
+) -> Optional[int]:
+    """
+    Memindahkan tip chain dari previous_hash ke current_hash secara atomik.
+    
+    Args:
+        db: Instance AsyncIOMotorDatabase
+        previous_hash: Tip yang diharapkan saat ini
+        current_hash: Tip baru
+    
+    Returns:
+        Optional[int]: Posisi record di chain (disimpan sebagai chain_seq),
+        atau None jika tip sudah diubah proses lain
+    """
+    global _chain_tip_cache
+    
+    state = await db[CHAIN_STATE_COLLECTION].find_one_and_update(
+        {"_id": CHAIN_STATE_ID, "tip_hash": previous_hash},
+        {
+            "$set": {"tip_hash": current_hash},
+            "$inc": {"seq": 1},
+            "$currentDate": {"claimed_at": True}
+        },
+        projection={"seq": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    
+    if state is not None:
+        _chain_tip_cache = current_hash
+        return state["seq"]
+    
+    _chain_tip_cache = None
+    return None
+
+
+async def release_chain_claim(
+    db: AsyncIOMotorDatabase,
+    chain_seq: int,
+    previous_hash: str,
+    current_hash: str,
+    error: Exception
+):
+    """
+    Tangani insert record yang gagal setelah posisinya diklaim.
+    
+    Tip hanya dikembalikan ke previous_hash jika insert pasti tidak
+    tersimpan (ditolak server / dokumen tidak valid) dan belum ada klaim
+    lain di atasnya. Untuk error yang tidak pasti (timeout, koneksi putus)
+    record mungkin sudah tersimpan, jadi tip dibiarkan; reconcile_chain_tip
+    memperbaikinya setelah CHAIN_CLAIM_GRACE_SECONDS jika record tidak ada.
+    
+    Args:
+        db: Instance AsyncIOMotorDatabase
+        chain_seq: Posisi hasil claim_chain_position
+        previous_hash: Tip sebelum klaim
+        current_hash: Hash record yang gagal di-insert
+        error: Exception dari insert
+    """
+    global _chain_tip_cache
+    
+    _chain_tip_cache = None
+    
+    if not isinstance(error, (WriteError, InvalidDocument)):
+        logger.warning(
+            f"Insert record chain #{chain_seq} tidak pasti ({error}); "
+            f"tip tidak dikembalikan"
+        )
+        return
+    
+    result = await db[CHAIN_STATE_COLLECTION].update_one(
+        {"_id": CHAIN_STATE_ID, "tip_hash": current_hash, "seq": chain_seq},
+        {"$set": {"tip_hash": previous_hash}}
+    )
+    if result.modified_count == 0:
+        logger.error(
+            f"Record chain #{chain_seq} gagal disimpan setelah klaim lain "
+            f"dibangun di atasnya; chain terputus di {current_hash[:12]}..."
+        )
+
+
 # =============================================================================
 # UTILITY FUNCTIONS
 # =============================================================================
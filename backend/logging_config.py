@@ -0,0 +1,122 @@
+"""
+=============================================================================
+LOGGING CONFIGURATION
+=============================================================================
+Setup logging aplikasi yang tidak memblokir event loop.
+
+- Logger hanya memasukkan record ke antrian (QueueHandler); formatting
+  (termasuk traceback exc_info) dan penulisan ke stream dikerjakan thread
+  QueueListener.
+- Error yang identik (lokasi + tipe exception sama) dalam jendela waktu
+  singkat di-sampling: hanya yang pertama ditulis, sisanya dihitung dan
+  dilaporkan bersama error berikutnya. Saat error storm (DB failover,
+  upstream down) log tidak menenggelamkan aplikasi.
+
+Penggunaan:
+    from logging_config import setup_logging
+
+    setup_logging("INFO")   # saat import app; sisa antrian di-flush saat exit
+"""
+
+import atexit
+import copy
+import logging
+import logging.handlers
+import queue
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Jendela sampling error identik (detik) dan jumlah signature yang diingat
+ERROR_SAMPLE_WINDOW = 10.0
+ERROR_SAMPLE_MAXSIZE = 1024
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class ErrorSamplingFilter(logging.Filter):
+    """Loloskan satu error per signature per ERROR_SAMPLE_WINDOW detik."""
+
+    def __init__(self):
+        super().__init__()
+        # signature -> [waktu mulai jendela, jumlah yang di-drop]
+        self._seen: "OrderedDict[Tuple, list]" = OrderedDict()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.ERROR:
+            return True
+
+        exc_type = record.exc_info[0] if record.exc_info else None
+        signature = (record.pathname, record.lineno, exc_type)
+        now = time.monotonic()
+
+        entry = self._seen.get(signature)
+        if entry is not None and now - entry[0] < ERROR_SAMPLE_WINDOW:
+            entry[1] += 1
+            return False
+
+        if entry is not None and entry[1]:
+            record.msg = f"{record.msg} (+{entry[1]} error serupa di-suppress)"
+
+        self._seen[signature] = [now, 0]
+        self._seen.move_to_end(signature)
+        if len(self._seen) > ERROR_SAMPLE_MAXSIZE:
+            self._seen.popitem(last=False)
+        return True
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler yang tidak mem-format record di thread pemanggil.
+
+    QueueHandler bawaan memanggil format() (termasuk traceback) sebelum
+    enqueue; di sini formatting diserahkan ke handler milik listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+
+def setup_logging(level: str = "INFO"):
+    """
+    Pasang logging berbasis antrian pada root logger.
+
+    Args:
+        level: Nama level logging (DEBUG, INFO, WARNING, ...)
+    """
+    global _listener
+
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    queue_handler = _DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(ErrorSamplingFilter())
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level))
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+    # Tulis sisa record saat proses berhenti
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Hentikan listener dan tulis sisa record di antrian."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -19,9 +19,8 @@ Version: 1.0.0
 =============================================================================
 """
 
-from pydantic import BaseModel, Field, validator, EmailStr
+from pydantic import BaseModel, ConfigDict, Field, field_validator, EmailStr
 from typing import Optional, Dict, Any, List, Literal
-from datetime import datetime
 
 
 # =============================================================================
@@ -36,8 +35,8 @@ class OrganisasiResponse(BaseModel):
     created_at: str = Field(..., description="Waktu dibuat")
     jumlah_anggota: int = Field(default=0, description="Jumlah anggota")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "id": "507f1f77bcf86cd799439011",
                 "nama": "PT. Green Energy Indonesia",
@@ -45,6 +44,7 @@ class OrganisasiResponse(BaseModel):
                 "jumlah_anggota": 5
             }
         }
+    )
 
 
 # =============================================================================
@@ -63,8 +63,8 @@ class UserCreate(BaseModel):
         description="Role user: 'admin' atau 'user'"
     )
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "email": "user@example.com",
                 "password": "password123",
@@ -73,6 +73,7 @@ class UserCreate(BaseModel):
                 "role": "user"
             }
         }
+    )
 
 
 class UserLogin(BaseModel):
@@ -81,13 +82,14 @@ class UserLogin(BaseModel):
     email: EmailStr = Field(..., description="Email user")
     password: str = Field(..., description="Password user")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "email": "user@example.com",
                 "password": "password123"
             }
         }
+    )
 
 
 class UserResponse(BaseModel):
@@ -100,8 +102,8 @@ class UserResponse(BaseModel):
     role: str = Field(..., description="Role user (admin/user)")
     created_at: str = Field(..., description="Waktu registrasi")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "id": "507f1f77bcf86cd799439011",
                 "email": "user@example.com",
@@ -111,6 +113,7 @@ class UserResponse(BaseModel):
                 "created_at": "2024-12-29T10:00:00"
             }
         }
+    )
 
 
 class TokenResponse(BaseModel):
@@ -120,8 +123,8 @@ class TokenResponse(BaseModel):
     token_type: str = Field(default="bearer", description="Tipe token")
     user: UserResponse = Field(..., description="Data user yang login")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "access_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...",
                 "token_type": "bearer",
@@ -134,6 +137,7 @@ class TokenResponse(BaseModel):
                 }
             }
         }
+    )
 
 
 class ProfileUpdate(BaseModel):
@@ -142,13 +146,14 @@ class ProfileUpdate(BaseModel):
     email: EmailStr = Field(..., description="Email user")
     organisasi: Optional[str] = Field(None, description="Nama organisasi/perusahaan user")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "name": "John Doe Updated",
                 "email": "newemail@example.com"
             }
         }
+    )
 
 
 class PasswordChange(BaseModel):
@@ -156,13 +161,14 @@ class PasswordChange(BaseModel):
     current_password: str = Field(..., description="Password saat ini")
     new_password: str = Field(..., min_length=6, description="Password baru minimal 6 karakter")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "current_password": "oldpassword123",
                 "new_password": "newpassword123"
             }
         }
+    )
 
 
 # =============================================================================
@@ -227,8 +233,9 @@ class ActivityCreate(BaseModel):
         description="Deskripsi atau catatan tambahan untuk aktivitas ini"
     )
     
-    @validator('activity_type')
-    def validasi_activity_type(cls, v):
+    @field_validator('activity_type')
+    @classmethod
+    def validasi_activity_type(cls, v: str) -> str:
         """
         Validasi custom untuk memastikan activity_type tidak kosong.
         
@@ -251,11 +258,9 @@ class ActivityCreate(BaseModel):
         # Normalize: lowercase dan hapus whitespace di awal/akhir
         return v.strip().lower()
     
-    class Config:
-        """Konfigurasi Pydantic untuk model ini."""
-        
+    model_config = ConfigDict(
         # Contoh data untuk Swagger UI documentation
-        json_schema_extra = {
+        json_schema_extra={
             "example": {
                 "user_id": "user123",
                 "activity_type": "car",
@@ -263,6 +268,7 @@ class ActivityCreate(BaseModel):
                 "description": "Perjalanan ke kantor"
             }
         }
+    )
 
 
 class EmissionEstimateRequest(BaseModel):
@@ -286,13 +292,14 @@ class EmissionEstimateRequest(BaseModel):
     weight_kg: Optional[float] = None
     money_spent: Optional[float] = None
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "activity_type": "motorbike",
                 "distance_km": 10.0
             }
         }
+    )
 
 
 # =============================================================================
@@ -379,8 +386,8 @@ class ActivityResponse(BaseModel):
         description="Pesan status hash: 'valid', 'invalid', atau 'unverified'"
     )
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "id": "507f1f77bcf86cd799439011",
                 "user_id": "user123",
@@ -394,6 +401,7 @@ class ActivityResponse(BaseModel):
                 "description": "Perjalanan ke kantor"
             }
         }
+    )
 
 
 class EmissionEstimateResponse(BaseModel):
@@ -420,14 +428,17 @@ class ActivityListResponse(BaseModel):
     
     Attributes:
         total: Jumlah total aktivitas yang cocok dengan filter
+               (None jika include_total=false)
         page: Nomor halaman saat ini
         page_size: Jumlah item per halaman
+        next_cursor: Cursor untuk halaman berikutnya (None jika halaman terakhir)
         activities: Daftar aktivitas di halaman ini
     """
     
-    total: int = Field(..., description="Total aktivitas yang ditemukan")
+    total: Optional[int] = Field(None, description="Total aktivitas yang ditemukan")
     page: int = Field(..., description="Nomor halaman saat ini")
     page_size: int = Field(..., description="Jumlah item per halaman")
+    next_cursor: Optional[str] = Field(None, description="Nilai after_id untuk halaman berikutnya")
     activities: List[ActivityResponse] = Field(..., description="Daftar aktivitas")
 
 
@@ -474,14 +485,15 @@ class HashVerificationResponse(BaseModel):
     message: str = Field(..., description="Pesan hasil verifikasi")
     invalid_record_id: Optional[str] = Field(None, description="ID record yang hash-nya tidak cocok")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "valid": True,
                 "total_records": 150,
                 "message": "Semua hash valid. Integritas data terjamin!"
             }
         }
+    )
 
 
 class ErrorResponse(BaseModel):
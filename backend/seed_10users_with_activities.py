@@ -11,11 +11,19 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timedelta, timezone
 import bcrypt
 import random
+import re
 import hashlib
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 from cassandra.cluster import Cluster
 from cassandra.auth import PlainTextAuthProvider
-import uuid
+from cassandra.util import uuid_from_time
+
+from cassandra_service import (
+    INSERT_AUDIT_QUERY,
+    INSERT_AUDIT_BY_TIME_QUERY,
+    _audit_day_bucket,
+)
 
 # Timezone WIB
 WIB = timezone(timedelta(hours=7))
@@ -24,16 +32,26 @@ WIB = timezone(timedelta(hours=7))
 CASSANDRA_HOST = os.getenv("CASSANDRA_HOST", "eco_cassandra")
 CASSANDRA_KEYSPACE = "eco_logs"
 
+# Audit ditulis dengan query yang sama dengan backend (cassandra_service) ke
+# activity_audit dan activity_audit_by_time, di-prepare sekali di main().
+# Insert dikirim paralel tanpa BATCH (audit tersebar di partisi berbeda).
+# Jumlah insert audit yang dikirim bersamaan per batch
+AUDIT_BATCH_SIZE = 50
+
 def get_cassandra_session():
     """Get Cassandra session"""
     cluster = Cluster([CASSANDRA_HOST])
     session = cluster.connect(CASSANDRA_KEYSPACE)
     return session, cluster
 
+# Cost factor bcrypt untuk user dummy; cukup rendah karena password seed
+# bukan kredensial sungguhan (default bcrypt 12 ~256x lebih lambat dari 4)
+SEED_BCRYPT_ROUNDS = int(os.getenv("SEED_BCRYPT_ROUNDS", "4"))
+
 # Simple bcrypt hashing
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: int = SEED_BCRYPT_ROUNDS) -> str:
     """Hash password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
 
 def generate_hash(previous_hash: str, user_id: str, activity_type: str, emission: float, timestamp: str) -> str:
     """Generate SHA-256 hash for blockchain-like chain"""
@@ -117,6 +135,14 @@ USERS_DATA = [
     }
 ]
 
+# Faktor emisi sederhana (kg CO2e per km untuk transportasi, per kWh untuk listrik)
+EMISSION_FACTORS = {
+    "car": 0.192,
+    "motorcycle": 0.084,
+    "bus": 0.089,
+    "electricity": 0.85,
+}
+
 # Template aktivitas dengan variasi
 ACTIVITY_TEMPLATES = [
     # Transportasi mobil
@@ -138,106 +164,225 @@ ACTIVITY_TEMPLATES = [
 ]
 
 
-async def get_or_create_organisasi(db, nama_organisasi: str, created_by: str):
-    """Get or create organisasi."""
+async def get_or_create_organisasi_many(db, nama_list, created_by: str):
+    """
+    Get or create banyak organisasi sekaligus.
+
+    Semua nama dicek dengan satu query regex (case-insensitive, sama seperti
+    pencarian nama di backend) dan yang belum ada dibuat dengan satu insert_many.
+
+    Returns:
+        Dict nama (lowercase) -> organisasi_id (string)
+    """
     organisasi_collection = db["organisasi"]
-    
-    # Cari organisasi
-    existing = await organisasi_collection.find_one({
-        "nama": {"$regex": f"^{nama_organisasi}$", "$options": "i"}
-    })
-    
-    if existing:
-        return str(existing["_id"])
-    
-    # Buat organisasi baru
-    now_str = datetime.now(WIB).isoformat()
-    new_org = {
-        "nama": nama_organisasi,
-        "created_at": now_str,
-        "created_by": created_by
+
+    # Unikkan nama tanpa membedakan huruf besar/kecil, simpan ejaan pertama
+    unique_names = {}
+    for nama in nama_list:
+        unique_names.setdefault(nama.lower(), nama)
+
+    pattern = "^(?:" + "|".join(re.escape(nama) for nama in unique_names.values()) + ")$"
+    organisasi_ids = {
+        doc["nama"].lower(): str(doc["_id"])
+        async for doc in organisasi_collection.find(
+            {"nama": {"$regex": pattern, "$options": "i"}}, {"nama": 1}
+        )
     }
-    
-    result = await organisasi_collection.insert_one(new_org)
-    print(f"   ✓ Organisasi dibuat: {nama_organisasi}")
-    return str(result.inserted_id)
 
+    # Buat organisasi baru (created_at sebagai BSON Date UTC)
+    new_orgs = [
+        {
+            "nama": nama,
+            "created_at": datetime.now(timezone.utc),
+            "created_by": created_by
+        }
+        for key, nama in unique_names.items()
+        if key not in organisasi_ids
+    ]
+    if new_orgs:
+        result = await organisasi_collection.insert_many(new_orgs)
+        for org, _id in zip(new_orgs, result.inserted_ids):
+            organisasi_ids[org["nama"].lower()] = str(_id)
+            print(f"   ✓ Organisasi dibuat: {org['nama']}")
+
+    return organisasi_ids
+
+
+async def seed_users(db, users_data):
+    """
+    Create banyak user sekaligus dengan organisasi masing-masing.
 
-async def create_user(db, user_data):
-    """Create user dengan organisasi."""
+    Hash password dijalankan paralel di thread (bcrypt melepas GIL) lalu
+    semua user baru disimpan dengan satu insert_many.
+
+    Returns:
+        Dict email -> user_id (string) untuk semua user di users_data
+    """
     users_collection = db["users"]
-    
-    # Cek apakah user sudah ada
-    existing = await users_collection.find_one({"email": user_data["email"]})
-    if existing:
-        print(f"   ⚠ User sudah ada: {user_data['email']}")
-        return str(existing["_id"])
-    
-    # Hash password
-    hashed_password = hash_password(user_data["password"])
-    
-    # Get or create organisasi
-    organisasi_id = await get_or_create_organisasi(
-        db, 
-        user_data["organisasi"],
+    emails = [user_data["email"] for user_data in users_data]
+
+    # Cek user yang sudah ada dalam satu query
+    existing = {
+        doc["email"]: str(doc["_id"])
+        async for doc in users_collection.find({"email": {"$in": emails}}, {"email": 1})
+    }
+    for email in existing:
+        print(f"   ⚠ User sudah ada: {email}")
+
+    new_users = [u for u in users_data if u["email"] not in existing]
+    if not new_users:
+        return existing
+
+    # Dengan SEED_BCRYPT_ROUNDS rendah hash hanya ~1 ms, jauh lebih murah dari
+    # start process pool; thread tetap paralel jika rounds dinaikkan
+    hashed_passwords = await asyncio.gather(*(
+        asyncio.to_thread(hash_password, user_data["password"])
+        for user_data in new_users
+    ))
+
+    # Get or create organisasi semua user baru sekaligus
+    organisasi_ids = await get_or_create_organisasi_many(
+        db,
+        [user_data["organisasi"] for user_data in new_users],
         "system"
     )
+
+    user_docs = []
+    for user_data, hashed_password in zip(new_users, hashed_passwords):
+        # created_at sebagai BSON Date UTC
+        user_docs.append({
+            "email": user_data["email"],
+            "password": hashed_password,
+            "name": user_data["name"],
+            "organisasi_id": organisasi_ids[user_data["organisasi"].lower()],
+            "role": user_data["role"],
+            "created_at": datetime.now(timezone.utc)
+        })
+
+    # ordered=False: insert tetap lanjut walau ada email duplikat (unique index)
+    try:
+        result = await users_collection.insert_many(user_docs, ordered=False)
+        user_ids = {doc["email"]: str(_id) for doc, _id in zip(user_docs, result.inserted_ids)}
+    except BulkWriteError as e:
+        print(f"   ⚠ {len(e.details.get('writeErrors', []))} user gagal dibuat (duplikat)")
+        user_ids = {
+            doc["email"]: str(doc["_id"])
+            async for doc in users_collection.find({"email": {"$in": emails}}, {"email": 1})
+        }
+
+    for user_data in new_users:
+        if user_data["email"] in user_ids:
+            print(f"   ✓ User dibuat: {user_data['name']} ({user_data['email']})")
+
+    return {**existing, **user_ids}
+
+
+def execute_async(session, statement, params) -> asyncio.Future:
+    """Jalankan execute_async driver dan bungkus sebagai asyncio Future."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    response_future = session.execute_async(statement, params)
     
-    # Create user
-    now_str = datetime.now(WIB).isoformat()
-    user_doc = {
-        "email": user_data["email"],
-        "password": hashed_password,
-        "name": user_data["name"],
-        "organisasi_id": organisasi_id,
-        "role": user_data["role"],
-        "created_at": now_str
-    }
+    def on_success(rows):
+        loop.call_soon_threadsafe(
+            lambda: future.done() or future.set_result(rows)
+        )
     
-    result = await users_collection.insert_one(user_doc)
-    print(f"   ✓ User dibuat: {user_data['name']} ({user_data['email']})")
-    return str(result.inserted_id)
+    def on_error(exc):
+        loop.call_soon_threadsafe(
+            lambda: future.done() or future.set_exception(exc)
+        )
+    
+    response_future.add_callbacks(on_success, on_error)
+    return future
+
+
+async def audit_worker(audit_queue: asyncio.Queue, cassandra_session, insert_audit_stmt, insert_by_time_stmt):
+    """
+    Tulis audit row dari antrian ke Cassandra per batch.
+
+    Setiap row ditulis ke activity_audit (per user) dan activity_audit_by_time
+    (per hari UTC, dibaca view audit admin), sama seperti backend.
+
+    Seeding MongoDB cukup memasukkan row ke antrian sehingga tidak menunggu
+    latency Cassandra.
+    """
+    while True:
+        params_list = [await audit_queue.get()]
+        while len(params_list) < AUDIT_BATCH_SIZE and not audit_queue.empty():
+            params_list.append(audit_queue.get_nowait())
+        
+        try:
+            # execute_async tidak memblokir event loop maupun thread pool;
+            # response diselesaikan lewat callback IO thread driver
+            futures = []
+            for params in params_list:
+                futures.append(execute_async(cassandra_session, insert_audit_stmt, params))
+                futures.append(execute_async(
+                    cassandra_session, insert_by_time_stmt, params + (_audit_day_bucket(params[1]),)
+                ))
+            results = await asyncio.gather(*futures, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    print(f"      ⚠ Gagal log ke Cassandra: {result}")
+        except Exception as e:
+            print(f"      ⚠ Gagal log ke Cassandra: {e}")
+        finally:
+            for _ in params_list:
+                audit_queue.task_done()
+
+
+async def get_last_hashes(db, user_ids):
+    """
+    Ambil current_hash aktivitas terakhir tiap user dalam satu aggregation.
 
+    Returns:
+        Dict user_id -> hash terakhir; user tanpa aktivitas mendapat "0" * 64
+    """
+    last_hashes = {user_id: "0" * 64 for user_id in user_ids}
+    pipeline = [
+        {"$match": {"user_id": {"$in": list(user_ids)}}},
+        {"$sort": {"user_id": 1, "timestamp": -1}},
+        {"$group": {"_id": "$user_id", "current_hash": {"$first": "$current_hash"}}},
+    ]
+    async for doc in db["activity_logs"].aggregate(pipeline):
+        last_hashes[doc["_id"]] = doc["current_hash"]
+    return last_hashes
 
-async def create_activities_for_user(db, cassandra_session, user_id: str, user_email: str, user_name: str, organisasi_name: str, num_days: int = 7):
+
+async def create_activities_for_user(db, audit_queue, user_id: str, user_name: str, previous_hash: str, num_days: int = 7):
     """Create random activities for user untuk beberapa hari terakhir dengan hash chain."""
     activities_collection = db["activity_logs"]
     
     print(f"   📊 Membuat aktivitas untuk {user_name}...")
     
-    # Get last hash untuk user ini (jika sudah ada activity sebelumnya)
-    last_activity = await activities_collection.find_one(
-        {"user_id": user_id},
-        sort=[("timestamp", -1)]
-    )
-    previous_hash = last_activity["current_hash"] if last_activity else "0" * 64
-    
     total_emission = 0
     activities_created = 0
     
     # Collect activities to insert with proper ordering
     activities_to_insert = []
+    base_now = datetime.now(WIB)
     
     for day in range(num_days):
         # Random 1-4 activities per day
         num_activities = random.randint(1, 4)
+        day_start = base_now - timedelta(days=num_days - day - 1)  # Oldest first
         
         for _ in range(num_activities):
             # Random activity template
             template = random.choice(ACTIVITY_TEMPLATES)
             activity_type = template["activity_type"]
             
-            # Generate activity data
-            now = datetime.now(WIB) - timedelta(days=num_days - day - 1)  # Oldest first
-            # Random waktu di hari tersebut
+            # Generate activity data, random waktu di hari tersebut
             hour = random.randint(6, 22)
             minute = random.randint(0, 59)
-            activity_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            activity_time = day_start.replace(hour=hour, minute=minute, second=0, microsecond=0)
             
             activity_doc = {
                 "user_id": user_id,
                 "activity_type": activity_type,
                 "timestamp": activity_time.isoformat(),
+                "date_str": activity_time.date().isoformat(),
                 "created_at": activity_time.isoformat(),
                 "emission_unit": "kg CO2e"
             }
@@ -248,19 +393,16 @@ async def create_activities_for_user(db, cassandra_session, user_id: str, user_e
                 activity_doc["distance_km"] = distance
                 activity_doc["description"] = random.choice(template["descriptions"])
                 
-                # Calculate emission (simplified)
-                if activity_type == "car":
-                    emission = distance * 0.192  # kg CO2e per km
-                elif activity_type == "motorcycle":
-                    emission = distance * 0.084
-                else:  # bus
-                    emission = distance * 0.089
+                quantity = distance
             
             elif activity_type == "electricity":
                 kwh = random.choice(template["kwh"])
                 activity_doc["energy_kwh"] = kwh
                 activity_doc["description"] = random.choice(template["descriptions"])
-                emission = kwh * 0.85  # kg CO2e per kWh
+                quantity = kwh
+            
+            # Calculate emission (simplified)
+            emission = quantity * EMISSION_FACTORS[activity_type]
             
             activity_doc["emission"] = round(emission, 2)
             activities_to_insert.append((activity_time, activity_doc, emission))
@@ -268,9 +410,9 @@ async def create_activities_for_user(db, cassandra_session, user_id: str, user_e
     # Sort by timestamp to ensure proper chain order
     activities_to_insert.sort(key=lambda x: x[0])
     
-    # Insert activities in order with hash chain
+    # Hitung hash chain untuk semua aktivitas dulu (urutan sudah pasti)
+    docs = []
     for activity_time, activity_doc, emission in activities_to_insert:
-        # Generate hash chain
         current_hash = generate_hash(
             previous_hash=previous_hash,
             user_id=user_id,
@@ -281,49 +423,39 @@ async def create_activities_for_user(db, cassandra_session, user_id: str, user_e
         
         activity_doc["previous_hash"] = previous_hash
         activity_doc["current_hash"] = current_hash
-        
-        # Insert activity to MongoDB
-        result = await activities_collection.insert_one(activity_doc)
-        activity_id = str(result.inserted_id)
-        
-        # Log to Cassandra (audit trail)
-        try:
-            audit_id = uuid.uuid4()
-            # Convert MongoDB ObjectId string to UUID for Cassandra
-            # Use UUID5 with DNS namespace for consistent conversion
-            user_uuid = uuid.uuid5(uuid.NAMESPACE_DNS, user_id)
-            
-            cassandra_session.execute(
-                """
-                INSERT INTO activity_audit (
-                    audit_id, user_id, user_email, activity_time, action, 
-                    activity_type, emission_kg_co2e, previous_hash, current_hash,
-                    description, organisasi_name
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                (
-                    audit_id,
-                    user_uuid,
-                    user_email,
-                    activity_time,
-                    "CREATE",
-                    activity_doc["activity_type"],
-                    activity_doc["emission"],
-                    previous_hash,
-                    current_hash,
-                    activity_doc.get("description", ""),
-                    organisasi_name
-                )
-            )
-        except Exception as e:
-            print(f"      ⚠ Gagal log ke Cassandra: {e}")
+        docs.append(activity_doc)
         
         # Update for next iteration
         previous_hash = current_hash
         total_emission += emission
         activities_created += 1
     
-    print(f"      → {activities_created} aktivitas, Total emisi: {total_emission:.2f} kg CO2e")
+    if not docs:
+        return 0, 0
+    
+    # Insert semua aktivitas dalam satu round-trip (ordered menjaga urutan _id)
+    await activities_collection.insert_many(docs, ordered=True)
+    
+    # Log to Cassandra (audit trail), ditulis audit_worker di background
+    # Format row sama dengan INSERT_AUDIT_QUERY backend; _id sudah diisi
+    # insert_many
+    if audit_queue is not None:
+        for activity_time, activity_doc, emission in activities_to_insert:
+            # audit_id berbasis waktu (UUID v1) dari activity_time, sama
+            # seperti audit log backend
+            audit_queue.put_nowait((
+                user_id,
+                activity_time,
+                uuid_from_time(activity_time),
+                "CREATE",
+                "activity",
+                str(activity_doc["_id"]),
+                {},
+                None,
+                "Aktivitas %s dibuat (%.4f kg CO2e)" % (activity_doc["activity_type"], emission)
+            ))
+    
+    print(f"      → {user_name}: {activities_created} aktivitas, Total emisi: {total_emission:.2f} kg CO2e")
     return activities_created, total_emission
 
 
@@ -335,7 +467,7 @@ async def main():
     
     # Connect to MongoDB
     print("📡 Connecting to MongoDB...")
-    client = AsyncIOMotorClient(MONGO_URI)
+    client = AsyncIOMotorClient(MONGO_URI, maxPoolSize=50)
     db = client.get_default_database()
     print("   ✓ Connected!")
     print()
@@ -344,17 +476,30 @@ async def main():
     print("📡 Connecting to Cassandra...")
     cassandra_session, cassandra_cluster = get_cassandra_session()
     print("   ✓ Connected!")
+    audit_queue = None
+    audit_worker_task = None
+    try:
+        insert_audit_stmt = cassandra_session.prepare(INSERT_AUDIT_QUERY)
+        insert_by_time_stmt = cassandra_session.prepare(INSERT_AUDIT_BY_TIME_QUERY)
+    except Exception as e:
+        # Seeding MongoDB tetap jalan walau tabel audit tidak cocok
+        print(f"   ⚠ Gagal prepare insert audit, log Cassandra dilewati: {e}")
+    else:
+        audit_queue = asyncio.Queue()
+        audit_worker_task = asyncio.create_task(
+            audit_worker(audit_queue, cassandra_session, insert_audit_stmt, insert_by_time_stmt)
+        )
     print()
     
     # Create users
     print("👥 Creating 10 users with different organisations...")
     print("-" * 80)
     
+    user_ids = await seed_users(db, USERS_DATA)
     user_details = []
     for user_data in USERS_DATA:
-        user_id = await create_user(db, user_data)
         user_details.append({
-            "id": user_id,
+            "id": user_ids[user_data["email"]],
             "name": user_data["name"],
             "email": user_data["email"],
             "organisasi": user_data["organisasi"]
@@ -368,19 +513,30 @@ async def main():
     total_activities = 0
     total_emission_all = 0
     
-    for user_detail in user_details:
-        activities_count, emission = await create_activities_for_user(
+    # Hash terakhir semua user (jika sudah ada activity sebelumnya)
+    last_hashes = await get_last_hashes(db, [u["id"] for u in user_details])
+    
+    # Aktivitas tiap user independen (chain per user), buat bersamaan
+    results = await asyncio.gather(*(
+        create_activities_for_user(
             db, 
-            cassandra_session,
+            audit_queue,
             user_detail["id"], 
-            user_detail["email"],
             user_detail["name"],
-            user_detail["organisasi"],
+            last_hashes[user_detail["id"]],
             num_days=7
         )
+        for user_detail in user_details
+    ))
+    for activities_count, emission in results:
         total_activities += activities_count
         total_emission_all += emission
     
+    # Tunggu semua audit tertulis sebelum menutup koneksi Cassandra
+    if audit_worker_task is not None:
+        await audit_queue.join()
+        audit_worker_task.cancel()
+    
     # Close Cassandra connection
     cassandra_cluster.shutdown()
     
@@ -42,6 +42,7 @@ export default function AdminActivitiesPage() {
             const result = await apiClient.getActivities({
                 page: page,
                 page_size: PAGE_SIZE,
+                verify: true,
             })
 
             setAllActivities(result.activities)
@@ -69,6 +70,7 @@ export default function AdminActivitiesPage() {
                 const result = await apiClient.getActivities({
                     page: currentPage,
                     page_size: maxPageSize,
+                    verify: true,
                 })
                 
                 allData = [...allData, ...result.activities]
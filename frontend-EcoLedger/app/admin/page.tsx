@@ -50,6 +50,7 @@ export default function AdminDashboardPage() {
             const activitiesResult = await apiClient.getActivities({
                 page: 1,
                 page_size: 100,
+                verify: true,
             })
 
             const validCount = activitiesResult.activities.filter(a => a.is_valid === true).length
@@ -123,22 +123,15 @@ const loadDashboardData = async () => {
       console.error('❌ Failed to verify hash chain:', err?.message || err)
     }
 
-    // === 4. LOAD DATA CHART DARI MONGODB ===
+    // === 4. LOAD DATA CHART (MONGODB) + AUDIT LOG (CASSANDRA) ===
     try {
-      const stats = await apiClient.getDashboardStats()
-      console.log('✅ Stats loaded:', stats)
-      setChartData(stats)
+      const dashboard = await apiClient.getDashboard()
+      console.log('✅ Stats loaded:', dashboard.stats)
+      setChartData(dashboard.stats)
+      console.log('✅ Logs loaded:', dashboard.logs?.length, 'entries')
+      setAuditLogs(dashboard.logs)
     } catch (err: any) {
-      console.error('❌ Failed to load dashboard stats:', err?.message || err)
-    }
-
-    // === 5. LOAD AUDIT LOG DARI CASSANDRA ===
-    try {
-      const logsData = await apiClient.getAuditLogs()
-      console.log('✅ Logs loaded:', logsData.logs?.length, 'entries')
-      setAuditLogs(logsData.logs)
-    } catch (err: any) {
-      console.error('❌ Failed to load audit logs:', err?.message || err)
+      console.error('❌ Failed to load dashboard:', err?.message || err)
     }
     
     setLoading(false)
@@ -60,6 +60,7 @@ export default function RiwayatPage() {
         user_id: user.id,
         page: page,
         page_size: PAGE_SIZE,
+        verify: true,
       })
 
       setActivities(result.activities)
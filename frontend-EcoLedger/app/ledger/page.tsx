@@ -29,6 +29,7 @@ export default function LedgerPage() {
       const result = await apiClient.getActivities({
         page: page,
         page_size: PAGE_SIZE,
+        verify: true,
       })
 
       setActivities(result.activities)
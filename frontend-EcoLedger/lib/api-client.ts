@@ -117,11 +117,17 @@ class ApiClient {
     user_id?: string;
     page?: number;
     page_size?: number;
+    after_id?: string;
+    include_total?: boolean;
+    verify?: boolean;
   }) {
     const queryParams = new URLSearchParams();
     if (params?.user_id) queryParams.append('user_id', params.user_id);
     if (params?.page) queryParams.append('page', params.page.toString());
     if (params?.page_size) queryParams.append('page_size', params.page_size.toString());
+    if (params?.after_id) queryParams.append('after_id', params.after_id);
+    if (params?.include_total === false) queryParams.append('include_total', 'false');
+    if (params?.verify) queryParams.append('verify', 'true');
 
     const query = queryParams.toString();
     return this.request<ActivityListResponse>(
@@ -175,10 +181,22 @@ class ApiClient {
   // AI ASSISTANT
   // =========================================================================
 
+  // Tips yang belum ada di cache dibuat di background (202 + job_id),
+  // lalu di-poll sampai selesai
   async getAiTips() {
-    return this.request<{ user: string; tips: string }>('/api/ai/tips', {
+    let result = await this.request<AiTipsResponse>('/api/ai/tips', {
       method: 'POST',
     });
+
+    for (let attempt = 0; result.status === 'pending' && result.job_id && attempt < 60; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      result = await this.request<AiTipsResponse>(`/api/ai/tips/${result.job_id}`);
+    }
+
+    if (result.status === 'pending') {
+      throw new Error('Eco-Assistant timeout');
+    }
+    return result as AiTipsResponse & { tips: string };
   }
 
   // =========================================================================
@@ -195,6 +213,11 @@ class ApiClient {
   async getAuditLogs() {
     return this.request<any>('/api/dashboard/logs');
   }
+
+  // Mengambil data chart + audit log sekaligus (satu request)
+  async getDashboard() {
+    return this.request<{ stats: any; logs: any[] }>('/api/dashboard');
+  }
     // Tambahkan method verifyHashChain dengan parameter user_id
   async verifyHashChain(params?: { user_id?: string }) {
     const queryParams = new URLSearchParams();
@@ -302,6 +325,7 @@ export interface ActivityListResponse {
   total: number;
   page: number;
   page_size: number;
+  next_cursor?: string | null;
   activities: ActivityResponse[];
 }
 
@@ -336,6 +360,13 @@ export interface ActivityTypesResponse {
   all_activities: string[];
 }
 
+export interface AiTipsResponse {
+  user: string;
+  status: 'pending' | 'done';
+  job_id?: string;
+  tips?: string;
+}
+
 // Export singleton instance
 export const apiClient = new ApiClient(API_BASE_URL);
 
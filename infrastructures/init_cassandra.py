@@ -9,15 +9,23 @@ print("⏳ Menunggu Cassandra siap...")
 CASSANDRA_HOST = os.environ.get("CASSANDRA_HOST", "cassandra")
 CASSANDRA_PORT = int(os.environ.get("CASSANDRA_PORT", "9042"))
 
-# Wait for Cassandra to be ready
+# Backoff eksponensial: cepat lanjut jika Cassandra sudah siap
+RETRY_BASE_WAIT = 0.25
+RETRY_MAX_WAIT = 5.0
+
+# Wait for Cassandra to be ready. Cluster dibuat ulang tiap percobaan karena
+# driver men-shutdown Cluster yang gagal connect.
 for attempt in range(1, 31):
+    cluster = None
     try:
         cluster = Cluster([CASSANDRA_HOST], port=CASSANDRA_PORT)
         session = cluster.connect()
         print(f"✅ Cassandra reachable (attempt {attempt})")
         break
     except Exception as e:
-        wait = 5
+        if cluster is not None:
+            cluster.shutdown()
+        wait = min(RETRY_BASE_WAIT * 2 ** (attempt - 1), RETRY_MAX_WAIT)
         print(f"Cassandra not ready, retrying in {wait}s... (attempt {attempt})")
         time.sleep(wait)
 else:
@@ -54,6 +62,24 @@ try:
     """)
     print("✅ Table 'activity_audit' created or already exists.")
     
+    # Create activity_audit_by_time table (log terbaru semua user per hari UTC)
+    session.execute("""
+        CREATE TABLE IF NOT EXISTS activity_audit_by_time (
+            day_bucket text,
+            activity_time timestamp,
+            audit_id uuid,
+            user_id text,
+            action_type text,
+            entity text,
+            entity_id text,
+            changes map<text, text>,
+            ip_address text,
+            description text,
+            PRIMARY KEY ((day_bucket), activity_time, audit_id)
+        ) WITH CLUSTERING ORDER BY (activity_time DESC, audit_id ASC)
+    """)
+    print("✅ Table 'activity_audit_by_time' created or already exists.")
+    
     # Verify setup
     rows = session.execute("SELECT * FROM system_schema.tables WHERE keyspace_name = 'eco_logs'")
     tables = [row.table_name for row in rows]
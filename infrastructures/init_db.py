@@ -1,19 +1,22 @@
 import os
 import time
 import datetime
-from datetime import timezone, timedelta
+from datetime import timezone
 import bcrypt
-from pymongo import MongoClient, ASCENDING, DESCENDING
-
-# Timezone WIB (UTC+7)
-WIB = timezone(timedelta(hours=7))
+from pymongo import MongoClient, IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import CollectionInvalid
 
 print("⏳ Menunggu database siap...")
 
 # Determine MongoDB URI: prefer env var, otherwise use Compose service hostname
 mongo_uri = os.environ.get("MONGODB_URI", "mongodb://mongodb:27017/")
 
+# Backoff eksponensial: cepat lanjut jika MongoDB sudah siap
+RETRY_BASE_WAIT = 0.25
+RETRY_MAX_WAIT = 5.0
+
 # Create client with short server selection timeout and wait until ready
+# (client yang sama dipakai ulang di setiap percobaan)
 client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
 db = client["eco_ledger_db"]
 
@@ -23,21 +26,40 @@ for attempt in range(1, 13):
         print(f"✅ MongoDB reachable (attempt {attempt})")
         break
     except Exception:
-        wait = 2
+        wait = min(RETRY_BASE_WAIT * 2 ** (attempt - 1), RETRY_MAX_WAIT)
         print(f"MongoDB not ready, retrying in {wait}s... (attempt {attempt})")
         time.sleep(wait)
 else:
     print("❌ MongoDB tidak tersedia setelah beberapa percobaan, hentikan init.")
     raise SystemExit(1)
 
+# Cost factor bcrypt, sama dengan setting BCRYPT_ROUNDS di backend
+bcrypt_rounds = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+
 # Password Hashing Functions
-def get_password_hash(password: str) -> str:
+def get_password_hash(password: str, rounds: int = bcrypt_rounds) -> str:
     """Hash password menggunakan bcrypt."""
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=rounds)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
+def create_collection_if_missing(name: str, **options) -> bool:
+    """Buat collection; False jika sudah ada (tanpa list_collection_names)."""
+    try:
+        db.create_collection(name, **options)
+        return True
+    except CollectionInvalid:
+        return False
+
+def ensure_indexes(collection, indexes):
+    """Buat index dalam satu createIndexes; index yang sudah ada diabaikan MongoDB."""
+    try:
+        collection.create_indexes(indexes)
+    except Exception as e:
+        # Data lama bisa melanggar unique index; init tetap lanjut
+        print(f"⚠️  Gagal membuat index {collection.name}: {e}")
+
 def create_admin_user():
     """Create default admin user if not exists."""
     admin_email = "admin@ecoledger.com"
@@ -55,7 +77,7 @@ def create_admin_user():
         "name": "Administrator",
         "organisasi_id": None,
         "role": "admin",
-        "created_at": datetime.datetime.now(WIB).isoformat()
+        "created_at": datetime.datetime.now(timezone.utc)
     }
     
     db.users.insert_one(new_admin)
@@ -66,48 +88,74 @@ def create_admin_user():
 try:
     print("🚀 Setup MongoDB...")
 
-    # Create Users Collection with Validation
-    if "users" not in db.list_collection_names():
-        db.create_collection("users", validator={
-            "$jsonSchema": {
-                "bsonType": "object",
-                "required": ["email", "password", "name", "role", "created_at"],
-                "properties": {
-                    "email": {"bsonType": "string"},
-                    "password": {"bsonType": "string"},
-                    "name": {"bsonType": "string"},
-                    "organisasi_id": {"bsonType": ["string", "null"]},
-                    "role": {"enum": ["user", "admin"]},
-                    "created_at": {"bsonType": "string"}
-                }
+    # created_at disimpan sebagai BSON Date (UTC); string ISO lama tetap diterima
+    users_validator = {
+        "$jsonSchema": {
+            "bsonType": "object",
+            "required": ["email", "password", "name", "role", "created_at"],
+            "properties": {
+                "email": {"bsonType": "string"},
+                "password": {"bsonType": "string"},
+                "name": {"bsonType": "string"},
+                "organisasi_id": {"bsonType": ["string", "null"]},
+                "role": {"enum": ["user", "admin"]},
+                "created_at": {"bsonType": ["date", "string"]}
+            }
+        }
+    }
+    organisasi_validator = {
+        "$jsonSchema": {
+            "bsonType": "object",
+            "required": ["nama", "created_at", "created_by"],
+            "properties": {
+                "nama": {"bsonType": "string"},
+                "created_at": {"bsonType": ["date", "string"]},
+                "created_by": {"bsonType": "string"}
             }
-        })
-        db.users.create_index([("email", ASCENDING)], unique=True)
-        db.users.create_index([("organisasi_id", ASCENDING)])
+        }
+    }
+
+    # Create Users Collection with Validation
+    if create_collection_if_missing("users", validator=users_validator):
         print("✅ MongoDB: Collection 'users' created.")
+    else:
+        # Perbarui validator collection lama agar menerima BSON Date
+        db.command("collMod", "users", validator=users_validator)
+    # Unique index email juga untuk collection lama agar dua proses init
+    # tidak bisa membuat admin ganda
+    ensure_indexes(db.users, [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("organisasi_id", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING)]),
+    ])
 
     # Create Activity Logs
-    if "activity_logs" not in db.list_collection_names():
-        db.create_collection("activity_logs")
-        db.activity_logs.create_index([("user_id", ASCENDING), ("timestamp", DESCENDING)])
-        db.activity_logs.create_index([("current_hash", ASCENDING)])
+    if create_collection_if_missing("activity_logs"):
         print("✅ MongoDB: Collection 'activity_logs' created.")
+    else:
+        # Normalisasi user_id lama bertipe ObjectId menjadi string agar query
+        # cukup {"user_id": <string>}. Hash tetap valid karena hash dihitung
+        # dari representasi string user_id yang sama.
+        result = db.activity_logs.update_many(
+            {"user_id": {"$type": "objectId"}},
+            [{"$set": {"user_id": {"$toString": "$user_id"}}}]
+        )
+        if result.modified_count:
+            print(f"✅ MongoDB: {result.modified_count} user_id activity_logs dinormalisasi ke string.")
+    ensure_indexes(db.activity_logs, [
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("current_hash", ASCENDING)], unique=True),
+        IndexModel([("chain_seq", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("chain_seq", ASCENDING), ("_id", ASCENDING)]),
+    ])
 
     # Create Organisasi Collection
-    if "organisasi" not in db.list_collection_names():
-        db.create_collection("organisasi", validator={
-            "$jsonSchema": {
-                "bsonType": "object",
-                "required": ["nama", "created_at", "created_by"],
-                "properties": {
-                    "nama": {"bsonType": "string"},
-                    "created_at": {"bsonType": "string"},
-                    "created_by": {"bsonType": "string"}
-                }
-            }
-        })
-        db.organisasi.create_index([("nama", ASCENDING)])
+    if create_collection_if_missing("organisasi", validator=organisasi_validator):
         print("✅ MongoDB: Collection 'organisasi' created.")
+    else:
+        db.command("collMod", "organisasi", validator=organisasi_validator)
+    ensure_indexes(db.organisasi, [IndexModel([("nama", ASCENDING)])])
 
     # Create default admin user
     create_admin_user()